@@ -1,120 +1,138 @@
-# backend/app.py - UPDATED VERSION
-from flask import Flask, request, jsonify, session, send_from_directory
-from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
+# backend/app.py - the Flask app, API routes and CLI commands
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, session, send_from_directory, stream_with_context
+from contextlib import nullcontext
+import csv
 from datetime import datetime, timedelta
-import uuid
+from heapq import merge
+from itertools import islice
 import os
-import hashlib
-import hmac
-import json
+import time
+import zipfile
+
+import click
+
+from werkzeug.exceptions import NotFound
+
+from archive import Archiver
+from assets import AssetBuilder, StaticAssets
+from catalog import CITIES, amenity_mask, route_catalog
+from compression import init_compression
+from config import get_config
+from extensions import cors, db
+from fares import FareCalendar
+import database
+import ids
+import migrations
+import query_plans
+from metrics import RequestMetrics
+from inventory import SeatInventory, SeatsUnavailable, with_retry
+from jobs import JobQueue, start_job_worker
+from json_provider import FastJSONProvider
+from journeys import ConnectionIndex, serialize_itinerary
+from models import (ArchivedBooking, ArchivedPayment, ArchivedTrip, Booking, DailyFare, Job, Payment, SeatHold,
+                    Sequence, Trip, User)
+from notifications import NOTIFICATIONS_QUEUE, NotificationService, booking_context, make_transport_factory
+from pagination import STREAM_BATCH_SIZE, decode_cursor, encode_cursor, ndjson_lines, parse_limit, wants_stream
+from precomputed import PrecomputedResponse
+from payments import PAYMENTS_QUEUE, SIGNATURE_HEADER, PaymentService, make_provider
+from principal_cache import PrincipalCache, principal_from_user
+from query_budget import init_query_count_header, query_budget
+from scheduler import horizon_window, plan_departures, start_schedule_worker
+from serializers import (BOOKING_FIELDS, TRIP_FIELDS, field_attributes, parse_fields, serialize_booking,
+                         serialize_payment, serialize_trip)
+from search_cache import SearchCache
+from seat_feed import SeatFeed, sse_stream
+from timetable import TimetableImporter, timetable_rows
+from trip_index import TripIndex, normalize_city
 
 # Get the absolute path to the frontend folder
-import os
 current_dir = os.path.dirname(os.path.abspath(__file__))
 frontend_dir = os.path.join(current_dir, '..', 'frontend')
 
-app = Flask(__name__, static_folder=frontend_dir, static_url_path='')
-app.config['SECRET_KEY'] = 'ridenaija-secret-key-2024-change-in-production'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///ridenaija.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SESSION_TYPE'] = 'filesystem'
+# All routes and CLI commands hang off this blueprint; create_app() registers it
+bp = Blueprint('ridenaija', __name__, cli_group=None)
 
-# Initialize extensions
-db = SQLAlchemy(app)
-CORS(app, supports_credentials=True)
+# Route index over bookable trips, loaded lazily on the first search
+trip_index = TripIndex()
 
-# ==================== DATABASE MODELS ====================
+# Timetable as connections for /api/journeys, kept in step with trip_index
+connection_index = ConnectionIndex()
 
-class User(db.Model):
-    __tablename__ = 'users'
-    
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    name = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    phone = db.Column(db.String(20), nullable=False)
-    password_hash = db.Column(db.String(200), nullable=False)
-    role = db.Column(db.String(20), default='passenger')
-    rating = db.Column(db.Float, default=0.0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    trips = db.relationship('Trip', backref='driver', lazy=True, foreign_keys='Trip.driver_id')
-    bookings = db.relationship('Booking', backref='passenger', lazy=True)
-    
-    def set_password(self, password):
-        salt = os.urandom(16).hex()
-        hash_obj = hashlib.sha256((password + salt).encode())
-        self.password_hash = salt + ':' + hash_obj.hexdigest()
-    
-    def check_password(self, password):
-        if ':' not in self.password_hash:
-            return False
-        salt, stored_hash = self.password_hash.split(':')
-        hash_obj = hashlib.sha256((password + salt).encode())
-        return hmac.compare_digest(hash_obj.hexdigest(), stored_hash)
-
-class Trip(db.Model):
-    __tablename__ = 'trips'
-    
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    driver_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    from_location = db.Column(db.String(100), nullable=False)
-    to_location = db.Column(db.String(100), nullable=False)
-    departure_time = db.Column(db.DateTime, nullable=False)
-    arrival_time = db.Column(db.DateTime, nullable=False)
-    available_seats = db.Column(db.Integer, nullable=False)
-    price_per_seat = db.Column(db.Float, nullable=False)
-    car_model = db.Column(db.String(100))
-    car_plate = db.Column(db.String(20))
-    car_type = db.Column(db.String(50), default='Sedan')
-    amenities = db.Column(db.Text, default='[]')
-    status = db.Column(db.String(20), default='scheduled')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    bookings = db.relationship('Booking', backref='trip', lazy=True)
-    
-    def get_amenities(self):
-        try:
-            return json.loads(self.amenities)
-        except:
-            return []
+# Encoded /api/trips pages, invalidated by the index as trips change
+search_cache = SearchCache()
+trip_index.listeners.append(search_cache.on_index_change)
 
-class Booking(db.Model):
-    __tablename__ = 'bookings'
-    
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    trip_id = db.Column(db.String(36), db.ForeignKey('trips.id'), nullable=False)
-    passenger_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
-    seats = db.Column(db.Integer, nullable=False)
-    total_price = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(20), default='confirmed')
-    payment_status = db.Column(db.String(20), default='pending')
-    notes = db.Column(db.Text)
-    booking_reference = db.Column(db.String(20), unique=True)
-    receipt_number = db.Column(db.String(20), unique=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    def generate_reference(self):
-        import random
-        import string
-        letters = string.ascii_uppercase
-        return 'RNJ' + ''.join(random.choice(letters) for i in range(6))
-    
-    def generate_receipt(self):
-        import random
-        import string
-        letters = string.ascii_uppercase + string.digits
-        return 'RCT' + ''.join(random.choice(letters) for i in range(8))
+# Seat counts pushed to /api/trips/seats/stream as bookings and hold releases commit
+seat_feed = SeatFeed()
+
+# Static reference data, encoded and compressed once per process
+CITIES_RESPONSE = PrecomputedResponse({"success": True, "cities": CITIES})
+ROUTES_RESPONSE = PrecomputedResponse({"success": True, "routes": route_catalog()})
+
+# Authenticated users by id, so protected endpoints skip the users lookup
+principal_cache = PrincipalCache()
+
+# Per-route latency and SQL counters served at /api/metrics
+request_metrics = RequestMetrics()
+
+# Output of `flask build-assets`, loaded by create_app(); without a build frontend/ is served as is
+static_assets = StaticAssets()
+
+def cache_metrics():
+    caches = {'principal': principal_cache.stats(), 'search': search_cache.stats()}
+    for name in ('hits', 'misses'):
+        yield (f'ridenaija_cache_{name}_total', 'counter', f'Cache {name}.',
+               [({'cache': cache}, stats[name]) for cache, stats in caches.items()])
+
+request_metrics.add_collector(cache_metrics)
+
+# Eager-loading options so serializers.py never triggers a lazy load per row
+db.configure_mappers()
+TRIP_LOAD_OPTIONS = [db.joinedload(Trip.driver)]
+BOOKING_LOAD_OPTIONS = [db.joinedload(Booking.trip).joinedload(Trip.driver)]
+ARCHIVED_BOOKING_LOAD_OPTIONS = [db.joinedload(ArchivedBooking.trip).joinedload(ArchivedTrip.driver)]
+
+def trip_load_options(fields=None):
+    """TRIP_LOAD_OPTIONS narrowed to what `fields` read; id and departure_time always load for cursors."""
+    if fields is None:
+        return TRIP_LOAD_OPTIONS
+    attributes = field_attributes(fields, TRIP_FIELDS) | {'id', 'departure_time'}
+    options = [db.load_only(*(getattr(Trip, name) for name in sorted(attributes - {'driver'})))]
+    if 'driver' in attributes:
+        options.append(db.joinedload(Trip.driver).load_only(User.name, User.rating))
+    return options
+
+def booking_load_options(fields=None, model=Booking):
+    """BOOKING_LOAD_OPTIONS narrowed to what `fields` read, plus the columns cursors and ownership checks use.
+
+    `model` is Booking or ArchivedBooking.
+    """
+    if fields is None:
+        return BOOKING_LOAD_OPTIONS if model is Booking else ARCHIVED_BOOKING_LOAD_OPTIONS
+    attributes = field_attributes(fields, BOOKING_FIELDS) | {'id', 'created_at', 'passenger_id'}
+    options = [db.load_only(*(getattr(model, name) for name in sorted(attributes - {'trip'})))]
+    if 'trip' in attributes:
+        options.append(db.joinedload(model.trip).joinedload(model.trip.property.mapper.class_.driver))
+    return options
 
 # ==================== HELPER FUNCTIONS ====================
 
+def load_principal(user_id):
+    user = db.session.get(User, user_id)
+    return principal_from_user(user) if user else None
+
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def invalidate_principal(mapper, connection, target):
+    principal_cache.invalidate(target.id)
+
 def login_required(f):
     def decorated_function(*args, **kwargs):
         user_id = session.get('user_id')
         if not user_id:
             return jsonify({"success": False, "error": "Authentication required"}), 401
         
-        user = User.query.get(user_id)
+        user = principal_cache.get(user_id, load_principal)
         if not user:
             return jsonify({"success": False, "error": "User not found"}), 401
         
@@ -123,6 +141,194 @@ def login_required(f):
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+def apply_seat_changes(seats_by_trip):
+    for trip_id, seats in seats_by_trip.items():
+        trip_index.update_seats(trip_id, seats)
+        connection_index.update_seats(trip_id, seats)
+    seat_feed.publish(seats_by_trip)
+
+# Cheapest fare per route and day, written in the same transactions as the trips behind it
+fare_calendar = FareCalendar(db, Trip, DailyFare)
+
+inventory = SeatInventory(db, Trip, Booking, SeatHold, on_change=apply_seat_changes,
+                          on_release=fare_calendar.refresh_trips)
+
+# Departed trips and old bookings moved to the *_archive tables by `flask archive-history`
+archiver = Archiver(db, Trip, Booking, Payment, SeatHold,
+                    {Trip: ArchivedTrip, Booking: ArchivedBooking, Payment: ArchivedPayment})
+
+# Operator timetables loaded by `flask import-timetable` and POST /api/admin/timetable
+timetable_importer = TimetableImporter(db, Trip, fare_calendar)
+
+# Numbers behind booking references and receipts, claimed from the database in blocks
+booking_numbers = ids.SequenceBlocks(db, Sequence, 'bookings')
+
+# Durable background work; payments are verified off the request path
+job_queue = JobQueue(db, Job)
+payment_service = PaymentService(db, inventory, job_queue)
+notification_service = NotificationService(job_queue)
+JOB_HANDLERS = {
+    PAYMENTS_QUEUE: payment_service.handlers(),
+    NOTIFICATIONS_QUEUE: notification_service.send_batch
+}
+
+def queue_confirmation_email(booking_id):
+    booking = db.session.get(Booking, booking_id, options=BOOKING_LOAD_OPTIONS)
+    notification_service.queue('booking_confirmed', booking_context(booking, booking.passenger))
+
+payment_service.on_paid = queue_confirmation_email
+
+# ---------- endpoint queries (also checked by `flask check-query-plans`) ----------
+
+def bookable_trip_rows_query(now):
+    return db.session.query(
+        Trip.id, Trip.from_location, Trip.to_location, Trip.departure_time, Trip.available_seats, Trip.amenity_mask
+    ).filter(Trip.status == 'scheduled', Trip.departure_time >= now)
+
+def timetable_rows_query(now):
+    return db.session.query(
+        Trip.id, Trip.from_location, Trip.to_location, Trip.departure_time, Trip.arrival_time,
+        Trip.price_per_seat, Trip.available_seats
+    ).filter(Trip.status == 'scheduled', Trip.departure_time >= now)
+
+def trip_seats_query(trip_ids):
+    # Trips that departed or were cancelled read as sold out
+    return db.session.query(
+        Trip.id, db.case((Trip.status == 'scheduled', Trip.available_seats), else_=0)
+    ).filter(Trip.id.in_(trip_ids))
+
+# Trip ids per IN (...) when the seat feed polls
+SEAT_POLL_BATCH = 500
+
+def watched_trip_seats(trip_ids):
+    seats = {}
+    for i in range(0, len(trip_ids), SEAT_POLL_BATCH):
+        seats.update(trip_seats_query(trip_ids[i:i + SEAT_POLL_BATCH]))
+    return seats
+
+def trips_by_ids_query(trip_ids, amenities=0, fields=None):
+    query = Trip.query.options(*trip_load_options(fields)).filter(
+        Trip.id.in_(trip_ids), Trip.status == 'scheduled', Trip.available_seats > 0
+    )
+    if amenities:
+        query = query.filter(Trip.amenity_mask.op('&')(amenities) == amenities)
+    return query
+
+def user_bookings_query(user_id, after=None, fields=None, model=Booking):
+    query = model.query.options(*booking_load_options(fields, model)).filter_by(
+        passenger_id=user_id
+    ).order_by(model.created_at.desc(), model.id.desc())
+    if after:
+        query = query.filter(db.tuple_(model.created_at, model.id) < after)
+    return query
+
+def history_key(booking):
+    return booking.created_at, booking.id
+
+def booking_history(user_id, after, limit, fields=None):
+    """Up to `limit` bookings newest first, from bookings and bookings_archive merged.
+
+    The archive is only read when the hot rows don't fill the page with
+    bookings too recent to have been archived.
+    """
+    bookings = user_bookings_query(user_id, after, fields).limit(limit).all()
+    if len(bookings) == limit and bookings[-1].created_at >= archiver.booking_horizon(datetime.utcnow()):
+        return bookings
+    archived = user_bookings_query(user_id, after, fields, ArchivedBooking).limit(limit).all()
+    return list(islice(merge(bookings, archived, key=history_key, reverse=True), limit))
+
+def stream_booking_history(user_id, after, fields=None):
+    streams = [
+        db.session.scalars(user_bookings_query(user_id, after, fields, model).statement.execution_options(
+            yield_per=STREAM_BATCH_SIZE))
+        for model in (Booking, ArchivedBooking)
+    ]
+    return merge(*streams, key=history_key, reverse=True)
+
+def scheduled_departures_query(window_start, window_end):
+    return db.session.query(Trip.from_location, Trip.to_location, Trip.departure_time).filter(
+        Trip.departure_time >= window_start, Trip.departure_time < window_end
+    )
+
+def booking_error(trip):
+    """Why `trip` can't be booked, or None."""
+    if trip.status != 'scheduled':
+        return "Trip is not available for booking"
+    if trip.departure_time < datetime.utcnow():
+        return "Cannot book past trips"
+    return None
+
+def reserve_seats(trip_id, seats):
+    """inventory.reserve(), first giving back seats from lapsed holds on the trip if it is full."""
+    try:
+        return inventory.reserve(trip_id, seats)
+    except SeatsUnavailable:
+        if not inventory.release_expired(trip_id=trip_id, commit=False):
+            raise
+        return inventory.reserve(trip_id, seats)
+
+def add_booking(passenger, trip, seats, notes, number):
+    """Pending Booking and its SeatHold for seats already reserved; the caller flushes and commits."""
+    booking = Booking(
+        trip_id=trip.id,
+        passenger_id=passenger.id,
+        seats=seats,
+        total_price=seats * trip.price_per_seat,
+        status="pending",
+        payment_status="pending",
+        notes=notes,
+        booking_reference=ids.booking_reference(number),
+        receipt_number=ids.receipt_number(number)
+    )
+    booking.trip = trip
+    db.session.add(booking)
+    return booking, inventory.hold(booking)
+
+def booking_receipt(booking):
+    return {
+        "booking_reference": booking.booking_reference,
+        "receipt_number": booking.receipt_number,
+        "total_amount": booking.total_price,
+        "payment_status": booking.payment_status
+    }
+
+def ensure_trip_index():
+    if trip_index.is_stale(current_app.config['TRIP_INDEX_MAX_AGE']):
+        trip_index.load(bookable_trip_rows_query(datetime.utcnow()))
+    return trip_index
+
+def ensure_connection_index():
+    if connection_index.is_stale(current_app.config['TRIP_INDEX_MAX_AGE']):
+        connection_index.load(timetable_rows_query(datetime.utcnow()))
+    return connection_index
+
+def load_trips_in_order(trip_ids, amenities=0, fields=None):
+    if not trip_ids:
+        return []
+    trips = {trip.id: trip for trip in trips_by_ids_query(trip_ids, amenities, fields)}
+    return [trips[trip_id] for trip_id in trip_ids if trip_id in trips]
+
+def search_trips(from_loc, to_loc, date_obj, after, limit, amenities=0, fields=None):
+    """Up to `limit` trips in departure order, and the keyset position to continue from (or None).
+
+    The index supplies the page in order, amenity filter included, and one
+    query loads it; the database checks the mask again in case the index is
+    behind another process's import.
+    """
+    entries = ensure_trip_index().search(from_loc, to_loc, date_obj, after=after, limit=limit + 1,
+                                         amenities=amenities)
+    page = entries[:limit]
+    trips = load_trips_in_order([trip_id for _, trip_id in page], amenities, fields)
+    return trips, page[-1] if len(entries) > limit else None
+
+def stream_trips(from_loc, to_loc, date_obj, after, amenities=0, fields=None):
+    while True:
+        trips, after = search_trips(from_loc, to_loc, date_obj, after, STREAM_BATCH_SIZE, amenities, fields)
+        for trip in trips:
+            yield serialize_trip(trip, fields)
+        if after is None:
+            return
+
 def create_sample_data():
     if User.query.count() == 0:
         print("Creating sample users...")
@@ -168,33 +374,8 @@ def create_sample_data():
         db.session.commit()
         print("✅ Sample users created!")
 
-def generate_trips():
-    today = datetime.utcnow()
-    end_date = datetime(2024, 3, 29, 23, 59, 59)
-    
-    routes = [
-        {"from": "Lagos", "to": "Abuja", "duration_hours": 11, "price": 15000},
-        {"from": "Lagos", "to": "Port Harcourt", "duration_hours": 9, "price": 12000},
-        {"from": "Lagos", "to": "Ibadan", "duration_hours": 2.5, "price": 3500},
-        {"from": "Lagos", "to": "Kano", "duration_hours": 16, "price": 18000},
-        {"from": "Lagos", "to": "Enugu", "duration_hours": 8, "price": 11000},
-        {"from": "Lagos", "to": "Calabar", "duration_hours": 13, "price": 14000},
-        {"from": "Lagos", "to": "Abeokuta", "duration_hours": 2, "price": 2500},
-        {"from": "Lagos", "to": "Akure", "duration_hours": 5, "price": 5500},
-        {"from": "Abuja", "to": "Lagos", "duration_hours": 11, "price": 15000},
-        {"from": "Abuja", "to": "Kano", "duration_hours": 6, "price": 8000},
-        {"from": "Abuja", "to": "Jos", "duration_hours": 4, "price": 6000},
-        {"from": "Abuja", "to": "Ilorin", "duration_hours": 5, "price": 7000},
-        {"from": "Abuja", "to": "Port Harcourt", "duration_hours": 9, "price": 13000},
-        {"from": "Ibadan", "to": "Lagos", "duration_hours": 2.5, "price": 3500},
-        {"from": "Ibadan", "to": "Abuja", "duration_hours": 9, "price": 13500},
-        {"from": "Port Harcourt", "to": "Lagos", "duration_hours": 9, "price": 12000},
-        {"from": "Port Harcourt", "to": "Enugu", "duration_hours": 4, "price": 6000},
-        {"from": "Kano", "to": "Lagos", "duration_hours": 16, "price": 18000},
-        {"from": "Kano", "to": "Abuja", "duration_hours": 6, "price": 8000},
-        {"from": "Enugu", "to": "Lagos", "duration_hours": 8, "price": 11000},
-    ]
-    
+def default_driver():
+    """The first driver account, created if there is none."""
     driver = User.query.filter_by(role='driver').first()
     if not driver:
         driver = User(
@@ -207,53 +388,60 @@ def generate_trips():
         driver.set_password("password123")
         db.session.add(driver)
         db.session.commit()
+    return driver
+
+def generate_trips(days=None, batch_size=5000):
+    """Top the timetable up to `days` ahead, inserting only departures that are missing."""
+    days = days if days is not None else current_app.config['SCHEDULE_HORIZON_DAYS']
+    now = datetime.utcnow()
+    window_start, window_end = horizon_window(now, days)
     
-    trip_count = 0
-    current_date = today
+    driver_id = default_driver().id
     
-    # Clear existing trips
-    Trip.query.delete()
+    existing = set(scheduled_departures_query(window_start, window_end))
     
-    while current_date <= end_date:
-        for route in routes:
-            for time_slot in [8, 12, 16]:
-                departure_time = current_date.replace(
-                    hour=time_slot,
-                    minute=0,
-                    second=0,
-                    microsecond=0
-                )
-                
-                if departure_time < datetime.utcnow():
-                    continue
-                
-                arrival_time = departure_time + timedelta(hours=route['duration_hours'])
-                
-                import random
-                available_seats = random.randint(8, 14)
-                
-                trip = Trip(
-                    driver_id=driver.id,
-                    from_location=route['from'],
-                    to_location=route['to'],
-                    departure_time=departure_time,
-                    arrival_time=arrival_time,
-                    available_seats=available_seats,
-                    price_per_seat=route['price'],
-                    car_model="Toyota Hiace",
-                    car_plate=f"RNJ{trip_count:03}",
-                    car_type="Bus",
-                    amenities=json.dumps(["AC", "Comfortable Seats", "Charging Ports"]),
-                    status="scheduled"
-                )
-                
-                db.session.add(trip)
-                trip_count += 1
-        
-        current_date += timedelta(days=1)
+    import random
+    amenities = amenity_mask(["AC", "Comfortable Seats", "Charging Ports"])
+    trip_count = 0
+    batch = []
     
-    try:
+    def flush(rows):
+        db.session.execute(db.insert(Trip), rows)
+        fare_calendar.add_trips(rows)
         db.session.commit()
+        if trip_index.loaded:
+            for row in rows:
+                trip_index.add(row['id'], row['from_location'], row['to_location'],
+                               row['departure_time'], row['available_seats'], row['amenity_mask'])
+        if connection_index.loaded:
+            for row in rows:
+                connection_index.add(row['id'], row['from_location'], row['to_location'], row['departure_time'],
+                                     row['arrival_time'], row['price_per_seat'], row['available_seats'])
+    
+    try:
+        for route, departure_time, arrival_time in plan_departures(now, days, existing):
+            batch.append({
+                "id": ids.new_id(),
+                "driver_id": driver_id,
+                "from_location": route['from'],
+                "to_location": route['to'],
+                "departure_time": departure_time,
+                "arrival_time": arrival_time,
+                "available_seats": random.randint(8, 14),
+                "price_per_seat": route['price'],
+                "car_model": "Toyota Hiace",
+                "car_plate": f"RNJ{trip_count:03}",
+                "car_type": "Bus",
+                "amenity_mask": amenities,
+                "status": "scheduled",
+                "created_at": now
+            })
+            trip_count += 1
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
         print(f"✅ Generated {trip_count} trips")
         return trip_count
     except Exception as e:
@@ -261,9 +449,29 @@ def generate_trips():
         print(f"❌ Error: {e}")
         return 0
 
+def import_timetable(file, filename, operator, driver, on_reject=None, on_batch=None):
+    """Upsert an operator's CSV or GTFS-style timetable; returns the TimetableImporter report."""
+    report = timetable_importer.run(timetable_rows(file, filename), operator, driver.id,
+                                    on_reject=on_reject, on_batch=on_batch)
+    # Imported departures may have moved between routes, so this process's indexes start over
+    now = datetime.utcnow()
+    if trip_index.loaded:
+        trip_index.load(bookable_trip_rows_query(now))
+    if connection_index.loaded:
+        connection_index.load(timetable_rows_query(now))
+    return report
+
+def archive_history(max_batches=None):
+    """Move departed trips and old bookings to the archive tables and drop past fare calendar days."""
+    now = datetime.utcnow()
+    moved = archiver.run(now, max_batches)
+    moved["fare_days"] = fare_calendar.prune((now - archiver.trip_age).date())
+    db.session.commit()
+    return moved
+
 # ==================== API ROUTES ====================
 
-@app.route('/api/auth/register', methods=['POST'])
+@bp.route('/api/auth/register', methods=['POST'])
 def api_register():
     try:
         data = request.json
@@ -277,11 +485,16 @@ def api_register():
         if existing_user:
             return jsonify({"success": False, "error": "Email already registered"}), 409
         
+        # Admin accounts are never self-registered
+        role = data.get('role', 'passenger')
+        if role not in ('passenger', 'driver'):
+            return jsonify({"success": False, "error": "role must be passenger or driver"}), 400
+        
         new_user = User(
             name=data['name'].strip(),
             email=data['email'].lower().strip(),
             phone=data['phone'].strip(),
-            role=data.get('role', 'passenger')
+            role=role
         )
         new_user.set_password(data['password'])
         
@@ -306,7 +519,7 @@ def api_register():
         db.session.rollback()
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/auth/login', methods=['POST'])
+@bp.route('/api/auth/login', methods=['POST'])
 def api_login():
     try:
         data = request.json
@@ -336,7 +549,7 @@ def api_login():
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/auth/logout', methods=['POST'])
+@bp.route('/api/auth/logout', methods=['POST'])
 def api_logout():
     session.pop('user_id', None)
     return jsonify({
@@ -344,11 +557,11 @@ def api_logout():
         "message": "Logged out successfully"
     }), 200
 
-@app.route('/api/auth/check', methods=['GET'])
+@bp.route('/api/auth/check', methods=['GET'])
 def api_check_auth():
     user_id = session.get('user_id')
     if user_id:
-        user = User.query.get(user_id)
+        user = principal_cache.get(user_id, load_principal)
         if user:
             return jsonify({
                 "success": True,
@@ -364,60 +577,200 @@ def api_check_auth():
     
     return jsonify({"success": True, "authenticated": False}), 200
 
-@app.route('/api/trips', methods=['GET'])
+@bp.route('/api/trips', methods=['GET'])
+@query_budget(2)
 def api_get_trips():
     try:
         from_loc = request.args.get('from', '').strip()
         to_loc = request.args.get('to', '').strip()
         date = request.args.get('date', '')
         
-        query = Trip.query.filter(Trip.status == 'scheduled', Trip.available_seats > 0)
-        
-        if from_loc:
-            query = query.filter(Trip.from_location.ilike(f'%{from_loc}%'))
-        if to_loc:
-            query = query.filter(Trip.to_location.ilike(f'%{to_loc}%'))
+        date_obj = None
         if date:
             try:
-                date_obj = datetime.strptime(date, '%Y-%m-%d')
-                query = query.filter(db.func.date(Trip.departure_time) == date_obj.date())
-            except:
+                date_obj = datetime.strptime(date, '%Y-%m-%d').date()
+            except ValueError:
                 pass
         
-        query = query.filter(Trip.departure_time >= datetime.utcnow())
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({"success": False, "error": "Invalid limit or cursor"}), 400
+        
+        # amenities=AC,WiFi: trips having all of them; fields=id,departure_time: only those keys
+        try:
+            amenities = amenity_mask(name for name in request.args.get('amenities', '').split(',') if name.strip())
+            fields = parse_fields(request.args.get('fields'), TRIP_FIELDS)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         
-        trips = query.order_by(Trip.departure_time).all()
+        if wants_stream():
+            rows = stream_trips(from_loc, to_loc, date_obj, after, amenities, fields)
+            return Response(stream_with_context(ndjson_lines(rows)), mimetype='application/x-ndjson')
         
-        trips_data = []
-        for trip in trips:
-            driver = User.query.get(trip.driver_id)
-            trips_data.append({
-                "id": trip.id,
-                "driver_name": driver.name if driver else "Unknown Driver",
-                "driver_rating": driver.rating if driver else 0.0,
-                "from_location": trip.from_location,
-                "to_location": trip.to_location,
-                "departure_time": trip.departure_time.isoformat(),
-                "arrival_time": trip.arrival_time.isoformat(),
-                "available_seats": trip.available_seats,
-                "price_per_seat": trip.price_per_seat,
-                "car_model": trip.car_model,
-                "car_plate": trip.car_plate,
-                "car_type": trip.car_type,
-                "amenities": trip.get_amenities(),
-                "status": trip.status
+        index = ensure_trip_index()
+        route_keys = index.route_keys(from_loc, to_loc)
+        cache_key = (normalize_city(from_loc), normalize_city(to_loc), date_obj, cursor or '', limit, amenities, fields)
+        body = search_cache.get(cache_key, route_keys, date_obj)
+        
+        if body is None:
+            token = search_cache.versions(route_keys, date_obj)
+            trips, next_after = search_trips(from_loc, to_loc, date_obj, after, limit, amenities, fields)
+            
+            trips_data = [serialize_trip(trip, fields) for trip in trips]
+            
+            body = current_app.json.dumps_bytes({
+                "success": True,
+                "count": len(trips_data),
+                "trips": trips_data,
+                "next_cursor": encode_cursor(*next_after) if next_after else None
             })
+            search_cache.put(cache_key, token, body)
         
-        return jsonify({
-            "success": True,
-            "count": len(trips_data),
-            "trips": trips_data
-        }), 200
+        return current_app.response_class(body, mimetype='application/json'), 200
         
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/bookings', methods=['POST'])
+@bp.route('/api/journeys', methods=['GET'])
+@query_budget(1)
+def api_plan_journeys():
+    """Itineraries from `from` to `to` with up to `max_transfers` changes, planned on the connection index."""
+    config = current_app.config
+    try:
+        max_transfers = min(int(request.args.get('max_transfers', 2)), config['JOURNEY_MAX_TRANSFERS'])
+        min_layover = timedelta(minutes=max(0, int(request.args.get('min_layover',
+                                                                     config['JOURNEY_MIN_LAYOVER_MINUTES']))))
+        seats = max(1, int(request.args.get('seats', 1)))
+        date = request.args.get('date', '')
+        day = datetime.strptime(date, '%Y-%m-%d') if date else None
+    except ValueError:
+        return jsonify({"success": False, "error": "Invalid max_transfers, min_layover, seats or date"}), 400
+    if max_transfers < 0:
+        return jsonify({"success": False, "error": "max_transfers cannot be negative"}), 400
+    optimize = request.args.get('optimize', 'earliest,cheapest').split(',')
+    if not set(optimize) <= {'earliest', 'cheapest'}:
+        return jsonify({"success": False, "error": "optimize must be earliest and/or cheapest"}), 400
+    
+    index = ensure_connection_index()
+    origin = index.resolve_city(request.args.get('from', ''))
+    destination = index.resolve_city(request.args.get('to', ''))
+    if origin is None or destination is None:
+        return jsonify({"success": False, "error": "Unknown or ambiguous from/to city"}), 400
+    if origin == destination:
+        return jsonify({"success": False, "error": "from and to are the same city"}), 400
+    
+    now = datetime.utcnow()
+    start = max(day, now) if day else now
+    end = start + timedelta(hours=config['JOURNEY_WINDOW_HOURS'])
+    plans = {}
+    if 'earliest' in optimize:
+        plans['earliest_arrival'] = index.earliest_arrival(origin, destination, start, end, max_transfers + 1,
+                                                           min_layover, seats)
+    if 'cheapest' in optimize:
+        plans['cheapest'] = index.cheapest(origin, destination, start, end, max_transfers + 1, min_layover, seats)
+    
+    journeys = []
+    for criterion, legs in plans.items():
+        if legs is None:
+            continue
+        same = next((j for j in journeys if j['legs'] == legs), None)
+        if same:
+            same['criteria'].append(criterion)
+        else:
+            journeys.append({"criteria": [criterion], "legs": legs})
+    
+    return jsonify({
+        "success": True,
+        "count": len(journeys),
+        "journeys": [dict(serialize_itinerary(j['legs'], seats), criteria=j['criteria']) for j in journeys]
+    }), 200
+
+# Trip ids one seat stream may watch
+SEAT_STREAM_MAX_TRIPS = 100
+
+@bp.route('/api/trips/seats/stream', methods=['GET'])
+@query_budget(1)
+def api_stream_seats():
+    """Server-Sent Events with available_seats for `trip_ids` (comma-separated) or the trips on `from`/`to`/`date`.
+
+    The first `seats` event is every watched trip's count; later ones carry
+    only the trips that changed.
+    """
+    config = current_app.config
+    trip_ids = [trip_id for trip_id in request.args.get('trip_ids', '').split(',') if trip_id.strip()]
+    from_loc = request.args.get('from', '').strip()
+    to_loc = request.args.get('to', '').strip()
+    index = ensure_trip_index()
+    if trip_ids:
+        if len(trip_ids) > SEAT_STREAM_MAX_TRIPS:
+            return jsonify({"success": False, "error": f"At most {SEAT_STREAM_MAX_TRIPS} trip_ids"}), 400
+        seats = index.seats(trip_id.strip() for trip_id in trip_ids)
+    elif from_loc and to_loc:
+        try:
+            date_obj = datetime.strptime(request.args.get('date', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({"success": False, "error": "date must be YYYY-MM-DD"}), 400
+        seats = index.trips_on(from_loc, to_loc, date_obj)
+    else:
+        return jsonify({"success": False, "error": "trip_ids, or from, to and date, are required"}), 400
+    if not seats:
+        return jsonify({"success": False, "error": "No upcoming trips to watch"}), 404
+    if len(seats) > SEAT_STREAM_MAX_TRIPS:
+        return jsonify({"success": False, "error": f"More than {SEAT_STREAM_MAX_TRIPS} trips; narrow the search"}), 400
+    
+    subscribed = seat_feed.subscribe(seats)
+    if subscribed is None:
+        return jsonify({"success": False, "error": "Too many open seat streams; retry shortly"}), 503
+    subscription, snapshot = subscribed
+    seat_feed.start_poller(current_app._get_current_object(), watched_trip_seats)
+    # No stream_with_context: the request (and its pooled connection) ends before streaming starts
+    events = sse_stream(seat_feed, subscription, snapshot,
+                        coalesce=config['SEAT_STREAM_COALESCE_MS'] / 1000,
+                        heartbeat=config['SEAT_STREAM_HEARTBEAT_SECONDS'],
+                        lifetime=config['SEAT_STREAM_MAX_SECONDS'])
+    response = Response(events, mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Runs however the stream ends, including a client that leaves before the first event
+    response.call_on_close(lambda: seat_feed.unsubscribe(subscription))
+    return response
+
+@bp.route('/api/fares/calendar', methods=['GET'])
+@query_budget(1)
+def api_fare_calendar():
+    """Cheapest fare and seats left for each day of `month` (YYYY-MM, default this month) on one route."""
+    from_loc = request.args.get('from', '').strip()
+    to_loc = request.args.get('to', '').strip()
+    if not from_loc or not to_loc:
+        return jsonify({"success": False, "error": "from and to are required"}), 400
+    month = request.args.get('month', '')
+    try:
+        first_day = datetime.strptime(month, '%Y-%m') if month else datetime.utcnow()
+    except ValueError:
+        return jsonify({"success": False, "error": "month must be YYYY-MM"}), 400
+    
+    days = fare_calendar.month(from_loc, to_loc, first_day.year, first_day.month)
+    return jsonify({
+        "success": True,
+        "from": from_loc,
+        "to": to_loc,
+        "month": f"{first_day.year:04}-{first_day.month:02}",
+        "days": days
+    }), 200
+
+# What a booking view may spend beyond its own statements: the login_required principal
+# lookup on a cache miss, claiming a new block of booking numbers (an UPDATE and a SELECT
+# on its own connection), and giving back a full trip's lapsed holds before reserving it
+# again (read and flip the holds, return the seats, expire their bookings, reserve again)
+PRINCIPAL_LOOKUP_QUERIES = 1
+NUMBER_BLOCK_QUERIES = 2
+RELEASE_LAPSED_HOLDS_QUERIES = 5
+
+# 6: the trip, reserve, fare calendar refresh, and the booking, hold and email job inserts
+@bp.route('/api/bookings', methods=['POST'])
+@query_budget(6 + PRINCIPAL_LOOKUP_QUERIES + NUMBER_BLOCK_QUERIES + RELEASE_LAPSED_HOLDS_QUERIES)
 @login_required
 def api_create_booking(current_user):
     try:
@@ -427,123 +780,190 @@ def api_create_booking(current_user):
             return jsonify({"success": False, "error": "Trip ID is required"}), 400
         
         seats = data.get('seats', 1)
-        if seats < 1:
+        if type(seats) is not int or seats < 1:
             return jsonify({"success": False, "error": "At least 1 seat required"}), 400
         
-        trip = Trip.query.get(data['trip_id'])
+        trip = db.session.get(Trip, data['trip_id'], options=TRIP_LOAD_OPTIONS)
         if not trip:
             return jsonify({"success": False, "error": "Trip not found"}), 404
         
-        if trip.available_seats < seats:
-            return jsonify({"success": False, "error": "Not enough seats available"}), 400
+        error = booking_error(trip)
+        if error:
+            return jsonify({"success": False, "error": error}), 400
         
-        if trip.status != 'scheduled':
-            return jsonify({"success": False, "error": "Trip is not available for booking"}), 400
-        
-        if trip.departure_time < datetime.utcnow():
-            return jsonify({"success": False, "error": "Cannot book past trips"}), 400
-        
-        # Generate unique reference and receipt
-        import random
-        import string
-        
-        booking_reference = 'RNJ' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        receipt_number = 'RCT' + ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        
-        new_booking = Booking(
-            trip_id=data['trip_id'],
-            passenger_id=current_user.id,
-            seats=seats,
-            total_price=seats * trip.price_per_seat,
-            status="confirmed",
-            payment_status="paid",
-            notes=data.get('notes', ''),
-            booking_reference=booking_reference,
-            receipt_number=receipt_number
-        )
-        
-        trip.available_seats -= seats
+        def reserve_and_book():
+            # Before reserve(): a new block is committed on its own connection
+            number = booking_numbers.next()
+            remaining_seats = reserve_seats(trip.id, seats)
+            fare_calendar.refresh(trip.from_location, trip.to_location, trip.departure_time.date())
+            
+            new_booking, hold = add_booking(current_user, trip, seats, data.get('notes', ''), number)
+            db.session.flush()
+            # Sent by the job workers once this commits
+            notification_service.queue('booking_created', booking_context(new_booking, current_user, hold.expires_at))
+            
+            # Serialize before commit so the response doesn't reload expired rows
+            booking_details = serialize_booking(new_booking)
+            booking_details["hold_expires_at"] = hold.expires_at.isoformat()
+            
+            db.session.commit()
+            return booking_details, remaining_seats
         
-        db.session.add(new_booking)
-        db.session.commit()
+        try:
+            booking_details, remaining_seats = with_retry(reserve_and_book, session=db.session)
+        except SeatsUnavailable:
+            db.session.rollback()
+            return jsonify({"success": False, "error": "Not enough seats available"}), 400
         
-        # Prepare booking details for response
-        booking_details = {
-            "id": new_booking.id,
-            "trip_id": new_booking.trip_id,
-            "seats": new_booking.seats,
-            "total_price": new_booking.total_price,
-            "status": new_booking.status,
-            "payment_status": new_booking.payment_status,
-            "booking_reference": new_booking.booking_reference,
-            "receipt_number": new_booking.receipt_number,
-            "created_at": new_booking.created_at.isoformat(),
-            "trip_details": {
-                "from_location": trip.from_location,
-                "to_location": trip.to_location,
-                "departure_time": trip.departure_time.isoformat(),
-                "arrival_time": trip.arrival_time.isoformat(),
-                "price_per_seat": trip.price_per_seat,
-                "driver_name": trip.driver.name if trip.driver else "Unknown Driver"
-            }
-        }
+        apply_seat_changes({booking_details["trip_id"]: remaining_seats})
         
         return jsonify({
             "success": True,
             "message": "Booking created successfully",
             "booking": booking_details,
-            "redirect": f"/payment?booking_id={new_booking.id}"
+            "redirect": f"/payment?booking_id={booking_details['id']}"
         }), 201
         
     except Exception as e:
         db.session.rollback()
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/bookings/user', methods=['GET'])
+# Bookings one /api/bookings/batch call may make (a round trip is two)
+BOOKING_BATCH_MAX_ITEMS = 4
+
+# 3: the trips, and the booking and hold inserts; then per booking its trip reserve, fare calendar
+# refresh and email job. The numbers come from one block, and lapsed holds are counted for one
+# trip: a batch that finds several of its trips full of them is off the expected path
+@bp.route('/api/bookings/batch', methods=['POST'])
+@query_budget(3 + PRINCIPAL_LOOKUP_QUERIES + NUMBER_BLOCK_QUERIES + RELEASE_LAPSED_HOLDS_QUERIES
+              + BOOKING_BATCH_MAX_ITEMS * 3)
 @login_required
-def api_get_user_bookings(current_user):
+def api_create_bookings(current_user):
+    """Book several trips (an outbound and return, or legs for several passengers) all or nothing."""
     try:
-        bookings = Booking.query.filter_by(passenger_id=current_user.id).order_by(Booking.created_at.desc()).all()
+        items = (request.json or {}).get('bookings')
+        if not isinstance(items, list) or not items:
+            return jsonify({"success": False, "error": "bookings must be a non-empty list"}), 400
+        if len(items) > BOOKING_BATCH_MAX_ITEMS:
+            return jsonify({"success": False, "error": f"At most {BOOKING_BATCH_MAX_ITEMS} bookings per request"}), 400
+        for item in items:
+            if not isinstance(item, dict) or 'trip_id' not in item:
+                return jsonify({"success": False, "error": "Trip ID is required"}), 400
+            seats = item.get('seats', 1)
+            if type(seats) is not int or seats < 1:
+                return jsonify({"success": False, "error": "At least 1 seat required"}), 400
+        
+        trip_ids = {item['trip_id'] for item in items}
+        trips = {trip.id: trip for trip in Trip.query.options(*TRIP_LOAD_OPTIONS).filter(Trip.id.in_(trip_ids))}
+        for item in items:
+            trip = trips.get(item['trip_id'])
+            if not trip:
+                return jsonify({"success": False, "error": "Trip not found", "trip_id": item['trip_id']}), 404
+            error = booking_error(trip)
+            if error:
+                return jsonify({"success": False, "error": error, "trip_id": trip.id}), 400
         
-        bookings_data = []
-        for booking in bookings:
-            trip = Trip.query.get(booking.trip_id)
-            driver = User.query.get(trip.driver_id) if trip else None
+        seats_by_trip = {}
+        for item in items:
+            seats_by_trip[item['trip_id']] = seats_by_trip.get(item['trip_id'], 0) + item.get('seats', 1)
+        
+        def reserve_and_book_all():
+            numbers = booking_numbers.take(len(items))
+            # Trips are always updated in id order, so two batches sharing trips can't deadlock
+            remaining = {}
+            for trip_id in sorted(seats_by_trip):
+                try:
+                    remaining[trip_id] = reserve_seats(trip_id, seats_by_trip[trip_id])
+                except SeatsUnavailable:
+                    raise SeatsUnavailable(trip_id)
+            for from_loc, to_loc, day in sorted({(trip.from_location, trip.to_location, trip.departure_time.date())
+                                                 for trip in trips.values()}):
+                fare_calendar.refresh(from_loc, to_loc, day)
             
-            bookings_data.append({
-                "id": booking.id,
-                "trip_id": booking.trip_id,
-                "seats": booking.seats,
-                "total_price": booking.total_price,
-                "status": booking.status,
-                "payment_status": booking.payment_status,
-                "notes": booking.notes,
-                "booking_reference": booking.booking_reference,
-                "receipt_number": booking.receipt_number,
-                "created_at": booking.created_at.isoformat() if booking.created_at else None,
-                "trip_details": {
-                    "from_location": trip.from_location if trip else "Unknown",
-                    "to_location": trip.to_location if trip else "Unknown",
-                    "departure_time": trip.departure_time.isoformat() if trip else None,
-                    "arrival_time": trip.arrival_time.isoformat() if trip else None,
-                    "price_per_seat": trip.price_per_seat if trip else 0,
-                    "driver_name": driver.name if driver else "Unknown Driver"
-                }
-            })
+            created = [add_booking(current_user, trips[item['trip_id']], item.get('seats', 1),
+                                   item.get('notes', ''), number) for item, number in zip(items, numbers)]
+            db.session.flush()
+            bookings_data = []
+            for booking, hold in created:
+                notification_service.queue('booking_created', booking_context(booking, current_user, hold.expires_at))
+                booking_details = serialize_booking(booking)
+                booking_details["hold_expires_at"] = hold.expires_at.isoformat()
+                bookings_data.append(booking_details)
+            
+            db.session.commit()
+            return bookings_data, remaining
+        
+        try:
+            bookings_data, remaining = with_retry(reserve_and_book_all, session=db.session)
+        except SeatsUnavailable as e:
+            db.session.rollback()
+            return jsonify({"success": False, "error": "Not enough seats available", "trip_id": e.args[0]}), 400
+        
+        apply_seat_changes(remaining)
+        
+        return jsonify({
+            "success": True,
+            "message": f"{len(bookings_data)} bookings created",
+            "count": len(bookings_data),
+            "bookings": bookings_data,
+            "booking_references": [booking["booking_reference"] for booking in bookings_data],
+            "total_price": sum(booking["total_price"] for booking in bookings_data)
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@bp.route('/api/bookings/user', methods=['GET'])
+@query_budget(3)
+@login_required
+def api_get_user_bookings(current_user):
+    try:
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return jsonify({"success": False, "error": "Invalid limit or cursor"}), 400
+        try:
+            fields = parse_fields(request.args.get('fields'), BOOKING_FIELDS)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
+        if wants_stream():
+            rows = stream_booking_history(current_user.id, after, fields)
+            return Response(
+                stream_with_context(ndjson_lines(serialize_booking(b, fields) for b in rows)),
+                mimetype='application/x-ndjson'
+            )
+        
+        bookings = booking_history(current_user.id, after, limit + 1, fields)
+        page = bookings[:limit]
+        
+        bookings_data = [serialize_booking(booking, fields) for booking in page]
         
         return jsonify({
             "success": True,
             "count": len(bookings_data),
-            "bookings": bookings_data
+            "bookings": bookings_data,
+            "next_cursor": encode_cursor(page[-1].created_at, page[-1].id) if len(bookings) > limit else None
         }), 200
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/bookings/<booking_id>', methods=['GET'])
+@bp.route('/api/bookings/<booking_id>', methods=['GET'])
+@query_budget(3)
 @login_required
 def api_get_booking(current_user, booking_id):
     try:
-        booking = Booking.query.get(booking_id)
+        try:
+            fields = parse_fields(request.args.get('fields'), BOOKING_FIELDS)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
+        booking = (db.session.get(Booking, booking_id, options=booking_load_options(fields))
+                   or db.session.get(ArchivedBooking, booking_id,
+                                     options=booking_load_options(fields, ArchivedBooking)))
         if not booking:
             return jsonify({"success": False, "error": "Booking not found"}), 404
         
@@ -551,31 +971,7 @@ def api_get_booking(current_user, booking_id):
         if booking.passenger_id != current_user.id:
             return jsonify({"success": False, "error": "Unauthorized"}), 403
         
-        trip = Trip.query.get(booking.trip_id)
-        driver = User.query.get(trip.driver_id) if trip else None
-        
-        booking_data = {
-            "id": booking.id,
-            "trip_id": booking.trip_id,
-            "seats": booking.seats,
-            "total_price": booking.total_price,
-            "status": booking.status,
-            "payment_status": booking.payment_status,
-            "notes": booking.notes,
-            "booking_reference": booking.booking_reference,
-            "receipt_number": booking.receipt_number,
-            "created_at": booking.created_at.isoformat() if booking.created_at else None,
-            "trip_details": {
-                "from_location": trip.from_location if trip else "Unknown",
-                "to_location": trip.to_location if trip else "Unknown",
-                "departure_time": trip.departure_time.isoformat() if trip else None,
-                "arrival_time": trip.arrival_time.isoformat() if trip else None,
-                "price_per_seat": trip.price_per_seat if trip else 0,
-                "driver_name": driver.name if driver else "Unknown Driver",
-                "car_model": trip.car_model if trip else "",
-                "car_plate": trip.car_plate if trip else ""
-            }
-        }
+        booking_data = serialize_booking(booking, fields)
         
         return jsonify({
             "success": True,
@@ -584,74 +980,26 @@ def api_get_booking(current_user, booking_id):
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/cities', methods=['GET'])
+@bp.route('/api/cities', methods=['GET'])
 def api_get_cities():
-    cities = [
-        {"id": 1, "name": "Lagos", "slug": "lagos", "region": "south-west"},
-        {"id": 2, "name": "Abuja", "slug": "abuja", "region": "north-central"},
-        {"id": 3, "name": "Port Harcourt", "slug": "portharcourt", "region": "south-south"},
-        {"id": 4, "name": "Ibadan", "slug": "ibadan", "region": "south-west"},
-        {"id": 5, "name": "Kano", "slug": "kano", "region": "north-west"},
-        {"id": 6, "name": "Enugu", "slug": "enugu", "region": "south-east"},
-        {"id": 7, "name": "Benin City", "slug": "benin", "region": "south-south"},
-        {"id": 8, "name": "Calabar", "slug": "calabar", "region": "south-south"},
-        {"id": 9, "name": "Ilorin", "slug": "ilorin", "region": "north-central"},
-        {"id": 10, "name": "Jos", "slug": "jos", "region": "north-central"},
-        {"id": 11, "name": "Maiduguri", "slug": "maiduguri", "region": "north-east"},
-        {"id": 12, "name": "Sokoto", "slug": "sokoto", "region": "north-west"},
-        {"id": 13, "name": "Oyo", "slug": "oyo", "region": "south-west"},
-        {"id": 14, "name": "Abeokuta", "slug": "abeokuta", "region": "south-west"},
-        {"id": 15, "name": "Owerri", "slug": "owerri", "region": "south-east"},
-        {"id": 16, "name": "Akure", "slug": "akure", "region": "south-west"},
-        {"id": 17, "name": "Minna", "slug": "minna", "region": "north-central"},
-        {"id": 18, "name": "Bauchi", "slug": "bauchi", "region": "north-east"}
-    ]
-    
-    return jsonify({
-        "success": True,
-        "cities": cities
-    }), 200
+    return CITIES_RESPONSE.response()
 
-@app.route('/api/routes', methods=['GET'])
+@bp.route('/api/routes', methods=['GET'])
 def api_get_routes():
-    routes = [
-        {"from": "Lagos", "to": "Abuja", "distance": "700km", "duration": "10-12 hours", "price": 15000, "region": "all"},
-        {"from": "Lagos", "to": "Port Harcourt", "distance": "600km", "duration": "8-10 hours", "price": 12000, "region": "all"},
-        {"from": "Lagos", "to": "Ibadan", "distance": "150km", "duration": "2-3 hours", "price": 3500, "region": "south-west"},
-        {"from": "Lagos", "to": "Kano", "distance": "1100km", "duration": "15-18 hours", "price": 18000, "region": "all"},
-        {"from": "Lagos", "to": "Enugu", "distance": "550km", "duration": "7-9 hours", "price": 11000, "region": "all"},
-        {"from": "Lagos", "to": "Calabar", "distance": "800km", "duration": "12-14 hours", "price": 14000, "region": "all"},
-        {"from": "Lagos", "to": "Abeokuta", "distance": "100km", "duration": "1.5-2 hours", "price": 2500, "region": "south-west"},
-        {"from": "Lagos", "to": "Akure", "distance": "300km", "duration": "4-5 hours", "price": 5500, "region": "south-west"},
-        {"from": "Abuja", "to": "Lagos", "distance": "700km", "duration": "10-12 hours", "price": 15000, "region": "all"},
-        {"from": "Abuja", "to": "Kano", "distance": "400km", "duration": "6-7 hours", "price": 8000, "region": "north-central"},
-        {"from": "Abuja", "to": "Jos", "distance": "250km", "duration": "4-5 hours", "price": 6000, "region": "north-central"},
-        {"from": "Abuja", "to": "Ilorin", "distance": "300km", "duration": "5-6 hours", "price": 7000, "region": "north-central"},
-        {"from": "Abuja", "to": "Port Harcourt", "distance": "600km", "duration": "9-11 hours", "price": 13000, "region": "all"},
-        {"from": "Ibadan", "to": "Lagos", "distance": "150km", "duration": "2-3 hours", "price": 3500, "region": "south-west"},
-        {"from": "Ibadan", "to": "Abuja", "distance": "600km", "duration": "9-11 hours", "price": 13500, "region": "all"},
-        {"from": "Ibadan", "to": "Enugu", "distance": "450km", "duration": "6-8 hours", "price": 9500, "region": "all"},
-        {"from": "Port Harcourt", "to": "Lagos", "distance": "600km", "duration": "8-10 hours", "price": 12000, "region": "all"},
-        {"from": "Port Harcourt", "to": "Enugu", "distance": "250km", "duration": "4-5 hours", "price": 6000, "region": "south-east"},
-        {"from": "Kano", "to": "Lagos", "distance": "1100km", "duration": "15-18 hours", "price": 18000, "region": "all"},
-        {"from": "Kano", "to": "Abuja", "distance": "400km", "duration": "6-7 hours", "price": 8000, "region": "north-central"},
-    ]
-    
-    return jsonify({
-        "success": True,
-        "routes": routes
-    }), 200
+    return ROUTES_RESPONSE.response()
 
-@app.route('/api/payment/process', methods=['POST'])
+@bp.route('/api/payment/process', methods=['POST'])
+@query_budget(8)
 @login_required
 def api_process_payment(current_user):
+    """Start paying for a booking. Settles in the background; poll /api/payment/<reference>."""
     try:
         data = request.json
         
         if 'booking_id' not in data:
             return jsonify({"success": False, "error": "Booking ID is required"}), 400
         
-        booking = Booking.query.get(data['booking_id'])
+        booking = db.session.get(Booking, data['booking_id'])
         if not booking:
             return jsonify({"success": False, "error": "Booking not found"}), 404
         
@@ -659,71 +1007,370 @@ def api_process_payment(current_user):
         if booking.passenger_id != current_user.id:
             return jsonify({"success": False, "error": "Unauthorized"}), 403
         
-        # Update payment status
-        booking.payment_status = 'paid'
+        if booking.payment_status == 'paid':
+            return jsonify({
+                "success": True,
+                "message": "Booking is already paid",
+                "receipt": booking_receipt(booking),
+                "redirect": "/bookings"
+            }), 200
+        
+        hold = booking.hold
+        if booking.status == 'expired' or (hold and (hold.status != 'held' or hold.expires_at <= datetime.utcnow())):
+            return jsonify({"success": False, "error": "Seat hold has expired, please book again"}), 409
+        
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        try:
+            payment, created = payment_service.start(booking, idempotency_key)
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({"success": False, "error": str(e)}), 422
+        payment_data = serialize_payment(payment)
         db.session.commit()
         
         return jsonify({
             "success": True,
-            "message": "Payment processed successfully",
-            "receipt": {
-                "booking_reference": booking.booking_reference,
-                "receipt_number": booking.receipt_number,
-                "total_amount": booking.total_price,
-                "payment_date": datetime.utcnow().isoformat()
-            },
-            "redirect": "/bookings"
-        }), 200
+            "message": "Payment started" if created else "Payment already in progress",
+            "payment": payment_data,
+            "checkout": payment_service.provider.checkout(payment, current_user.email),
+            "status_url": f"/api/payment/{payment_data['reference']}"
+        }), 202
         
     except Exception as e:
         db.session.rollback()
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route('/api/health', methods=['GET'])
+@bp.route('/api/payment/<reference>', methods=['GET'])
+@query_budget(3)
+@login_required
+def api_get_payment(current_user, reference):
+    try:
+        payment = db.session.execute(db.select(Payment).filter_by(reference=reference)).scalar()
+        if not payment or payment.passenger_id != current_user.id:
+            return jsonify({"success": False, "error": "Payment not found"}), 404
+        
+        result = {"success": True, "payment": serialize_payment(payment)}
+        if payment.status == 'success':
+            result["receipt"] = booking_receipt(db.session.get(Booking, payment.booking_id))
+            result["redirect"] = "/bookings"
+        return jsonify(result), 200
+    
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@bp.route('/api/payment/webhook', methods=['POST'])
+@query_budget(2)
+def api_payment_webhook():
+    """Provider callbacks: verify the HMAC signature, queue, and acknowledge straight away."""
+    try:
+        try:
+            payment_service.accept_webhook(request.get_data(), request.headers.get(SIGNATURE_HEADER))
+        except PermissionError as e:
+            return jsonify({"success": False, "error": str(e)}), 401
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        db.session.commit()
+        return jsonify({"success": True}), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@bp.route('/api/admin/timetable', methods=['POST'])
+@login_required
+def api_import_timetable(current_user):
+    """Multipart upload of an operator timetable: file, operator and optionally driver_email."""
+    try:
+        if current_user.role != 'admin':
+            return jsonify({"success": False, "error": "Admin only"}), 403
+        
+        upload = request.files.get('file')
+        operator = (request.form.get('operator') or '').strip()
+        if upload is None or not operator:
+            return jsonify({"success": False, "error": "file and operator are required"}), 400
+        if len(operator) > 40:
+            return jsonify({"success": False, "error": "operator is limited to 40 characters"}), 400
+        
+        driver_email = request.form.get('driver_email')
+        driver = User.query.filter_by(email=driver_email.lower().strip()).first() if driver_email else default_driver()
+        if not driver:
+            return jsonify({"success": False, "error": "Driver not found"}), 404
+        
+        try:
+            report = import_timetable(upload.stream, upload.filename or '', operator, driver)
+        except (KeyError, csv.Error, zipfile.BadZipFile, UnicodeDecodeError) as e:
+            return jsonify({"success": False, "error": f"Unreadable timetable: {e}"}), 400
+        
+        return jsonify({"success": True, "operator": operator, **report}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@bp.route('/api/health', methods=['GET'])
 def api_health():
     return jsonify({
         "success": True,
         "status": "healthy",
         "service": "RideNaija",
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": datetime.utcnow().isoformat(),
+        "database": {"dialect": db.engine.dialect.name, "pool": db.engine.pool.status()},
+        "principal_cache": principal_cache.stats(),
+        "search_cache": search_cache.stats(),
+        "seat_feed": seat_feed.stats()
     }), 200
 
+@bp.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    if not current_app.config['METRICS_ENABLED']:
+        return jsonify({"success": False, "error": "Metrics are disabled"}), 404
+    token = current_app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+    return Response(request_metrics.render(os.getpid()), mimetype='text/plain; version=0.0.4')
+
 # ==================== FRONTEND ROUTES ====================
 
-@app.route('/')
+def serve_page(name='index.html'):
+    return static_assets.response(name) or send_from_directory(frontend_dir, name)
+
+@bp.route('/')
 def serve_index():
-    return send_from_directory(frontend_dir, 'index.html')
+    return serve_page()
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 def serve_dashboard():
-    return send_from_directory(frontend_dir, 'index.html')
+    return serve_page()
 
-@app.route('/bookings')
+@bp.route('/bookings')
 def serve_bookings():
-    return send_from_directory(frontend_dir, 'index.html')
+    return serve_page()
 
-@app.route('/payment')
+@bp.route('/payment')
 def serve_payment():
-    return send_from_directory(frontend_dir, 'index.html')
+    return serve_page()
 
-@app.route('/<path:path>')
+@bp.route('/<path:path>')
 def serve_static(path):
-    try:
-        return send_from_directory(frontend_dir, path)
-    except:
-        return send_from_directory(frontend_dir, 'index.html')
+    built = static_assets.response(path)
+    if built is not None:
+        return built
+    # Dotfiles (frontend/.env) are never served
+    if not any(part.startswith('.') for part in path.split('/')):
+        try:
+            return send_from_directory(frontend_dir, path)
+        except NotFound:
+            pass
+    return serve_page()
 
 # ==================== APPLICATION STARTUP ====================
 
-def initialize_database():
+@bp.cli.command('release-holds')
+def release_holds_command():
+    """Return seats held by unpaid bookings whose hold has expired."""
+    released = inventory.release_expired()
+    print(f"✅ Released {released} expired seat holds")
+
+@bp.cli.command('import-timetable')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--operator', required=True, help='Operator code the departures are keyed under')
+@click.option('--driver', 'driver_email', default=None, help='Email of the driver account for the trips')
+@click.option('--rejects', type=click.Path(dir_okay=False, writable=True), default=None,
+              help='Write every rejected row and the reason to this CSV file')
+def import_timetable_command(path, operator, driver_email, rejects):
+    """Stream an operator timetable (CSV, or a GTFS-style zip) into trips."""
+    driver = User.query.filter_by(email=driver_email.lower()).first() if driver_email else default_driver()
+    if not driver:
+        raise SystemExit(f"No user with email {driver_email}")
+    
+    shown = [0]
+    
+    def progress(report):
+        # A line per 100,000 rows read
+        if report['rows'] // 100000 > shown[0]:
+            shown[0] = report['rows'] // 100000
+            print(f"   {report['rows']:,} rows, {report['rows_per_second']:,.0f} rows/s, {report['rejected']:,} rejected")
+    
+    with open(path, 'rb') as f, (open(rejects, 'w', newline='') if rejects else nullcontext()) as out:
+        writer = csv.writer(out) if out else None
+        if writer:
+            writer.writerow(['line', 'error'])
+        
+        def reject(line, row, error):
+            writer.writerow([line, error])
+        
+        report = import_timetable(f, path, operator, driver, on_reject=reject if writer else None, on_batch=progress)
+    
+    print(f"✅ Imported {report['rows']:,} rows for {operator} in {report['seconds']:.1f}s "
+          f"({report['rows_per_second']:,.0f} rows/s): {report['inserted']:,} new, {report['updated']:,} updated, "
+          f"{report['rejected']:,} rejected")
+    for error in report['errors'][:10]:
+        print(f"   line {error['line']}: {error['error']}")
+
+@bp.cli.command('archive-history')
+@click.option('--batches', type=int, default=None, help='Stop after this many batches (default: until done)')
+def archive_history_command(batches):
+    """Move departed trips, and bookings past ARCHIVE_BOOKINGS_AFTER_DAYS, to the archive tables."""
+    began = time.perf_counter()
+    moved = archive_history(batches)
+    elapsed = time.perf_counter() - began
+    rows = moved['trips'] + moved['bookings'] + moved['payments']
+    print(f"✅ Archived {moved['trips']} trips, {moved['bookings']} bookings and {moved['payments']} payments "
+          f"in {moved['batches']} batches ({rows / elapsed if elapsed else 0:,.0f} rows/s, "
+          f"longest batch {moved['longest_batch'] * 1000:.0f}ms); pruned {moved['fare_days']} fare calendar days")
+
+@bp.cli.command('run-jobs')
+@click.option('--threads', type=int, default=None, help='Worker threads (default JOB_WORKER_THREADS)')
+@click.option('--once', is_flag=True, help='Run the jobs that are due now, then exit')
+def run_jobs_command(threads, once):
+    """Process background jobs (payment verification, webhooks and emails)."""
+    if once:
+        ran = sum(job_queue.run_pending(queue, handlers, limit=1000) for queue, handlers in JOB_HANDLERS.items())
+        print(f"✅ Ran {ran} jobs")
+        return
+    stop = run_job_worker(current_app._get_current_object(), threads)
+    print(f"🔁 Job worker running ({', '.join(JOB_HANDLERS)}); Ctrl+C to stop")
+    try:
+        while not stop.wait(3600):
+            pass
+    except KeyboardInterrupt:
+        stop.set()
+
+@bp.cli.command('build-assets')
+def build_assets_command():
+    """Fingerprint, precompress and resize frontend/ into STATIC_BUILD_DIR."""
+    builder = AssetBuilder(frontend_dir, current_app.config['STATIC_BUILD_DIR'])
+    if builder.pillow is None:
+        print("⚠️  Pillow is not installed; images are fingerprinted but not resized or converted to WebP")
+    if builder.brotli is None:
+        print("⚠️  brotli is not installed; text assets get gzip copies only")
+    bytes_in, bytes_out = builder.run()
+    print(f"✅ Built {len(builder.assets)} assets into {builder.out_dir}: "
+          f"{bytes_in / 1024:,.0f} KiB of sources, {bytes_out / 1024:,.0f} KiB sent to a browser taking WebP and br (images at default width)")
+    print("   Restart the web workers to serve the new build")
+
+@bp.cli.command('generate-trips')
+@click.option('--days', type=int, default=None, help='Horizon in days (default SCHEDULE_HORIZON_DAYS)')
+def generate_trips_command(days):
+    """Create any missing departures up to the scheduling horizon."""
+    generate_trips(days)
+
+@bp.cli.command('init-db')
+def init_db_command():
+    """Migrate the schema and create sample users. Run once before starting workers."""
+    initialize_database(current_app)
+
+@bp.cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations."""
+    applied = migrations.upgrade(db.engine, db.metadata)
+    for version, description in applied:
+        print(f"✅ Applied migration {version:04d}: {description}")
+    if not applied:
+        print("✅ Schema is up to date")
+
+def endpoint_query_statements(now):
+    """The hot endpoint and job queries by name, for EXPLAIN (check-query-plans and tests)."""
+    return {
+        "trip index load": bookable_trip_rows_query(now).statement,
+        "connection index load (api_plan_journeys)": timetable_rows_query(now).statement,
+        "trips by id (api_get_trips)": trips_by_ids_query(['a', 'b']).statement,
+        "trips by id with amenities": trips_by_ids_query(['a', 'b'], amenity_mask(['AC'])).statement,
+        "watched seats (seat feed poller)": trip_seats_query(['a', 'b']).statement,
+        "fare calendar month (api_fare_calendar)": fare_calendar.month_statement(
+            'lagos', 'abuja', now.date(), now.date() + timedelta(days=30)),
+        "fare calendar refresh (api_create_booking)": fare_calendar.refresh_statement('Lagos', 'Abuja', now.date(), now),
+        "booking history (api_get_user_bookings)": user_bookings_query('u').limit(51).statement,
+        "booking history page 2": user_bookings_query('u', (now, 'b')).limit(51).statement,
+        "archived booking history": user_bookings_query('u', (now, 'b'), model=ArchivedBooking).limit(51).statement,
+        "archive candidates (archive-history)": archiver.candidates_statement(now, now),
+        "imported departures (import-timetable)": timetable_importer.existing_statement('ABC', ['a', 'b']),
+        "schedule top-up (generate_trips)": scheduled_departures_query(now, now).statement,
+        "seat reserve (api_create_booking)": inventory.reserve_statement('t', 1, now),
+        "expired holds (release-holds)": inventory.expired_holds_statement(now),
+        "due jobs (run-jobs)": job_queue.due_statement(PAYMENTS_QUEUE, now, 10),
+        "lapsed job leases (run-jobs)": job_queue.stale_statement(PAYMENTS_QUEUE, now, 10),
+    }
+
+@bp.cli.command('check-query-plans')
+def check_query_plans_command():
+    """EXPLAIN each endpoint query and fail if any does a full table scan."""
+    if db.engine.dialect.name != 'sqlite':
+        print("⚠️  check-query-plans reads SQLite's EXPLAIN QUERY PLAN; skipping")
+        return
+    failures = 0
+    for name, statement in endpoint_query_statements(datetime.utcnow()).items():
+        plan = query_plans.explain(db.session, statement)
+        scans = query_plans.full_scans(plan)
+        print(f"{'❌' if scans else '✅'} {name}")
+        for line in plan:
+            print(f"     {line}")
+        failures += bool(scans)
+    if failures:
+        raise SystemExit(f"{failures} endpoint queries fall back to a full table scan")
+
+def run_schedule_worker(app, interval_seconds=3600):
+    def top_up():
+        with app.app_context():
+            generate_trips()
+            archive_history()
+    return start_schedule_worker(top_up, interval_seconds)
+
+def run_job_worker(app, threads=None):
+    return start_job_worker(app, job_queue, JOB_HANDLERS, app.config['JOB_POLL_INTERVAL'],
+                            threads or app.config['JOB_WORKER_THREADS'],
+                            batch_sizes={NOTIFICATIONS_QUEUE: app.config['NOTIFICATION_BATCH_SIZE']})
+
+def initialize_database(app):
     print("Initializing database...")
     with app.app_context():
-        db.create_all()
+        for version, description in migrations.upgrade(db.engine, db.metadata):
+            print(f"✅ Applied migration {version:04d}: {description}")
         create_sample_data()
-        generate_trips()
         print("✅ Database initialization complete!")
 
+def create_app(config=None):
+    """Build the Flask app. Does no database I/O, so pre-forked workers boot in parallel."""
+    app = Flask(__name__, static_folder=None)
+    app.json = FastJSONProvider(app)
+    app.config.from_object(get_config(config))
+    if not app.config['SECRET_KEY']:
+        raise RuntimeError("SECRET_KEY is not set; it signs the session cookies login_required trusts")
+    if app.config['METRICS_ENABLED'] and not (app.config['METRICS_TOKEN'] or app.config['ALLOW_PUBLIC_METRICS']):
+        raise RuntimeError("METRICS_ENABLED would serve /api/metrics to anyone; set METRICS_TOKEN or METRICS_ENABLED=0")
+    database.check_backend(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', database.engine_options(app.config))
+    
+    principal_cache.configure(app.config['PRINCIPAL_CACHE_SIZE'], app.config['PRINCIPAL_CACHE_TTL'])
+    search_cache.configure(app.config['SEARCH_CACHE_MAX_BYTES'], app.config['SEARCH_CACHE_TTL'],
+                           app.config['SEARCH_CACHE_SEAT_STALENESS'])
+    booking_numbers.configure(app.config['BOOKING_NUMBER_BLOCK_SIZE'])
+    timetable_importer.batch_size = app.config['TIMETABLE_IMPORT_BATCH_SIZE']
+    archiver.configure(timedelta(hours=app.config['ARCHIVE_TRIPS_AFTER_HOURS']),
+                       timedelta(days=app.config['ARCHIVE_BOOKINGS_AFTER_DAYS']),
+                       app.config['ARCHIVE_BATCH_SIZE'], app.config['ARCHIVE_PAUSE_MS'] / 1000)
+    seat_feed.configure(app.config['SEAT_STREAM_MAX_SUBSCRIBERS'], app.config['SEAT_STREAM_POLL_SECONDS'])
+    job_queue.configure(app.config['JOB_MAX_ATTEMPTS'], app.config['JOB_LEASE_SECONDS'])
+    payment_service.configure(make_provider(app.config))
+    notification_service.configure(app.config['MAIL_DEFAULT_SENDER'], make_transport_factory(app.config))
+    
+    static_assets.load(app.config['STATIC_BUILD_DIR'])
+    
+    db.init_app(app)
+    with app.app_context():
+        database.install_sqlite_pragmas(db.engine, app.config)
+    cors.init_app(app, supports_credentials=True)
+    app.register_blueprint(bp)
+    if app.config['COMPRESS_LEVEL']:
+        init_compression(app, app.config['COMPRESS_MIN_BYTES'], app.config['COMPRESS_LEVEL'])
+    if app.config['QUERY_COUNT_HEADER']:
+        init_query_count_header(app)
+    if app.config['METRICS_ENABLED']:
+        request_metrics.init_app(app)
+    return app
+
 if __name__ == '__main__':
+    app = create_app()
+    
     print("=" * 60)
     print("🚗 RideNaija - Road Trip Booking System")
     print("=" * 60)
@@ -734,9 +1381,15 @@ if __name__ == '__main__':
     print(f"🚗 Driver: driver@ridenaija.com / password123")
     print(f"👤 Passenger: passenger@ridenaija.com / password123")
     print("-" * 60)
-    print("📅 Generating trips until March 29th, 2024...")
+    print(f"📅 Keeping trips scheduled {app.config['SCHEDULE_HORIZON_DAYS']} days ahead (background job)")
+    print(f"🗄️  Archiving trips {app.config['ARCHIVE_TRIPS_AFTER_HOURS']}h after departure, "
+          f"booked ones after {app.config['ARCHIVE_BOOKINGS_AFTER_DAYS']} days (background job)")
     print("=" * 60)
     
-    initialize_database()
+    initialize_database(app)
+    # The reloader imports this module twice; only the serving child runs the job
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        run_schedule_worker(app)
+        run_job_worker(app)
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=app.config['DEBUG'], host='0.0.0.0', port=5000)
@@ -0,0 +1,106 @@
+# backend/archive.py - moves departed trips and old bookings out of the hot tables
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, insert, literal, select
+
+
+class Archiver:
+    """Moves departed trips, with their bookings and payments, into the *_archive tables.
+
+    A trip nobody booked moves once it departed `trip_age` ago; a trip with
+    bookings stays until it departed `booking_age` ago, then moves together
+    with its bookings and their payments (its seat holds are deleted). Each
+    batch of `batch_size` trips is one short transaction of INSERT ... SELECT
+    and DELETE statements, and the archiver sleeps `pause` seconds between
+    batches so bookings never queue behind it for long.
+
+    Every archived booking was made before its trip departed, so all of
+    them are older than now - booking_age; history readers use that to skip
+    the archive when a page is filled by newer bookings.
+    """
+
+    def __init__(self, db, trip_model, booking_model, payment_model, hold_model, archive_models,
+                 trip_age=timedelta(days=1), booking_age=timedelta(days=90), batch_size=500, pause=0.05):
+        self.db = db
+        self.Trip = trip_model
+        self.Booking = booking_model
+        self.Payment = payment_model
+        self.SeatHold = hold_model
+        # Hot model -> its archive model
+        self.archives = archive_models
+        self.configure(trip_age, booking_age, batch_size, pause)
+
+    def configure(self, trip_age, booking_age, batch_size, pause):
+        self.trip_age = trip_age
+        self.booking_age = booking_age
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def booking_horizon(self, now):
+        """Bookings created at or after this are never in the archive."""
+        return now - self.booking_age
+
+    def candidates_statement(self, now, since=None, limit=500):
+        """Ids and departure times of trips ready to move, oldest departure first."""
+        Trip, Booking = self.Trip, self.Booking
+        booked = exists().where(Booking.trip_id == Trip.id)
+        query = select(Trip.id, Trip.departure_time).where(
+            Trip.departure_time < now - self.trip_age,
+            (Trip.departure_time < now - self.booking_age) | ~booked
+        )
+        if since is not None:
+            query = query.where(Trip.departure_time >= since)
+        return query.order_by(Trip.departure_time).limit(limit)
+
+    def _move(self, model, condition, now):
+        archive = self.archives[model].__table__
+        columns = [column.name for column in model.__table__.columns]
+        copied = self.db.session.execute(insert(archive).from_select(
+            columns + ['archived_at'],
+            select(*model.__table__.columns, literal(now, archive.c.archived_at.type)).where(condition)
+        )).rowcount
+        self.db.session.execute(delete(model).where(condition))
+        return copied
+
+    def archive_trips(self, trip_ids, now):
+        """Move the given trips and everything hanging off them; commits. Returns rows moved per table."""
+        Trip, Booking, Payment, SeatHold = self.Trip, self.Booking, self.Payment, self.SeatHold
+        session = self.db.session
+        try:
+            bookings = select(Booking.id).where(Booking.trip_id.in_(trip_ids))
+            moved = {"payments": self._move(Payment, Payment.booking_id.in_(bookings), now)}
+            session.execute(delete(SeatHold).where(SeatHold.trip_id.in_(trip_ids)))
+            moved["bookings"] = self._move(Booking, Booking.trip_id.in_(trip_ids), now)
+            moved["trips"] = self._move(Trip, Trip.id.in_(trip_ids), now)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        return moved
+
+    def run(self, now=None, max_batches=None):
+        """Archive everything due at `now`, a batch at a time.
+
+        Returns rows moved per table, the number of batches and the longest
+        a batch held the write lock, in seconds.
+        """
+        now = now or datetime.utcnow()
+        totals = {"trips": 0, "bookings": 0, "payments": 0, "batches": 0, "longest_batch": 0.0}
+        since = None
+        while max_batches is None or totals["batches"] < max_batches:
+            rows = self.db.session.execute(self.candidates_statement(now, since, self.batch_size)).all()
+            if not rows:
+                break
+            began = time.perf_counter()
+            for table, count in self.archive_trips([trip_id for trip_id, _ in rows], now).items():
+                totals[table] += count
+            totals["longest_batch"] = max(totals["longest_batch"], time.perf_counter() - began)
+            totals["batches"] += 1
+            # Trips before this are archived or still inside the booking window
+            since = rows[-1][1]
+            if len(rows) < self.batch_size:
+                break
+            time.sleep(self.pause)
+        self.db.session.rollback()
+        return totals
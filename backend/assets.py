@@ -0,0 +1,294 @@
+# backend/assets.py - fingerprinted, precompressed frontend assets and the handler that serves them
+#
+# `flask --app app build-assets` writes STATIC_BUILD_DIR:
+#   style.<hash>.css, script.<hash>.js          content-hashed, plus .gz and .br copies
+#   images/<dir>/<name>.<hash>-<width>.<ext>    resized JPEG/PNG and a WebP of each width
+#   index.html, login.html                      references rewritten to the files above
+#   manifest.json                               every URL and the variants it can be served as
+#
+# Pillow (image variants) and brotli (.br copies) are optional; without them
+# images are only fingerprinted and text is only gzipped.
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+from urllib.parse import unquote
+
+from flask import request, send_file
+
+MANIFEST = 'manifest.json'
+IMAGE_WIDTHS = (320, 640, 1280)
+# Width an <img> gets as its plain src; browsers pick from srcset
+DEFAULT_IMAGE_WIDTH = 640
+JPEG_QUALITY = 80
+WEBP_QUALITY = 78
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+MIMETYPES = {
+    '.css': 'text/css',
+    '.js': 'text/javascript',
+    '.html': 'text/html',
+    '.jpg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+}
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+_SLUG = re.compile(r'[^a-z0-9]+')
+_ATTRIBUTE = re.compile(r'''\b(src|href)=(["'])([^"']+)\2''')
+_IMG_TAG = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+_CSS_URL = re.compile(r'''url\((["']?)([^"')]+)\1\)''')
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def _slug(name):
+    return _SLUG.sub('-', name.lower()).strip('-') or 'asset'
+
+
+def _local_path(reference):
+    """'./images/A%20B.jpg' -> 'images/A B.jpg'; None for absolute and data URLs."""
+    if re.match(r'^[a-z][a-z0-9+.-]*:|^//|^#', reference, re.IGNORECASE):
+        return None
+    return unquote(reference.split('?', 1)[0].split('#', 1)[0]).lstrip('./').lstrip('/') or None
+
+
+# ==================== BUILD ====================
+
+class AssetBuilder:
+    """One build of `source_dir` into `out_dir`.
+
+    Files are written next to those of earlier builds rather than replacing
+    them, so pages already open in a browser keep resolving their old
+    fingerprinted URLs; the manifest and pages are swapped in last.
+    """
+
+    def __init__(self, source_dir, out_dir, widths=IMAGE_WIDTHS):
+        self.source_dir = source_dir
+        self.out_dir = out_dir
+        self.widths = widths
+        self.assets = {}
+        # Source path -> {'src': url, 'srcset': [(url, width)]}
+        self.images = {}
+        # Source path -> fingerprinted url, for css/js
+        self.renamed = {}
+        # Built url -> size of its source file, for the build summary
+        self.sources = {}
+        try:
+            import brotli
+            self.brotli = brotli
+        except ImportError:
+            self.brotli = None
+        try:
+            from PIL import Image
+            self.pillow = Image
+        except ImportError:
+            self.pillow = None
+
+    def _write(self, name, data):
+        path = os.path.join(self.out_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def _add(self, url, variants, immutable=True):
+        """Register `url` served as any of [(name, mimetype, encoding, data)]; smallest first."""
+        entries = []
+        for name, mimetype, encoding, data in variants:
+            self._write(name, data)
+            entries.append({"file": name, "type": mimetype, "encoding": encoding,
+                            "size": len(data), "etag": _digest(data)})
+        entries.sort(key=lambda entry: entry['size'])
+        self.assets[url] = {"immutable": immutable, "variants": entries}
+
+    def _add_text(self, url, data, mimetype, immutable=True):
+        variants = [(url, mimetype, None, data)]
+        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            variants.append((url + '.gz', mimetype, 'gzip', compressed))
+        if self.brotli is not None:
+            compressed = self.brotli.compress(data, quality=11)
+            if len(compressed) < len(data):
+                variants.append((url + '.br', mimetype, 'br', compressed))
+        self._add(url, variants, immutable)
+
+    # ---------- images ----------
+
+    def image(self, rel_path):
+        with open(os.path.join(self.source_dir, rel_path), 'rb') as f:
+            data = f.read()
+        folder, filename = os.path.split(rel_path)
+        stem, ext = os.path.splitext(filename)
+        base = '/'.join([_slug(part) for part in folder.split(os.sep) if part] + [_slug(stem)])
+        base += '.' + _digest(data)
+        ext = '.png' if ext.lower() == '.png' else '.jpg'
+
+        if self.pillow is None:
+            url = base + ext
+            self._add(url, [(url, MIMETYPES[ext], None, data)])
+            self.images[rel_path] = {"src": url, "srcset": []}
+            self.sources[url] = len(data)
+            return
+
+        original = self.pillow.open(io.BytesIO(data))
+        original.load()
+        has_alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+        if has_alpha:
+            ext = '.png'
+        largest = max(self.widths)
+        widths = sorted({w for w in self.widths if w < original.width} | {min(original.width, largest)})
+        srcset = []
+        for width in widths:
+            height = round(original.height * width / original.width)
+            resized = original if width == original.width else original.resize(
+                (width, height), self.pillow.LANCZOS)
+            fallback, webp = io.BytesIO(), io.BytesIO()
+            if ext == '.png':
+                resized.save(fallback, 'PNG', optimize=True)
+            else:
+                resized.convert('RGB').save(fallback, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            resized.save(webp, 'WEBP', quality=WEBP_QUALITY, method=6)
+            url = f'{base}-{width}{ext}'
+            variants = [(url, MIMETYPES[ext], None, fallback.getvalue())]
+            if webp.tell() < fallback.tell():
+                variants.append((f'{base}-{width}.webp', MIMETYPES['.webp'], None, webp.getvalue()))
+            self._add(url, variants)
+            srcset.append((url, width))
+        default = ([url for url, width in srcset if width <= DEFAULT_IMAGE_WIDTH] or [srcset[0][0]])[-1]
+        self.images[rel_path] = {"src": default, "srcset": srcset if len(srcset) > 1 else []}
+        self.sources[default] = len(data)
+
+    # ---------- text ----------
+
+    def _rewrite_css(self, text):
+        def replace(match):
+            path = _local_path(match.group(2))
+            if path in self.images:
+                return f'url({match.group(1)}{self.images[path]["src"]}{match.group(1)})'
+            return match.group(0)
+        return _CSS_URL.sub(replace, text)
+
+    def stylesheet_or_script(self, rel_path):
+        with open(os.path.join(self.source_dir, rel_path), 'rb') as f:
+            data = f.read()
+        source_size = len(data)
+        stem, ext = os.path.splitext(rel_path)
+        if ext == '.css':
+            data = self._rewrite_css(data.decode('utf-8')).encode('utf-8')
+        url = f'{stem}.{_digest(data)}{ext}'
+        self._add_text(url, data, MIMETYPES[ext])
+        self.renamed[rel_path] = url
+        self.sources[url] = source_size
+
+    def _rewrite_img(self, match):
+        tag = match.group(0)
+        src = re.search(r'''\bsrc=(["'])([^"']+)\1''', tag)
+        image = self.images.get(_local_path(src.group(2))) if src else None
+        if image is None:
+            return tag
+        tag = tag[:src.start()] + f'src="{image["src"]}"' + tag[src.end():]
+        if image['srcset'] and not re.search(r'\bsrcset=', tag):
+            srcset = ', '.join(f'{url} {width}w' for url, width in image['srcset'])
+            tag = tag.replace(f'src="{image["src"]}"', f'src="{image["src"]}" srcset="{srcset}"', 1)
+        return tag
+
+    def page(self, rel_path):
+        with open(os.path.join(self.source_dir, rel_path), 'rb') as f:
+            text = f.read().decode('utf-8')
+        self.sources[rel_path] = len(text.encode('utf-8'))
+        text = _IMG_TAG.sub(self._rewrite_img, text)
+
+        def replace(match):
+            path = _local_path(match.group(3))
+            url = self.renamed.get(path) or (self.images[path]['src'] if path in self.images else None)
+            return f'{match.group(1)}={match.group(2)}{url}{match.group(2)}' if url else match.group(0)
+        text = _ATTRIBUTE.sub(replace, text)
+        text = re.sub(r'''\bstyle=(["'])(.*?)\1''', lambda m: m.group(0).replace(
+            m.group(2), self._rewrite_css(m.group(2))), text)
+        self._add_text(rel_path, text.encode('utf-8'), MIMETYPES['.html'], immutable=False)
+
+    # ---------- whole build ----------
+
+    def run(self):
+        """Build everything; returns bytes of the source files and of what a WebP/br client downloads instead."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        images_dir = os.path.join(self.source_dir, 'images')
+        for folder, dirs, files in os.walk(images_dir):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for filename in sorted(files):
+                if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                    self.image(os.path.relpath(os.path.join(folder, filename), self.source_dir))
+        top_level = sorted(os.listdir(self.source_dir))
+        for filename in top_level:
+            if os.path.splitext(filename)[1] in ('.css', '.js'):
+                self.stylesheet_or_script(filename)
+        for filename in top_level:
+            if filename.endswith('.html'):
+                self.page(filename)
+        manifest = json.dumps({"assets": self.assets}, indent=1, sort_keys=True).encode()
+        self._write(MANIFEST, manifest)
+        return (sum(self.sources.values()),
+                sum(self.assets[url]['variants'][0]['size'] for url in self.sources))
+
+
+# ==================== SERVING ====================
+
+class StaticAssets:
+    """Serves a build from its manifest: the smallest variant the client accepts.
+
+    WebP goes only to clients that list image/webp; br and gzip follow
+    Accept-Encoding. Fingerprinted URLs are cached for a year as immutable;
+    pages are revalidated with their ETag on every load.
+    """
+
+    def __init__(self):
+        self.out_dir = None
+        self.assets = {}
+
+    def load(self, out_dir):
+        """Read `out_dir`/manifest.json; returns False (serving nothing) if there is no build."""
+        try:
+            with open(os.path.join(out_dir, MANIFEST)) as f:
+                self.assets = json.load(f)['assets']
+        except FileNotFoundError:
+            self.assets = {}
+            return False
+        self.out_dir = out_dir
+        return True
+
+    @property
+    def loaded(self):
+        return bool(self.assets)
+
+    def _choose(self, variants):
+        webp = any(value == 'image/webp' for value in request.accept_mimetypes.values())
+        for variant in variants:
+            if variant['type'] == 'image/webp' and not webp:
+                continue
+            if variant['encoding'] and variant['encoding'] not in request.accept_encodings:
+                continue
+            return variant
+        return variants[-1]
+
+    def response(self, path):
+        """Response for `path`, or None if the build doesn't have it."""
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+        variants = asset['variants']
+        variant = self._choose(variants)
+        rv = send_file(os.path.join(self.out_dir, variant['file']), mimetype=variant['type'],
+                       conditional=True, etag=variant['etag'], max_age=None)
+        if variant['encoding']:
+            rv.headers['Content-Encoding'] = variant['encoding']
+        if any(v['encoding'] for v in variants):
+            rv.vary.add('Accept-Encoding')
+        if any(v['type'] != variants[0]['type'] for v in variants):
+            rv.vary.add('Accept')
+        rv.headers['Cache-Control'] = IMMUTABLE if asset['immutable'] else 'no-cache'
+        return rv
@@ -0,0 +1,108 @@
+# backend/benchmarks/bench_api_payloads.py - trip list payload size and encode time: fields=, encoders, gzip
+#
+# Usage: python benchmarks/bench_api_payloads.py [--days 7] [--limit 100] [--rounds 200]
+#
+# Schedules --days of departures into a throwaway SQLite file and loads one
+# page of --limit trips. The page body is encoded the way Flask's default
+# provider did before (sorted keys; indented under FLASK_DEBUG) and with
+# FastJSONProvider (stdlib and, if installed, orjson), for all fields and
+# for the list-view subset. Reports bytes on the wire with and without gzip,
+# encode time, and the end-to-end /api/trips request for each variant.
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+_tmpdir = tempfile.mkdtemp(prefix='ridenaija-payloads-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'payloads.db')
+# Every request below encodes its page instead of replaying a cached body
+os.environ.setdefault('SEARCH_CACHE_TTL', '0')
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import app as ridenaija  # noqa: E402
+import json_provider  # noqa: E402
+from serializers import TRIP_FIELDS, parse_fields, serialize_trip  # noqa: E402
+
+LIST_VIEW_FIELDS = 'id,from_location,to_location,departure_time,price_per_seat,available_seats'
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def timed(fn, rounds):
+    latencies = []
+    for _ in range(rounds):
+        began = time.perf_counter()
+        result = fn()
+        latencies.append(time.perf_counter() - began)
+    latencies.sort()
+    return result, percentile(latencies, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    app, db = ridenaija.create_app(), ridenaija.db
+    with app.app_context():
+        ridenaija.migrations.upgrade(db.engine, db.metadata)
+        ridenaija.create_sample_data()
+        ridenaija.generate_trips(args.days)
+        trips, _ = ridenaija.search_trips('', '', None, None, args.limit)
+        subset = parse_fields(LIST_VIEW_FIELDS, TRIP_FIELDS)
+        pages = {
+            'all fields': {"success": True, "count": len(trips), "trips": [serialize_trip(t) for t in trips],
+                           "next_cursor": None},
+            'fields=list view': {"success": True, "count": len(trips),
+                                 "trips": [serialize_trip(t, subset) for t in trips], "next_cursor": None},
+        }
+
+    default = DefaultJSONProvider(app)
+    fast = json_provider.FastJSONProvider(app)
+    orjson = json_provider.orjson
+    # (name, encode, orjson module FastJSONProvider may use)
+    encoders = [
+        ('default (before)', lambda obj: default.dumps(obj).encode(), None),
+        ('default, debug', lambda obj: default.dumps(obj, indent=2).encode(), None),
+        ('fast, stdlib', fast.dumps_bytes, None),
+    ]
+    if orjson is not None:
+        encoders.append(('fast, orjson', fast.dumps_bytes, orjson))
+
+    print(f"{len(trips)} trips per page; orjson {'installed' if orjson else 'not installed'}")
+    print(f"{'payload':<18} {'encoder':<18} {'bytes':>8} {'gzip':>8} {'encode p50':>11} {'gzip p50':>9}")
+    for label, page in pages.items():
+        expected = json.loads(default.dumps(page))
+        for name, encode, json_provider.orjson in encoders:
+            body, encode_time = timed(lambda: encode(page), args.rounds)
+            compressed, gzip_time = timed(lambda: gzip.compress(body, compresslevel=6, mtime=0), args.rounds)
+            assert json.loads(body) == expected
+            print(f"{label:<18} {name:<18} {len(body):>8} {len(compressed):>8} "
+                  f"{encode_time * 1e6:>9.0f}us {gzip_time * 1e6:>7.0f}us")
+    json_provider.orjson = orjson
+
+    client = app.test_client()
+    print(f"\n{'GET /api/trips':<40} {'bytes':>8} {'p50':>9}")
+    for label, query, headers in (
+            ('all fields', {}, {}),
+            ('all fields, gzip', {}, {'Accept-Encoding': 'gzip'}),
+            ('fields=list view', {'fields': LIST_VIEW_FIELDS}, {}),
+            ('fields=list view, gzip', {'fields': LIST_VIEW_FIELDS}, {'Accept-Encoding': 'gzip'})):
+        query = dict(query, limit=args.limit)
+        response, latency = timed(lambda: client.get('/api/trips', query_string=query, headers=headers),
+                                  args.rounds)
+        print(f"{label:<40} {len(response.data):>8} {latency * 1000:>7.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
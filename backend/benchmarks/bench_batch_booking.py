@@ -0,0 +1,131 @@
+# backend/benchmarks/bench_batch_booking.py - round-trip bookings: two POST /api/bookings vs one batch call
+#
+# Usage: python benchmarks/bench_batch_booking.py [--clients 8] [--round-trips 25]
+#
+# Schedules a few days of departures into a throwaway SQLite file, then has
+# --clients logged-in passengers each book --round-trips outbound + return
+# pairs through the Flask test client, first as two /api/bookings calls per
+# pair and then as one /api/bookings/batch call. Reports round trips per
+# second, SQL statements and commits per round trip, and pairs left half
+# booked when the return leg sold out. Every trip starts each mode with
+# --seats seats.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+_tmpdir = tempfile.mkdtemp(prefix='ridenaija-batch-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'batch.db')
+os.environ['QUERY_COUNT_HEADER'] = '1'
+os.environ.setdefault('SLOW_REQUEST_MS', '0')
+
+from sqlalchemy import event  # noqa: E402
+
+import app as ridenaija  # noqa: E402
+from query_budget import QUERY_COUNT_HEADER  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def per_call(client, outbound, inbound):
+    first = client.post('/api/bookings', json={'trip_id': outbound, 'seats': 1})
+    if first.status_code != 201:
+        return False, False, int(first.headers[QUERY_COUNT_HEADER])
+    second = client.post('/api/bookings', json={'trip_id': inbound, 'seats': 1})
+    queries = int(first.headers[QUERY_COUNT_HEADER]) + int(second.headers[QUERY_COUNT_HEADER])
+    return second.status_code == 201, second.status_code != 201, queries
+
+
+def batch(client, outbound, inbound):
+    response = client.post('/api/bookings/batch', json={'bookings': [
+        {'trip_id': outbound, 'seats': 1}, {'trip_id': inbound, 'seats': 1}]})
+    return response.status_code == 201, False, int(response.headers[QUERY_COUNT_HEADER])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--round-trips', type=int, default=25, help='round trips booked per client and mode')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--seats', type=int, default=2, help='seats per trip, so some legs sell out')
+    args = parser.parse_args()
+
+    app, db = ridenaija.create_app(), ridenaija.db
+    with app.app_context():
+        ridenaija.migrations.upgrade(db.engine, db.metadata)
+        ridenaija.create_sample_data()
+        ridenaija.generate_trips(args.days)
+        for n in range(args.clients):
+            user = ridenaija.User(name=f'Passenger {n}', email=f'p{n}@batch.test', phone='0')
+            user.set_password('password123')
+            db.session.add(user)
+        db.session.commit()
+        now = ridenaija.datetime.utcnow()
+        trips = db.session.execute(db.select(ridenaija.Trip.id, ridenaija.Trip.from_location,
+                                             ridenaija.Trip.to_location).where(
+            ridenaija.Trip.departure_time > now)).all()
+        engine = db.engine
+    by_route = {}
+    for trip_id, from_loc, to_loc in trips:
+        by_route.setdefault((from_loc, to_loc), []).append(trip_id)
+    routes = [route for route in by_route if (route[1], route[0]) in by_route]
+
+    def round_trip(rng):
+        from_loc, to_loc = rng.choice(routes)
+        return rng.choice(by_route[(from_loc, to_loc)]), rng.choice(by_route[(to_loc, from_loc)])
+
+    commits = [0]
+    event.listen(engine, 'commit', lambda conn: commits.__setitem__(0, commits[0] + 1))
+
+    for label, book in (('two calls', per_call), ('batch call', batch)):
+        # Both modes start from the same --seats on every trip
+        with app.app_context():
+            db.session.execute(db.update(ridenaija.Trip).values(available_seats=args.seats))
+            db.session.commit()
+        results = {'booked': 0, 'half': 0, 'queries': 0}
+        latencies = []
+        lock = threading.Lock()
+        start = threading.Barrier(args.clients)
+
+        clients = []
+        for n in range(args.clients):
+            clients.append(app.test_client())
+            clients[n].post('/api/auth/login', json={'email': f'p{n}@batch.test', 'password': 'password123'})
+
+        def passenger(n):
+            client, rng = clients[n], random.Random(n)
+            start.wait()
+            for _ in range(args.round_trips):
+                began = time.perf_counter()
+                booked, half, queries = book(client, *round_trip(rng))
+                elapsed = time.perf_counter() - began
+                with lock:
+                    results['booked'] += booked
+                    results['half'] += half
+                    results['queries'] += queries
+                    latencies.append(elapsed)
+
+        threads = [threading.Thread(target=passenger, args=(n,)) for n in range(args.clients)]
+        commits[0] = 0
+        began = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - began
+        attempts = args.clients * args.round_trips
+        latencies.sort()
+        print(f"{label:<11} {results['booked'] / elapsed:6.1f} round trips/s  p50={percentile(latencies, 50) * 1000:6.1f}ms "
+              f"p95={percentile(latencies, 95) * 1000:6.1f}ms  {results['queries'] / attempts:4.1f} SQL and "
+              f"{commits[0] / attempts:3.1f} commits per round trip  {results['half']} left half booked")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# backend/benchmarks/bench_fare_calendar.py - month fare view: fare_calendar vs. a search per day
+#
+# Usage: python benchmarks/bench_fare_calendar.py [--days 365] [--months 200]
+#
+# Schedules --days of departures into a throwaway SQLite file, then builds
+# the same month view of cheapest fares for random routes two ways: one
+# /api/fares/calendar request, and one /api/trips request per day of the
+# month (what the frontend had to do before). Reports latency and SQL
+# statements per month view, and what keeping the aggregate costs a booking.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+_tmpdir = tempfile.mkdtemp(prefix='ridenaija-fares-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'fares.db')
+
+import app as ridenaija  # noqa: E402
+from catalog import ROUTES  # noqa: E402
+from query_budget import QUERY_COUNT_HEADER  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def per_day_searches(client, route, year, month):
+    day, queries = datetime(year, month, 1), 0
+    while day.month == month:
+        response = client.get('/api/trips', query_string={
+            'from': route['from'], 'to': route['to'], 'date': day.strftime('%Y-%m-%d'), 'limit': 100})
+        queries += int(response.headers[QUERY_COUNT_HEADER])
+        day += timedelta(days=1)
+    return queries
+
+
+def calendar(client, route, year, month):
+    response = client.get('/api/fares/calendar', query_string={
+        'from': route['from'], 'to': route['to'], 'month': f'{year:04}-{month:02}'})
+    return int(response.headers[QUERY_COUNT_HEADER])
+
+
+def report(label, latencies, queries):
+    latencies.sort()
+    print(f"{label:<18} p50={percentile(latencies, 50) * 1000:7.1f}ms p95={percentile(latencies, 95) * 1000:7.1f}ms "
+          f"{queries / len(latencies):6.1f} queries per month view")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--months', type=int, default=200)
+    args = parser.parse_args()
+
+    app, db = ridenaija.create_app(), ridenaija.db
+    with app.app_context():
+        ridenaija.migrations.upgrade(db.engine, db.metadata)
+        ridenaija.create_sample_data()
+        began = time.perf_counter()
+        trips = ridenaija.generate_trips(args.days)
+        print(f"{trips} trips scheduled in {time.perf_counter() - began:.1f}s (fare calendar kept as they went in)")
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    months = [(now.year + (now.month - 1 + n) // 12, (now.month - 1 + n) % 12 + 1)
+              for n in range(max(1, args.days // 31))]
+    views = [(rng.choice(ROUTES), *rng.choice(months)) for _ in range(args.months)]
+    client = app.test_client()
+    for label, view in (('per-day searches', per_day_searches), ('fare calendar', calendar)):
+        latencies, queries = [], 0
+        for route, year, month in views:
+            began = time.perf_counter()
+            queries += view(client, route, year, month)
+            latencies.append(time.perf_counter() - began)
+        report(label, latencies, queries)
+
+    with app.app_context():
+        trip = db.session.execute(db.select(ridenaija.Trip).where(
+            ridenaija.Trip.departure_time > now + timedelta(days=1)).limit(1)).scalar()
+        day = trip.departure_time.date()
+        began = time.perf_counter()
+        for _ in range(1000):
+            ridenaija.fare_calendar.refresh(trip.from_location, trip.to_location, day)
+        db.session.rollback()
+        print(f"refresh after a booking: {(time.perf_counter() - began) / 1000 * 1e6:.0f}us, one statement")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# backend/benchmarks/bench_ids.py - UUID4 keys vs. time-ordered ids
+#
+# Usage: python benchmarks/bench_ids.py [--rows 200000] [--commit-every 50] [--cache-kib 2000]
+#
+# Fills a bookings table twice in throwaway SQLite files: once the old way
+# (UUID4 keys, random references with a retry on every duplicate) and once
+# the new way (ids.new_id keys, references from SequenceBlocks). Reports
+# insert rate, database size before and after VACUUM (random keys leave
+# half-empty index pages behind), and how many random references collided.
+# --cache-kib stands in for a table that has outgrown the page cache.
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import create_engine, event, insert, text  # noqa: E402
+
+import ids  # noqa: E402
+from models import Booking, Sequence  # noqa: E402
+
+
+def legacy_scheme():
+    taken_refs, taken_receipts = set(), set()
+    collisions = 0
+
+    def unique(taken, prefix, alphabet, k):
+        nonlocal collisions
+        while True:
+            value = prefix + ''.join(random.choices(alphabet, k=k))
+            if value not in taken:
+                taken.add(value)
+                return value
+            collisions += 1  # an IntegrityError, i.e. a 500, before this change
+
+    def row():
+        return {
+            'id': str(uuid.uuid4()),
+            'booking_reference': unique(taken_refs, 'RNJ', string.ascii_uppercase + string.digits, 6),
+            'receipt_number': unique(taken_receipts, 'RCT', string.ascii_uppercase + string.digits, 8),
+        }
+    return row, lambda: collisions
+
+
+def sequence_scheme(engine):
+    numbers = ids.SequenceBlocks(SimpleNamespace(engine=engine), Sequence, 'bookings')
+
+    def row():
+        n = numbers.next()
+        return {'id': ids.new_id(), 'booking_reference': ids.booking_reference(n),
+                'receipt_number': ids.receipt_number(n)}
+    return row, lambda: 0
+
+
+def run(label, path, args, make_scheme):
+    engine = create_engine('sqlite:///' + path)
+
+    @event.listens_for(engine, 'connect')
+    def pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute(f'PRAGMA cache_size=-{args.cache_kib}')
+        cursor.close()
+
+    Booking.__table__.create(engine)
+    for index in Booking.__table__.indexes:
+        index.create(engine, checkfirst=True)
+    Sequence.__table__.create(engine)
+    next_row, collisions = make_scheme(engine)
+    trips = [next_row()['id'] for _ in range(2000)]
+    passengers = [next_row()['id'] for _ in range(1000)]
+
+    began = time.perf_counter()
+    done = 0
+    while done < args.rows:
+        batch = []
+        for _ in range(min(args.commit_every, args.rows - done)):
+            batch.append(dict(next_row(), trip_id=random.choice(trips), passenger_id=random.choice(passengers),
+                              seats=1, total_price=15000.0, status='pending', payment_status='pending',
+                              notes='', created_at=datetime.utcnow()))
+        with engine.begin() as conn:
+            conn.execute(insert(Booking.__table__), batch)
+        done += len(batch)
+    elapsed = time.perf_counter() - began
+
+    with engine.connect() as conn:
+        page_size = conn.execute(text('PRAGMA page_size')).scalar()
+        before = conn.execute(text('PRAGMA page_count')).scalar() * page_size
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text('VACUUM'))
+        after = conn.execute(text('PRAGMA page_count')).scalar() * page_size
+    engine.dispose()
+    print(f"{label:<10} {args.rows / elapsed:9,.0f} rows/s  {before / 2 ** 20:7.1f} MiB  "
+          f"{after / 2 ** 20:7.1f} MiB after VACUUM  {collisions():5} reference collisions")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--commit-every', type=int, default=50)
+    parser.add_argument('--cache-kib', type=int, default=2000)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='ridenaija-ids-')
+    print(f"{args.rows:,} bookings, {args.commit_every} per transaction, {args.cache_kib} KiB page cache")
+    run('uuid4', os.path.join(tmpdir, 'uuid4.db'), args, lambda engine: legacy_scheme())
+    run('ids', os.path.join(tmpdir, 'ids.db'), args, sequence_scheme)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# backend/benchmarks/bench_journeys.py - /api/journeys latency on a long timetable
+#
+# Usage: python benchmarks/bench_journeys.py [--days 365] [--queries 500] [--max-transfers 2]
+#
+# Schedules --days of departures into a throwaway SQLite file, then plans
+# journeys between random pairs of cities on random days through the test
+# client, both criteria per request. Reports the connection index load time,
+# request latency percentiles and the cost of the incremental updates
+# bookings and the scheduler make.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+_tmpdir = tempfile.mkdtemp(prefix='ridenaija-journeys-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'journeys.db')
+
+import app as ridenaija  # noqa: E402
+from catalog import ROUTES  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--max-transfers', type=int, default=2)
+    args = parser.parse_args()
+
+    app, db = ridenaija.create_app(), ridenaija.db
+    with app.app_context():
+        ridenaija.migrations.upgrade(db.engine, db.metadata)
+        ridenaija.create_sample_data()
+        ridenaija.generate_trips(args.days)
+        began = time.perf_counter()
+        index = ridenaija.ensure_connection_index()
+        print(f"connection index: {len(index)} trips loaded in {(time.perf_counter() - began) * 1000:.0f}ms")
+
+    cities = sorted({route['from'] for route in ROUTES} | {route['to'] for route in ROUTES})
+    rng = random.Random(42)
+    client = app.test_client()
+    latencies, found, legs = [], 0, 0
+    for _ in range(args.queries):
+        origin, destination = rng.sample(cities, 2)
+        day = (datetime.utcnow() + timedelta(days=rng.randrange(args.days))).strftime('%Y-%m-%d')
+        began = time.perf_counter()
+        response = client.get('/api/journeys', query_string={
+            'from': origin, 'to': destination, 'date': day, 'max_transfers': args.max_transfers})
+        latencies.append(time.perf_counter() - began)
+        journeys = response.get_json()['journeys']
+        found += bool(journeys)
+        legs = max([legs] + [len(j['legs']) for j in journeys])
+
+    latencies.sort()
+    print(f"{args.queries} requests, {found} with a journey (up to {legs} legs): "
+          f"p50={percentile(latencies, 50) * 1000:.1f}ms p95={percentile(latencies, 95) * 1000:.1f}ms "
+          f"p99={percentile(latencies, 99) * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms")
+
+    trip_ids = list(index._by_trip)
+    began = time.perf_counter()
+    for trip_id in trip_ids[:10000]:
+        index.update_seats(trip_id, 5)
+    seat_us = (time.perf_counter() - began) / min(10000, len(trip_ids)) * 1e6
+    departure = datetime.utcnow() + timedelta(days=args.days // 2, minutes=7)
+    began = time.perf_counter()
+    for n in range(1000):
+        index.add(f'bench-{n}', 'Lagos', 'Abuja', departure + timedelta(seconds=n),
+                  departure + timedelta(hours=11), 15000, 10)
+    add_us = (time.perf_counter() - began) / 1000 * 1e6
+    print(f"incremental updates: seat change {seat_us:.1f}us, new trip {add_us:.1f}us")
+
+
+if __name__ == '__main__':
+    main()
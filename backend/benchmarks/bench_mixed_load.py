@@ -0,0 +1,166 @@
+# backend/benchmarks/bench_mixed_load.py - mixed read/write load per database profile
+#
+# Usage: python benchmarks/bench_mixed_load.py [--readers 6] [--writers 3] [--seconds 10]
+#                                              [--profiles default,tuned] [--database-url URL]
+#
+# Each reader and writer is a separate process with its own app and
+# connection pool, like gunicorn workers. Readers page through booking
+# history and fetch single bookings; writers book a seat and pay for it.
+# Profiles:
+#   default  SQLite with stock settings (rollback journal, synchronous=FULL)
+#   tuned    SQLite with the config.py profile (WAL, busy_timeout, NORMAL, mmap)
+#   server   --database-url (e.g. postgresql://...) with the DB_POOL_* settings
+# Reports throughput, p50/p95/p99 latency and failed requests per profile.
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as ridenaija  # noqa: E402
+from config import Config, ProductionConfig  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+PASSWORD = 'password123'
+
+
+def profile_config(profile, url):
+    overrides = {'SQLALCHEMY_DATABASE_URI': url, 'TESTING': False, 'SECRET_KEY': Config.SECRET_KEY,
+                 'PAYMENT_PROVIDER': Config.PAYMENT_PROVIDER, 'ALLOW_FAKE_PAYMENTS': True,
+                 'ALLOW_PUBLIC_METRICS': True}
+    if profile == 'default':
+        overrides.update(SQLITE_JOURNAL_MODE=None, SQLITE_SYNCHRONOUS=None,
+                         SQLITE_MMAP_SIZE=None, SQLITE_CACHE_SIZE=None)
+    return type(f'{profile.title()}BenchConfig', (ProductionConfig,), overrides)
+
+
+def setup(config, users, seats):
+    app = ridenaija.create_app(config)
+    db = ridenaija.db
+    with app.app_context():
+        db.drop_all()
+        ridenaija.migrations.upgrade(db.engine, db.metadata)
+        driver = ridenaija.User(name='Bench Driver', email='driver@bench.test', phone='0', role='driver')
+        driver.set_password(PASSWORD)
+        db.session.add(driver)
+        for n in range(users):
+            user = ridenaija.User(name=f'Passenger {n}', email=f'p{n}@bench.test', phone='0')
+            user.set_password(PASSWORD)
+            db.session.add(user)
+        db.session.flush()
+        departure = datetime.utcnow() + timedelta(days=1)
+        trip = ridenaija.Trip(driver_id=driver.id, from_location='Lagos', to_location='Abuja',
+                              departure_time=departure, arrival_time=departure + timedelta(hours=11),
+                              available_seats=seats, price_per_seat=15000)
+        db.session.add(trip)
+        db.session.commit()
+        pragmas = ridenaija.database.pragma_values(db.session.connection())
+        trip_id = trip.id
+        db.engine.dispose()
+    return trip_id, pragmas
+
+
+def worker(config, role, n, trip_id, start_at, stop_at, results):
+    app = ridenaija.create_app(config)
+    client = app.test_client()
+    client.post('/api/auth/login', json={'email': f'p{n}@bench.test', 'password': PASSWORD})
+    latencies, errors = [], 0
+    booking_ids = []
+    while time.time() < start_at:
+        time.sleep(0.001)
+    while time.time() < stop_at:
+        began = time.perf_counter()
+        if role == 'writer':
+            response = client.post('/api/bookings', json={'trip_id': trip_id, 'seats': 1})
+            ok = response.status_code == 201
+            if ok:
+                booking_id = response.get_json()['booking']['id']
+                ok = client.post('/api/payment/process', json={'booking_id': booking_id}).status_code == 202
+        elif booking_ids and len(latencies) % 2:
+            ok = client.get(f'/api/bookings/{booking_ids[len(latencies) % len(booking_ids)]}').status_code == 200
+        else:
+            response = client.get('/api/bookings/user?limit=20')
+            ok = response.status_code == 200
+            if ok and not booking_ids:
+                booking_ids = [b['id'] for b in response.get_json()['bookings']]
+        latencies.append(time.perf_counter() - began)
+        errors += not ok
+    results.put((role, latencies, errors))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def run(profile, url, args):
+    config = profile_config(profile, url)
+    users = args.readers + args.writers
+    trip_id, pragmas = setup(config, users, seats=1_000_000)
+
+    # Give readers some history to page through
+    app = ridenaija.create_app(config)
+    with app.app_context():
+        for n in range(args.writers, users):
+            client = app.test_client()
+            client.post('/api/auth/login', json={'email': f'p{n}@bench.test', 'password': PASSWORD})
+            for _ in range(20):
+                client.post('/api/bookings', json={'trip_id': trip_id, 'seats': 1})
+        ridenaija.db.engine.dispose()
+
+    results = multiprocessing.Queue()
+    start_at = time.time() + 1.0
+    stop_at = start_at + args.seconds
+    roles = [('writer', n) for n in range(args.writers)] + \
+            [('reader', n) for n in range(args.writers, users)]
+    procs = [multiprocessing.Process(target=worker, args=(config, role, n, trip_id, start_at, stop_at, results))
+             for role, n in roles]
+    for p in procs:
+        p.start()
+    collected = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    print(f"\n[{profile}] {make_url(url).render_as_string(hide_password=True)}")
+    if pragmas:
+        print("  " + " ".join(f"{k}={v}" for k, v in pragmas.items()))
+    for role in ('reader', 'writer'):
+        latencies = sorted(l for r, ls, _ in collected if r == role for l in ls)
+        errors = sum(e for r, _, e in collected if r == role)
+        ms = [v * 1000 for v in (percentile(latencies, 50), percentile(latencies, 95), percentile(latencies, 99))]
+        print(f"  {role}s: {len(latencies) / args.seconds:8.1f} req/s  "
+              f"p50={ms[0]:6.1f}ms p95={ms[1]:6.1f}ms p99={ms[2]:6.1f}ms  failed={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--readers', type=int, default=6)
+    parser.add_argument('--writers', type=int, default=3)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--profiles', default='default,tuned')
+    parser.add_argument('--database-url', help='server database for the "server" profile')
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='ridenaija-mixed-')
+    profiles = args.profiles.split(',')
+    if args.database_url and 'server' not in profiles:
+        profiles.append('server')
+    for profile in profiles:
+        if profile == 'server':
+            if not args.database_url:
+                print("\n[server] skipped: pass --database-url")
+                continue
+            url = ridenaija.database.normalize_database_url(args.database_url)
+        else:
+            url = 'sqlite:///' + os.path.join(tmpdir, f'{profile}.db')
+        run(profile, url, args)
+
+
+if __name__ == '__main__':
+    multiprocessing.set_start_method('fork')
+    main()
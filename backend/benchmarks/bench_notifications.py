@@ -0,0 +1,123 @@
+# backend/benchmarks/bench_notifications.py - outbox email throughput
+#
+# Usage: python benchmarks/bench_notifications.py [--emails 5000] [--connect-ms 150] [--send-ms 5]
+#                                                 [--smtp host:port]
+#
+# Queues --emails booking confirmations in the outbox (the jobs table) and
+# drains them with the job worker pool under a few configurations. By
+# default messages go to .eml files through a transport that adds
+# --connect-ms per SMTP connection and --send-ms per message, roughly what
+# a hosted SMTP relay costs; --smtp sends to a real server instead (e.g.
+# `python -m aiosmtpd -n -l localhost:8025`).
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+_tmpdir = tempfile.mkdtemp(prefix='ridenaija-notify-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'notify.db')
+
+import app as ridenaija  # noqa: E402
+from notifications import NOTIFICATIONS_QUEUE, FileTransport, SMTPTransport  # noqa: E402
+
+
+class SimulatedRelay(FileTransport):
+    """FileTransport that pays a connection and per-message cost like a remote relay."""
+
+    def __init__(self, directory, connect_ms, send_ms):
+        super().__init__(directory)
+        self.connect_ms = connect_ms
+        self.send_ms = send_ms
+        self.connected = False
+
+    def open(self):
+        super().open()
+        if not self.connected:
+            time.sleep(self.connect_ms / 1000)
+            self.connected = True
+
+    def send(self, message):
+        time.sleep(self.send_ms / 1000)
+        super().send(message)
+
+
+def queue_emails(db, count):
+    now = datetime.utcnow()
+    for n in range(count):
+        ridenaija.notification_service.queue('booking_confirmed', {
+            "to": f"passenger{n}@bench.test", "name": f"Passenger {n}", "booking_id": f"bench-{now:%H%M%S%f}-{n}",
+            "booking_reference": f"RNJ{n:06d}", "receipt_number": f"RCT{n:08d}", "seats": 1,
+            "total_price": 15000.0, "from_location": "Lagos", "to_location": "Abuja",
+            "departure": "Mon 01 Jan 2030, 08:00", "driver_name": "John Driver", "hold_expires_at": "",
+        })
+    db.session.commit()
+
+
+def drain(app, db, threads, batch_size, reuse, make_transport, total):
+    ridenaija.notification_service.configure('noreply@ridenaija.ng', make_transport)
+    handler = ridenaija.notification_service.send_batch
+    if not reuse:
+        def handler(jobs):
+            try:
+                return ridenaija.notification_service.send_batch(jobs)
+            finally:
+                ridenaija.notification_service.close()
+    began = time.perf_counter()
+    stop = ridenaija.start_job_worker(app, ridenaija.job_queue, {NOTIFICATIONS_QUEUE: handler}, 0.05,
+                                      threads, batch_sizes={NOTIFICATIONS_QUEUE: batch_size})
+    with app.app_context():
+        while True:
+            counts = ridenaija.job_queue.stats(NOTIFICATIONS_QUEUE).get(NOTIFICATIONS_QUEUE, {})
+            if counts.get('done', 0) + counts.get('dead', 0) >= total:
+                break
+            db.session.remove()
+            time.sleep(0.05)
+    stop.set()
+    return time.perf_counter() - began, counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--emails', type=int, default=5000)
+    parser.add_argument('--connect-ms', type=float, default=150)
+    parser.add_argument('--send-ms', type=float, default=5)
+    parser.add_argument('--smtp', help='host:port of a real SMTP server (no TLS, no auth)')
+    args = parser.parse_args()
+
+    app, db = ridenaija.create_app(), ridenaija.db
+    with app.app_context():
+        ridenaija.migrations.upgrade(db.engine, db.metadata)
+
+    outbox = os.path.join(_tmpdir, 'outbox')
+    configurations = [
+        # (threads, batch size, keep connection between batches)
+        (1, 1, False),
+        (1, 50, True),
+        (4, 50, True),
+        (8, 100, True),
+    ]
+    total = 0
+    for threads, batch_size, reuse in configurations:
+        if args.smtp:
+            host, _, port = args.smtp.partition(':')
+            make_transport = lambda: SMTPTransport(host, int(port or 25), use_tls=False)  # noqa: E731
+        else:
+            make_transport = lambda: SimulatedRelay(outbox, args.connect_ms, args.send_ms)  # noqa: E731
+        emails = args.emails if batch_size > 1 else min(args.emails, 500)
+        with app.app_context():
+            queue_emails(db, emails)
+        total += emails
+        elapsed, counts = drain(app, db, threads, batch_size, reuse, make_transport, total)
+        print(f"threads={threads} batch={batch_size:<3} reuse={'yes' if reuse else 'no '} "
+              f"{emails} emails in {elapsed:6.2f}s = {emails / elapsed:7.1f} emails/s  dead={counts.get('dead', 0)}")
+        if os.path.isdir(outbox):
+            shutil.rmtree(outbox)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# backend/benchmarks/bench_payments.py - payment start latency vs. provider latency
+#
+# Usage: python benchmarks/bench_payments.py [--payments 200] [--provider-latency 0.5] [--threads 4]
+#
+# Books --payments seats and starts a payment for each through the test
+# client, against the fake Paystack with --provider-latency seconds per
+# verify call. Request latency should not depend on the provider; the job
+# worker (--threads) then settles everything in the background. A
+# duplicate, correctly signed webhook is sent for every payment to check
+# that each booking is still confirmed exactly once.
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+_tmpdir = tempfile.mkdtemp(prefix='ridenaija-payments-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'payments.db')
+
+import app as ridenaija  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--payments', type=int, default=200)
+    parser.add_argument('--provider-latency', type=float, default=0.5)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    app, db = ridenaija.create_app(), ridenaija.db
+    app.config['FAKE_PAYMENT_LATENCY'] = args.provider_latency
+    ridenaija.payment_service.configure(ridenaija.make_provider(app.config))
+    with app.app_context():
+        ridenaija.migrations.upgrade(db.engine, db.metadata)
+        ridenaija.create_sample_data()
+        driver = ridenaija.User.query.filter_by(role='driver').first()
+        departure = datetime.utcnow() + timedelta(days=1)
+        trip = ridenaija.Trip(driver_id=driver.id, from_location='Lagos', to_location='Abuja',
+                              departure_time=departure, arrival_time=departure + timedelta(hours=11),
+                              available_seats=args.payments, price_per_seat=15000)
+        db.session.add(trip)
+        db.session.commit()
+        trip_id = trip.id
+
+    client = app.test_client()
+    client.post('/api/auth/login', json={'email': 'passenger@ridenaija.com', 'password': 'password123'})
+    references, latencies = [], []
+    for n in range(args.payments):
+        booking = client.post('/api/bookings', json={'trip_id': trip_id, 'seats': 1}).get_json()['booking']
+        began = time.perf_counter()
+        response = client.post('/api/payment/process', json={'booking_id': booking['id']},
+                               headers={'Idempotency-Key': f'bench-{n}'})
+        latencies.append(time.perf_counter() - began)
+        assert response.status_code == 202, response.get_json()
+        references.append(response.get_json()['payment'])
+
+    provider = ridenaija.payment_service.provider
+    webhook_client = app.test_client()
+    for payment in references:
+        body, signature = provider.signed_webhook(payment['reference'], amount=payment['amount'])
+        for _ in range(2):
+            webhook_client.post('/api/payment/webhook', data=body,
+                                headers={ridenaija.SIGNATURE_HEADER: signature})
+
+    latencies.sort()
+    print(f"provider latency {args.provider_latency * 1000:.0f}ms per verify")
+    print(f"POST /api/payment/process: p50={percentile(latencies, 50) * 1000:.1f}ms "
+          f"p95={percentile(latencies, 95) * 1000:.1f}ms p99={percentile(latencies, 99) * 1000:.1f}ms")
+
+    began = time.perf_counter()
+    stop = ridenaija.run_job_worker(app, args.threads)
+    with app.app_context():
+        while True:
+            counts = ridenaija.job_queue.stats(ridenaija.PAYMENTS_QUEUE).get(ridenaija.PAYMENTS_QUEUE, {})
+            if not counts.get('queued') and not counts.get('running'):
+                break
+            db.session.remove()
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - began
+        stop.set()
+        paid = ridenaija.Booking.query.filter_by(trip_id=trip_id, payment_status='paid').count()
+        statuses = dict(db.session.query(ridenaija.Payment.status, db.func.count()).group_by(
+            ridenaija.Payment.status).all())
+        confirmed_holds = ridenaija.SeatHold.query.filter_by(trip_id=trip_id, status='confirmed').count()
+
+    print(f"settled {sum(counts.values())} jobs with {args.threads} worker threads in {elapsed:.2f}s: {counts}")
+    print(f"payments {statuses}; bookings paid {paid}/{args.payments}; holds confirmed {confirmed_holds}")
+    if paid != args.payments or statuses != {'success': args.payments} or confirmed_holds != args.payments:
+        print("❌ Payments did not settle exactly once")
+        sys.exit(1)
+    print("✅ Every booking confirmed exactly once")
+
+
+if __name__ == '__main__':
+    main()
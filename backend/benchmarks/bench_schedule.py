@@ -0,0 +1,39 @@
+# backend/benchmarks/bench_schedule.py - timetable generation timing
+#
+# Usage: python benchmarks/bench_schedule.py [--days 365]
+#
+# Runs generate_trips against a throwaway SQLite file twice: a cold run that
+# fills the whole horizon, then a warm run that should find nothing missing.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+_tmpdir = tempfile.mkdtemp(prefix='ridenaija-schedule-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'schedule.db')
+
+import app as ridenaija  # noqa: E402
+from scheduler import ROUTES  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+
+    with ridenaija.create_app().app_context():
+        ridenaija.db.create_all()
+        for label in ('cold', 'warm'):
+            began = time.perf_counter()
+            created = ridenaija.generate_trips(args.days)
+            elapsed = time.perf_counter() - began
+            print(f"{label}: {created} trips in {elapsed:.2f}s ({created / elapsed:,.0f} trips/s)")
+        total = ridenaija.Trip.query.count()
+        print(f"trips table: {total} rows for {args.days} days x {len(ROUTES)} routes")
+
+
+if __name__ == '__main__':
+    main()
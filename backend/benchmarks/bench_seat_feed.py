@@ -0,0 +1,117 @@
+# backend/benchmarks/bench_seat_feed.py - idle stream cost, fan-out latency and coalescing of SeatFeed
+#
+# Usage: python benchmarks/bench_seat_feed.py [--streams 2000] [--trips 200] [--burst 50]
+#
+# Opens --streams subscriptions, each watching 3 of --trips trips, and runs
+# sse_stream for every one on its own thread (what a gthread or gevent worker
+# does per connection). Reports resident memory per idle stream, the time from
+# publish() until every watcher of a trip has its event, and how many events
+# a burst of --burst seat changes on one trip turns into per watcher.
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from seat_feed import SeatFeed, sse_stream  # noqa: E402
+
+
+def rss_kib():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def payload(event):
+    return json.loads(event.split('data: ', 1)[1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=2000)
+    parser.add_argument('--trips', type=int, default=200)
+    parser.add_argument('--burst', type=int, default=50)
+    parser.add_argument('--coalesce-ms', type=int, default=250)
+    args = parser.parse_args()
+
+    threading.stack_size(256 * 1024)
+    feed = SeatFeed(max_subscribers=args.streams)
+    rng = random.Random(42)
+    trip_ids = [f'trip-{n}' for n in range(args.trips)]
+    seats = {trip_id: 14 for trip_id in trip_ids}
+    received = {}  # trip_id -> [(perf_counter, seats)] over all watchers
+    lock = threading.Lock()
+    start = threading.Event()
+
+    def consume(subscription, snapshot):
+        start.wait()
+        for event in sse_stream(feed, subscription, snapshot, coalesce=args.coalesce_ms / 1000,
+                                heartbeat=3600, lifetime=3600):
+            if not event.startswith('event: seats'):
+                continue
+            now = time.perf_counter()
+            with lock:
+                for trip_id, count in payload(event).items():
+                    received.setdefault(trip_id, []).append((now, count))
+
+    before = rss_kib()
+    watchers = {trip_id: 0 for trip_id in trip_ids}
+    for _ in range(args.streams):
+        watched = rng.sample(trip_ids, 3)
+        for trip_id in watched:
+            watchers[trip_id] += 1
+        subscription, snapshot = feed.subscribe({trip_id: seats[trip_id] for trip_id in watched})
+        threading.Thread(target=consume, args=(subscription, snapshot), daemon=True).start()
+    start.set()
+    time.sleep(1)
+    with lock:
+        received.clear()
+    print(f"{args.streams} idle streams: {(rss_kib() - before) / args.streams:.1f} KiB resident each, "
+          f"{threading.active_count() - 1} threads")
+
+    # Fan-out: one change, time until every watcher of the trip has it
+    latencies = []
+    for trip_id in rng.sample(trip_ids, 20):
+        seats[trip_id] -= 1
+        began = time.perf_counter()
+        feed.publish({trip_id: seats[trip_id]})
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            with lock:
+                arrivals = [t for t, count in received.get(trip_id, []) if count == seats[trip_id]]
+            if len(arrivals) >= watchers[trip_id]:
+                break
+            time.sleep(0.001)
+        latencies.append(max(arrivals) - began - args.coalesce_ms / 1000)
+    latencies.sort()
+    print(f"fan-out to ~{args.streams * 3 // args.trips} watchers (past the {args.coalesce_ms}ms coalescing "
+          f"window): p50={percentile(latencies, 50) * 1000:.1f}ms max={latencies[-1] * 1000:.1f}ms")
+
+    # Coalescing: a burst of bookings on one trip
+    trip_id = max(trip_ids, key=watchers.get)
+    with lock:
+        received.pop(trip_id, None)
+    for _ in range(args.burst):
+        seats[trip_id] -= 1 if seats[trip_id] > 0 else -14
+        feed.publish({trip_id: seats[trip_id]})
+        time.sleep(0.002)
+    time.sleep(args.coalesce_ms / 1000 * 3)
+    with lock:
+        events = received.get(trip_id, [])
+        final = sum(1 for _, count in events if count == seats[trip_id])
+    print(f"burst of {args.burst} changes over {args.burst * 2}ms: {len(events) / watchers[trip_id]:.1f} events "
+          f"per watcher, {final}/{watchers[trip_id]} watchers ended on the final count")
+
+
+if __name__ == '__main__':
+    main()
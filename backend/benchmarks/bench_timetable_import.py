@@ -0,0 +1,80 @@
+# backend/benchmarks/bench_timetable_import.py - `flask import-timetable` rows per second and memory vs file size
+#
+# Usage: python benchmarks/bench_timetable_import.py [--rows 10000,100000] [--reject-every 10]
+#
+# Writes a synthetic operator CSV of each --rows size (every --reject-every
+# row is invalid) and imports it into a fresh throwaway SQLite file, then
+# imports it again so every departure is an update. Reports rows per second
+# for both passes, and the peak Python memory traced during a third pass,
+# which should stay flat as the file grows.
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as ridenaija  # noqa: E402
+from config import get_config  # noqa: E402
+
+_tmpdir = tempfile.mkdtemp(prefix='ridenaija-timetable-')
+
+CITIES = ['Lagos', 'Abuja', 'Port Harcourt', 'Kano', 'Ibadan', 'Enugu', 'Benin City', 'Jos']
+
+
+def write_timetable(path, rows, reject_every):
+    base = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['departure_id', 'from', 'to', 'departure_time', 'arrival_time', 'seats', 'price',
+                         'car_plate', 'amenities'])
+        for n in range(rows):
+            from_loc = CITIES[n % len(CITIES)]
+            to_loc = CITIES[(n // len(CITIES) + n + 1) % len(CITIES)]
+            if to_loc == from_loc:
+                to_loc = CITIES[(CITIES.index(from_loc) + 1) % len(CITIES)]
+            departs = base + timedelta(minutes=7 * n)
+            price = 5000 + n % 9 * 500 if n % reject_every else -1
+            writer.writerow([f'D{n}', from_loc, to_loc, departs.isoformat(), (departs + timedelta(hours=6)).isoformat(),
+                             18, price, f'RNJ{n % 1000:03d}', 'AC;WiFi'])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', default='10000,100000', help='comma-separated file sizes to import')
+    parser.add_argument('--reject-every', type=int, default=10)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.rows.split(',')]
+
+    print(f"{'rows':>9} {'file MB':>8} {'insert rows/s':>14} {'update rows/s':>14} {'peak MB':>8} {'rejected':>9}")
+    for size in sizes:
+        path = os.path.join(_tmpdir, f'timetable-{size}.csv')
+        write_timetable(path, size, args.reject_every)
+        config = type('TimetableBenchConfig', (get_config(),),
+                      {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(_tmpdir, f'{size}.db')})
+        app = ridenaija.create_app(config)
+        with app.app_context():
+            ridenaija.migrations.upgrade(ridenaija.db.engine, ridenaija.db.metadata)
+            ridenaija.create_sample_data()
+            driver = ridenaija.default_driver()
+            with open(path, 'rb') as f:
+                inserted = ridenaija.import_timetable(f, path, 'BENCH', driver)
+            with open(path, 'rb') as f:
+                updated = ridenaija.import_timetable(f, path, 'BENCH', driver)
+            assert updated['updated'] == inserted['inserted']
+            # Traced separately; tracemalloc slows the import it watches several times over
+            tracemalloc.start()
+            with open(path, 'rb') as f:
+                ridenaija.import_timetable(f, path, 'BENCH', driver)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            ridenaija.db.engine.dispose()
+        print(f"{size:>9,} {os.path.getsize(path) / 1e6:>8.1f} {inserted['rows_per_second']:>14,.0f} "
+              f"{updated['rows_per_second']:>14,.0f} {peak / 1e6:>8.1f} {inserted['rejected']:>9,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# backend/benchmarks/bench_trip_search.py - trip search latency vs. table size
+#
+# Usage: python benchmarks/bench_trip_search.py [--sizes 10000,100000,1000000] [--sql]
+#
+# Builds a synthetic timetable of N trips, then times (from, to, date) lookups
+# through TripIndex. With --sql the same lookups also run as the old
+# ILIKE + date() query against an in-memory SQLite table for comparison.
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from trip_index import TripIndex
+
+CITIES = ['Lagos', 'Abuja', 'Port Harcourt', 'Ibadan', 'Kano', 'Enugu', 'Benin City', 'Calabar',
+          'Ilorin', 'Jos', 'Maiduguri', 'Sokoto', 'Oyo', 'Abeokuta', 'Owerri', 'Akure', 'Minna', 'Bauchi']
+ROUTES = [(a, b) for a in CITIES for b in CITIES if a != b]
+SLOTS = [8, 12, 16]
+
+
+def synthetic_trips(count, start):
+    per_day = len(ROUTES) * len(SLOTS)
+    for n in range(count):
+        day, rest = divmod(n, per_day)
+        route, slot = divmod(rest, len(SLOTS))
+        departure = start + timedelta(days=day, hours=SLOTS[slot])
+        yield str(uuid.uuid4()), ROUTES[route][0], ROUTES[route][1], departure, random.randint(0, 14), 0
+
+
+def time_queries(fn, queries):
+    samples = []
+    for query in queries:
+        began = time.perf_counter()
+        fn(*query)
+        samples.append((time.perf_counter() - began) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--sql', action='store_true', help='also time the unindexed SQL query')
+    args = parser.parse_args()
+
+    now = datetime(2030, 1, 1)
+    print(f"{'trips':>10} {'index p50 ms':>13} {'index p95 ms':>13} {'sql p50 ms':>11}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        rows = list(synthetic_trips(size, now))
+        days = max(1, size // (len(ROUTES) * len(SLOTS)))
+        queries = []
+        for _ in range(args.queries):
+            origin, destination = random.choice(ROUTES)
+            queries.append((origin.lower(), destination, (now + timedelta(days=random.randrange(days))).date()))
+
+        index = TripIndex()
+        index.load(rows)
+        p50, p95 = time_queries(lambda f, t, d: index.search(f, t, d, now=now), queries)
+
+        sql_p50 = ''
+        if args.sql:
+            conn = sqlite3.connect(':memory:')
+            conn.execute('CREATE TABLE trips (id TEXT PRIMARY KEY, from_location TEXT, to_location TEXT, '
+                         'departure_time TIMESTAMP, available_seats INTEGER, status TEXT)')
+            conn.executemany("INSERT INTO trips VALUES (?, ?, ?, ?, ?, 'scheduled')",
+                             ((r[0], r[1], r[2], r[3].isoformat(sep=' '), r[4]) for r in rows))
+            sql = ("SELECT id FROM trips WHERE status = 'scheduled' AND available_seats > 0 "
+                   "AND from_location LIKE ? AND to_location LIKE ? AND date(departure_time) = ? "
+                   "AND departure_time >= ? ORDER BY departure_time")
+            sql_p50, _ = time_queries(
+                lambda f, t, d: conn.execute(sql, (f'%{f}%', f'%{t}%', d.isoformat(), now.isoformat(sep=' '))).fetchall(),
+                queries[:50])
+            sql_p50 = f'{sql_p50:.3f}'
+            conn.close()
+
+        print(f'{size:>10} {p50:>13.4f} {p95:>13.4f} {sql_p50:>11}')
+
+
+if __name__ == '__main__':
+    main()
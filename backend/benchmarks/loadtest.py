@@ -0,0 +1,410 @@
+# backend/benchmarks/loadtest.py - seeded load test for the booking API
+#
+# Usage:
+#   python benchmarks/loadtest.py [--users 500] [--trips 5000] [--bookings 20000]
+#                                 [--clients 8] [--duration 20] [--mix default]
+#                                 [--json results.json] [--baseline previous.json]
+#   python benchmarks/loadtest.py --seed-only --database-url sqlite:////tmp/load.db ...
+#   python benchmarks/loadtest.py --base-url http://127.0.0.1:8000 --no-seed ...
+#
+# Seeds a synthetic dataset of --users passengers, about --trips departures
+# (generate_trips over enough days) and --bookings paid bookings, then has
+# --clients concurrent virtual passengers replay a weighted traffic mix. By
+# default requests go through the Flask test client against a throwaway
+# SQLite file; with --base-url they go over HTTP to a running server (seed
+# its database first with --seed-only and the same --database-url).
+#
+# Reports per endpoint: requests, failures, throughput, p50/p95/p99 latency
+# and SQL queries per request (from the X-SQL-Queries header, so servers
+# need QUERY_COUNT_HEADER=1). --json writes the same numbers for later runs
+# to compare against with --baseline.
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+PASSWORD = 'password123'
+
+MIXES = {
+    # Mostly people looking for a bus, some of whom book and pay
+    'default': {'search': 60, 'history': 15, 'book': 10, 'pay': 8, 'login': 7},
+    'browse': {'search': 85, 'history': 10, 'login': 5},
+    'checkout': {'search': 20, 'book': 40, 'pay': 35, 'login': 5},
+    'history': {'history': 90, 'login': 10},
+}
+
+
+def parse_mix(value):
+    """A name from MIXES or 'search=50,book=20,...'."""
+    if value in MIXES:
+        return dict(MIXES[value])
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('search', 'history', 'book', 'pay', 'login'):
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name] = float(weight)
+    return mix
+
+
+def user_email(n):
+    return f'load{n}@bench.test'
+
+
+# ==================== DATASET ====================
+
+def seed(app, users, trips, bookings, rng):
+    """Fill an empty database; returns how many days of departures were scheduled."""
+    import app as ridenaija
+    from scheduler import ROUTES, TIME_SLOTS
+
+    db, User, Trip, Booking = ridenaija.db, ridenaija.User, ridenaija.Trip, ridenaija.Booking
+    days = max(1, math.ceil(trips / (len(ROUTES) * len(TIME_SLOTS))))
+    with app.app_context():
+        ridenaija.migrations.upgrade(db.engine, db.metadata)
+        ridenaija.create_sample_data()
+
+        began = time.perf_counter()
+        # Hashing is deliberately slow; every synthetic passenger shares one hash
+        template = User(name='template')
+        template.set_password(PASSWORD)
+        now = datetime.utcnow()
+        rows = [{
+            'id': f'load-user-{n:07d}',
+            'name': f'Load Passenger {n}',
+            'email': user_email(n),
+            'phone': '08000000000',
+            'password_hash': template.password_hash,
+            'role': 'passenger',
+            'rating': 5.0,
+            'created_at': now,
+        } for n in range(users)]
+        for start in range(0, len(rows), 5000):
+            db.session.execute(db.insert(User), rows[start:start + 5000])
+        db.session.commit()
+        print(f"seeded {users} users in {time.perf_counter() - began:.1f}s")
+
+        began = time.perf_counter()
+        created = ridenaija.generate_trips(days)
+        print(f"seeded {created} trips over {days} days in {time.perf_counter() - began:.1f}s")
+
+        began = time.perf_counter()
+        # Fill trips round-robin, always leaving seats free for the live traffic
+        open_trips = [list(row) for row in db.session.query(Trip.id, Trip.available_seats, Trip.price_per_seat)]
+        rng.shuffle(open_trips)
+        rows, taken = [], {}
+        position = 0
+        while len(rows) < bookings and open_trips:
+            position %= len(open_trips)
+            trip = open_trips[position]
+            if trip[1] - taken.get(trip[0], 0) <= 2:
+                open_trips.pop(position)
+                continue
+            taken[trip[0]] = taken.get(trip[0], 0) + 1
+            n = len(rows)
+            rows.append({
+                'id': f'load-booking-{n:08d}',
+                'trip_id': trip[0],
+                'passenger_id': f'load-user-{rng.randrange(users):07d}',
+                'seats': 1,
+                'total_price': trip[2],
+                'status': 'confirmed',
+                'payment_status': 'paid',
+                'booking_reference': f'LD{n:08d}',
+                'receipt_number': f'LR{n:08d}',
+                'created_at': now - timedelta(seconds=n),
+            })
+            position += 1
+        for start in range(0, len(rows), 5000):
+            db.session.execute(db.insert(Booking), rows[start:start + 5000])
+        trips_table = Trip.__table__
+        db.session.connection().execute(
+            trips_table.update().where(trips_table.c.id == db.bindparam('trip_id'))
+            .values(available_seats=trips_table.c.available_seats - db.bindparam('seats')),
+            [{'trip_id': trip_id, 'seats': seats} for trip_id, seats in taken.items()]
+        )
+        db.session.commit()
+        print(f"seeded {len(rows)} bookings in {time.perf_counter() - began:.1f}s")
+        if len(rows) < bookings:
+            print(f"⚠️  only {len(rows)} of {bookings} bookings fit in the seeded trips; raise --trips")
+    return days
+
+
+# ==================== CLIENTS ====================
+
+class TestClient:
+    """In-process requests through app.test_client()."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        data = response.get_json(silent=True)
+        return response.status_code, data, response.headers.get('X-SQL-Queries')
+
+
+class HttpClient:
+    """Requests over HTTP to a running server, keeping the session cookie."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                status, raw, headers = response.status, response.read(), response.headers
+        except urllib.error.HTTPError as e:
+            status, raw, headers = e.code, e.read(), e.headers
+        try:
+            payload = json.loads(raw) if raw else None
+        except ValueError:
+            payload = None
+        return status, payload, headers.get('X-SQL-Queries')
+
+
+# ==================== TRAFFIC ====================
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, operation, elapsed, ok, queries):
+        with self.lock:
+            self.samples.setdefault(operation, []).append((elapsed, ok, queries))
+
+
+class VirtualPassenger:
+    def __init__(self, client, n, routes, days, rng, recorder):
+        self.client = client
+        self.email = user_email(n)
+        self.routes = routes
+        self.days = days
+        self.rng = rng
+        self.recorder = recorder
+        self.trip_ids = []
+        self.unpaid = []
+
+    def timed(self, operation, method, path, body=None, expect=(200,)):
+        began = time.perf_counter()
+        try:
+            status, payload, queries = self.client.request(method, path, body)
+        except Exception:
+            status, payload, queries = None, None, None
+        self.recorder.add(operation, time.perf_counter() - began, status in expect,
+                          int(queries) if queries is not None else None)
+        return status, payload
+
+    def login(self):
+        self.timed('login', 'POST', '/api/auth/login', {'email': self.email, 'password': PASSWORD})
+
+    def search(self):
+        route = self.rng.choice(self.routes)
+        day = (datetime.utcnow() + timedelta(days=self.rng.randrange(self.days))).strftime('%Y-%m-%d')
+        query = urllib.parse.urlencode({'from': route['from'], 'to': route['to'], 'date': day})
+        status, payload = self.timed('search', 'GET', f"/api/trips?{query}")
+        if status == 200 and payload:
+            self.trip_ids = [trip['id'] for trip in payload.get('trips', [])] or self.trip_ids
+
+    def history(self):
+        self.timed('history', 'GET', '/api/bookings/user?limit=20')
+
+    def book(self):
+        if not self.trip_ids:
+            self.search()
+        if not self.trip_ids:
+            return
+        status, payload = self.timed('book', 'POST', '/api/bookings',
+                                     {'trip_id': self.rng.choice(self.trip_ids), 'seats': 1}, expect=(201,))
+        if status == 201:
+            self.unpaid.append(payload['booking']['id'])
+
+    def pay(self):
+        if not self.unpaid:
+            return self.book()
+        self.timed('pay', 'POST', '/api/payment/process', {'booking_id': self.unpaid.pop()}, expect=(202,))
+
+
+def run_traffic(make_client, clients, users, mix, duration, routes, days, seed_value):
+    recorder = Recorder()
+    operations, weights = zip(*mix.items())
+    barrier = threading.Barrier(clients + 1)
+    go = threading.Event()
+    window = {}
+
+    def drive(worker):
+        rng = random.Random(seed_value * 1000 + worker)
+        passenger = VirtualPassenger(make_client(), rng.randrange(users), routes, days, rng, recorder)
+        passenger.login()
+        barrier.wait()
+        go.wait()
+        while time.perf_counter() < window['stop_at']:
+            getattr(passenger, rng.choices(operations, weights)[0])()
+
+    threads = [threading.Thread(target=drive, args=(n,), daemon=True) for n in range(clients)]
+    for t in threads:
+        t.start()
+    # The warm-up logins above are not counted
+    barrier.wait()
+    recorder.samples.clear()
+    began = time.perf_counter()
+    window['stop_at'] = began + duration
+    go.set()
+    for t in threads:
+        t.join()
+    return recorder.samples, time.perf_counter() - began
+
+
+# ==================== REPORT ====================
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def summarize(samples, elapsed):
+    endpoints = {}
+    for operation, rows in sorted(samples.items()):
+        latencies = sorted(row[0] for row in rows)
+        queries = [row[2] for row in rows if row[2] is not None]
+        endpoints[operation] = {
+            'requests': len(rows),
+            'failures': sum(1 for row in rows if not row[1]),
+            'throughput_rps': round(len(rows) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        }
+    total = sum(e['requests'] for e in endpoints.values())
+    return endpoints, {'requests': total, 'elapsed_s': round(elapsed, 2),
+                       'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0}
+
+
+def print_report(endpoints, overall, baseline=None):
+    print(f"\n{'endpoint':<10}{'reqs':>8}{'fail':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'sql/req':>9}")
+    for name, e in endpoints.items():
+        sql = '-' if e['queries_per_request'] is None else f"{e['queries_per_request']:.1f}"
+        line = (f"{name:<10}{e['requests']:>8}{e['failures']:>6}{e['throughput_rps']:>9.1f}"
+                f"{e['p50_ms']:>9.1f}{e['p95_ms']:>9.1f}{e['p99_ms']:>9.1f}{sql:>9}")
+        old = (baseline or {}).get('endpoints', {}).get(name)
+        if old and old['p95_ms'] and old['throughput_rps']:
+            line += (f"   p95 {(e['p95_ms'] / old['p95_ms'] - 1) * 100:+.0f}%"
+                     f"  req/s {(e['throughput_rps'] / old['throughput_rps'] - 1) * 100:+.0f}%")
+        print(line)
+    print(f"{'total':<10}{overall['requests']:>8}{'':>6}{overall['throughput_rps']:>9.1f}   over {overall['elapsed_s']}s")
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+# ==================== MAIN ====================
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--trips', type=int, default=5000)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--mix', type=parse_mix, default='default',
+                        help=f"one of {', '.join(MIXES)} or weights like search=70,book=20,pay=10")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', help='database to seed/serve (default: a throwaway SQLite file)')
+    parser.add_argument('--base-url', help='send traffic to a running server instead of the test client')
+    parser.add_argument('--seed-only', action='store_true')
+    parser.add_argument('--no-seed', action='store_true', help='database is already seeded')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='compare against a previous --json file')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + os.path.join(
+        tempfile.mkdtemp(prefix='ridenaija-load-'), 'load.db')
+    import app as ridenaija
+    from catalog import ROUTES
+    from config import Config, ProductionConfig
+    from scheduler import TIME_SLOTS
+    from sqlalchemy.engine import make_url
+
+    class LoadTestConfig(ProductionConfig):
+        QUERY_COUNT_HEADER = True
+        # As in development: the built-in SECRET_KEY, and the fake provider unless PAYSTACK_SECRET_KEY is set
+        SECRET_KEY = Config.SECRET_KEY
+        PAYMENT_PROVIDER = Config.PAYMENT_PROVIDER
+        ALLOW_FAKE_PAYMENTS = True
+        ALLOW_PUBLIC_METRICS = True
+
+    app = ridenaija.create_app(LoadTestConfig)
+    rng = random.Random(args.seed)
+    days = max(1, math.ceil(args.trips / (len(ROUTES) * len(TIME_SLOTS))))
+    if not args.no_seed:
+        days = seed(app, args.users, args.trips, args.bookings, rng)
+    if args.seed_only:
+        return
+
+    if args.base_url:
+        make_client = lambda: HttpClient(args.base_url)  # noqa: E731
+    else:
+        make_client = lambda: TestClient(app)  # noqa: E731
+
+    print(f"running mix {args.mix} with {args.clients} clients for {args.duration}s")
+    samples, elapsed = run_traffic(make_client, args.clients, args.users, args.mix, args.duration,
+                                   ROUTES, days, args.seed)
+    endpoints, overall = summarize(samples, elapsed)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(endpoints, overall, baseline)
+
+    if args.json:
+        result = {
+            'meta': {
+                'timestamp': datetime.utcnow().isoformat(),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'target': args.base_url or 'test_client',
+                'database': None if args.base_url else make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name(),
+                'dataset': {'users': args.users, 'trips': args.trips, 'bookings': args.bookings},
+                'clients': args.clients,
+                'duration_s': args.duration,
+                'mix': args.mix,
+                'seed': args.seed,
+            },
+            'overall': overall,
+            'endpoints': endpoints,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
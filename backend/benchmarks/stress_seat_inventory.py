@@ -0,0 +1,96 @@
+# backend/benchmarks/stress_seat_inventory.py - concurrent booking stress test
+#
+# Usage: python benchmarks/stress_seat_inventory.py [--threads 16] [--seats 40] [--attempts 10]
+#
+# Points the app at a throwaway SQLite file, creates one trip with --seats
+# seats and lets --threads passengers race to book it through the Flask test
+# client. Exits non-zero if the trip was oversold or the seat accounting
+# does not add up; otherwise prints bookings per second under contention.
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+_tmpdir = tempfile.mkdtemp(prefix='ridenaija-stress-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_tmpdir, 'stress.db')
+
+import app as ridenaija  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seats', type=int, default=40)
+    parser.add_argument('--attempts', type=int, default=10, help='booking attempts per thread')
+    args = parser.parse_args()
+
+    app, db = ridenaija.create_app(), ridenaija.db
+    with app.app_context():
+        db.create_all()
+        driver = ridenaija.User(name='Stress Driver', email='driver@stress.test', phone='0', role='driver')
+        driver.set_password('password123')
+        db.session.add(driver)
+        for n in range(args.threads):
+            user = ridenaija.User(name=f'Passenger {n}', email=f'p{n}@stress.test', phone='0')
+            user.set_password('password123')
+            db.session.add(user)
+        db.session.flush()
+        departure = datetime.utcnow() + timedelta(days=1)
+        trip = ridenaija.Trip(driver_id=driver.id, from_location='Lagos', to_location='Abuja',
+                              departure_time=departure, arrival_time=departure + timedelta(hours=11),
+                              available_seats=args.seats, price_per_seat=15000)
+        db.session.add(trip)
+        db.session.commit()
+        trip_id = trip.id
+
+    results = {'booked': 0, 'sold_out': 0, 'errors': 0}
+    lock = threading.Lock()
+    start = threading.Barrier(args.threads)
+
+    def passenger(n):
+        client = app.test_client()
+        client.post('/api/auth/login', json={'email': f'p{n}@stress.test', 'password': 'password123'})
+        start.wait()
+        for _ in range(args.attempts):
+            response = client.post('/api/bookings', json={'trip_id': trip_id, 'seats': 1})
+            key = 'booked' if response.status_code == 201 else 'sold_out' if response.status_code == 400 else 'errors'
+            with lock:
+                results[key] += 1
+
+    threads = [threading.Thread(target=passenger, args=(n,)) for n in range(args.threads)]
+    began = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - began
+
+    with app.app_context():
+        remaining = db.session.get(ridenaija.Trip, trip_id).available_seats
+        booked_seats = db.session.query(db.func.coalesce(db.func.sum(ridenaija.Booking.seats), 0)).filter(
+            ridenaija.Booking.trip_id == trip_id).scalar()
+        held_seats = db.session.query(db.func.coalesce(db.func.sum(ridenaija.SeatHold.seats), 0)).filter(
+            ridenaija.SeatHold.trip_id == trip_id).scalar()
+
+    attempts = args.threads * args.attempts
+    print(f"threads={args.threads} seats={args.seats} attempts={attempts}")
+    print(f"booked={results['booked']} sold_out={results['sold_out']} errors={results['errors']}")
+    print(f"remaining_seats={remaining} booked_seats={booked_seats} held_seats={held_seats}")
+    print(f"elapsed={elapsed:.2f}s bookings/s={results['booked'] / elapsed:.1f} requests/s={attempts / elapsed:.1f}")
+
+    expected_booked = min(args.seats, attempts)
+    ok = (remaining >= 0 and booked_seats == held_seats == results['booked']
+          and remaining + booked_seats == args.seats and results['booked'] == expected_booked)
+    if not ok:
+        print("❌ Seat accounting mismatch (oversold or lost seats)")
+        sys.exit(1)
+    print("✅ No overselling")
+
+
+if __name__ == '__main__':
+    main()
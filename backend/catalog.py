@@ -0,0 +1,96 @@
+# backend/catalog.py - reference data shared by the API and the scheduler
+#
+# ROUTES is the single source for both /api/routes and generate_trips, so the
+# advertised catalog and the scheduled departures cannot drift apart.
+import re
+
+CITIES = [
+    {"id": 1, "name": "Lagos", "slug": "lagos", "region": "south-west"},
+    {"id": 2, "name": "Abuja", "slug": "abuja", "region": "north-central"},
+    {"id": 3, "name": "Port Harcourt", "slug": "portharcourt", "region": "south-south"},
+    {"id": 4, "name": "Ibadan", "slug": "ibadan", "region": "south-west"},
+    {"id": 5, "name": "Kano", "slug": "kano", "region": "north-west"},
+    {"id": 6, "name": "Enugu", "slug": "enugu", "region": "south-east"},
+    {"id": 7, "name": "Benin City", "slug": "benin", "region": "south-south"},
+    {"id": 8, "name": "Calabar", "slug": "calabar", "region": "south-south"},
+    {"id": 9, "name": "Ilorin", "slug": "ilorin", "region": "north-central"},
+    {"id": 10, "name": "Jos", "slug": "jos", "region": "north-central"},
+    {"id": 11, "name": "Maiduguri", "slug": "maiduguri", "region": "north-east"},
+    {"id": 12, "name": "Sokoto", "slug": "sokoto", "region": "north-west"},
+    {"id": 13, "name": "Oyo", "slug": "oyo", "region": "south-west"},
+    {"id": 14, "name": "Abeokuta", "slug": "abeokuta", "region": "south-west"},
+    {"id": 15, "name": "Owerri", "slug": "owerri", "region": "south-east"},
+    {"id": 16, "name": "Akure", "slug": "akure", "region": "south-west"},
+    {"id": 17, "name": "Minna", "slug": "minna", "region": "north-central"},
+    {"id": 18, "name": "Bauchi", "slug": "bauchi", "region": "north-east"}
+]
+
+ROUTES = [
+    {"from": "Lagos", "to": "Abuja", "distance": "700km", "duration": "10-12 hours", "duration_hours": 11, "price": 15000, "region": "all"},
+    {"from": "Lagos", "to": "Port Harcourt", "distance": "600km", "duration": "8-10 hours", "duration_hours": 9, "price": 12000, "region": "all"},
+    {"from": "Lagos", "to": "Ibadan", "distance": "150km", "duration": "2-3 hours", "duration_hours": 2.5, "price": 3500, "region": "south-west"},
+    {"from": "Lagos", "to": "Kano", "distance": "1100km", "duration": "15-18 hours", "duration_hours": 16, "price": 18000, "region": "all"},
+    {"from": "Lagos", "to": "Enugu", "distance": "550km", "duration": "7-9 hours", "duration_hours": 8, "price": 11000, "region": "all"},
+    {"from": "Lagos", "to": "Calabar", "distance": "800km", "duration": "12-14 hours", "duration_hours": 13, "price": 14000, "region": "all"},
+    {"from": "Lagos", "to": "Abeokuta", "distance": "100km", "duration": "1.5-2 hours", "duration_hours": 2, "price": 2500, "region": "south-west"},
+    {"from": "Lagos", "to": "Akure", "distance": "300km", "duration": "4-5 hours", "duration_hours": 5, "price": 5500, "region": "south-west"},
+    {"from": "Abuja", "to": "Lagos", "distance": "700km", "duration": "10-12 hours", "duration_hours": 11, "price": 15000, "region": "all"},
+    {"from": "Abuja", "to": "Kano", "distance": "400km", "duration": "6-7 hours", "duration_hours": 6, "price": 8000, "region": "north-central"},
+    {"from": "Abuja", "to": "Jos", "distance": "250km", "duration": "4-5 hours", "duration_hours": 4, "price": 6000, "region": "north-central"},
+    {"from": "Abuja", "to": "Ilorin", "distance": "300km", "duration": "5-6 hours", "duration_hours": 5, "price": 7000, "region": "north-central"},
+    {"from": "Abuja", "to": "Port Harcourt", "distance": "600km", "duration": "9-11 hours", "duration_hours": 9, "price": 13000, "region": "all"},
+    {"from": "Ibadan", "to": "Lagos", "distance": "150km", "duration": "2-3 hours", "duration_hours": 2.5, "price": 3500, "region": "south-west"},
+    {"from": "Ibadan", "to": "Abuja", "distance": "600km", "duration": "9-11 hours", "duration_hours": 9, "price": 13500, "region": "all"},
+    {"from": "Ibadan", "to": "Enugu", "distance": "450km", "duration": "6-8 hours", "duration_hours": 7, "price": 9500, "region": "all"},
+    {"from": "Port Harcourt", "to": "Lagos", "distance": "600km", "duration": "8-10 hours", "duration_hours": 9, "price": 12000, "region": "all"},
+    {"from": "Port Harcourt", "to": "Enugu", "distance": "250km", "duration": "4-5 hours", "duration_hours": 4, "price": 6000, "region": "south-east"},
+    {"from": "Kano", "to": "Lagos", "distance": "1100km", "duration": "15-18 hours", "duration_hours": 16, "price": 18000, "region": "all"},
+    {"from": "Kano", "to": "Abuja", "distance": "400km", "duration": "6-7 hours", "duration_hours": 6, "price": 8000, "region": "north-central"},
+    {"from": "Enugu", "to": "Lagos", "distance": "550km", "duration": "7-9 hours", "duration_hours": 8, "price": 11000, "region": "all"}
+]
+
+# Fields of ROUTES exposed by /api/routes
+ROUTE_CATALOG_FIELDS = ("from", "to", "distance", "duration", "price", "region")
+
+
+def route_catalog():
+    return [{field: route[field] for field in ROUTE_CATALOG_FIELDS} for route in ROUTES]
+
+
+# Trip amenities, stored as bits of Trip.amenity_mask: bit n is AMENITIES[n].
+# Only ever append here; reordering would change the meaning of stored masks.
+AMENITIES = (
+    "AC",
+    "WiFi",
+    "Charging Ports",
+    "Comfortable Seats",
+    "TV",
+    "Refreshments",
+    "Reclining Seats",
+    "Restroom",
+    "Extra Luggage",
+)
+
+_AMENITY_KEY = re.compile(r'[^a-z0-9]+')
+_AMENITY_BITS = {_AMENITY_KEY.sub('', name.lower()): 1 << bit for bit, name in enumerate(AMENITIES)}
+
+# One shared tuple per distinct mask, so a page of trips doesn't build a list per row
+_amenity_names = {}
+
+
+def amenity_mask(names):
+    """Bitmask for amenity names (case and punctuation ignored). Raises ValueError on an unknown name."""
+    mask = 0
+    for name in names:
+        bit = _AMENITY_BITS.get(_AMENITY_KEY.sub('', name.lower()))
+        if bit is None:
+            raise ValueError(f"Unknown amenity {name!r}")
+        mask |= bit
+    return mask
+
+
+def amenity_names(mask):
+    names = _amenity_names.get(mask)
+    if names is None:
+        names = _amenity_names[mask] = tuple(name for bit, name in enumerate(AMENITIES) if mask >> bit & 1)
+    return names
@@ -0,0 +1,51 @@
+# backend/compression.py - negotiated gzip/deflate for dynamic responses
+import gzip
+import zlib
+
+from flask import request
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'text/javascript'}
+ENCODINGS = ('gzip', 'deflate')
+
+
+def choose_encoding(accept_encodings):
+    """'gzip' or 'deflate', whichever the client weights higher (gzip on a tie), or None."""
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level):
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=level, mtime=0)
+    return zlib.compress(data, level)  # HTTP "deflate" is the zlib format
+
+
+def init_compression(app, min_bytes=1024, level=6):
+    """Compress buffered responses of at least `min_bytes` in the encoding the client prefers.
+
+    Streams (NDJSON, Server-Sent Events), files and responses that already
+    carry a Content-Encoding (precomputed and static assets) pass through.
+    """
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers
+                or response.status_code < 200 or response.status_code in (204, 206, 304)
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        response.set_data(compress(data, encoding, level))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f'{etag}-{encoding}', weak)
+        return response
@@ -2,15 +2,127 @@
 import os
 from dotenv import load_dotenv
 
+from database import normalize_database_url
+from scheduler import DEFAULT_HORIZON_DAYS
+
 load_dotenv()
 
 class Config:
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    # Signs the session cookies login_required (and its principal cache) trust
+    SECRET_KEY = os.environ.get('SECRET_KEY') or 'ridenaija-secret-key-2024-change-in-production'
+    SQLALCHEMY_DATABASE_URI = normalize_database_url(os.environ.get('DATABASE_URL')) or 'sqlite:///ridenaija.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLite: PRAGMAs applied to every new connection (see database.py). WAL lets
+    # reads proceed during a write; writers wait up to the busy timeout for the lock.
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -16000))  # negative = KiB
+    # Server databases (DATABASE_URL=postgresql://...): connection pool per worker process
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    SESSION_TYPE = 'filesystem'
+    # Days of departures generate_trips keeps scheduled ahead of today
+    SCHEDULE_HORIZON_DAYS = int(os.environ.get('SCHEDULE_HORIZON_DAYS', DEFAULT_HORIZON_DAYS))
+    # Departed trips move to trips_archive after ARCHIVE_TRIPS_AFTER_HOURS, or with their bookings and
+    # payments after ARCHIVE_BOOKINGS_AFTER_DAYS if anyone booked them; ARCHIVE_BATCH_SIZE trips per transaction
+    ARCHIVE_TRIPS_AFTER_HOURS = int(os.environ.get('ARCHIVE_TRIPS_AFTER_HOURS', 24))
+    ARCHIVE_BOOKINGS_AFTER_DAYS = int(os.environ.get('ARCHIVE_BOOKINGS_AFTER_DAYS', 90))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 500))
+    ARCHIVE_PAUSE_MS = int(os.environ.get('ARCHIVE_PAUSE_MS', 50))
+    # Timetable rows upserted per transaction by `flask import-timetable` and /api/admin/timetable
+    TIMETABLE_IMPORT_BATCH_SIZE = int(os.environ.get('TIMETABLE_IMPORT_BATCH_SIZE', 5000))
+    # Each worker reloads its TripIndex this often to see other processes' writes
+    TRIP_INDEX_MAX_AGE = int(os.environ.get('TRIP_INDEX_MAX_AGE', 60))
+    # /api/journeys: transfer cap, default layover, and how long after the start legs may depart
+    JOURNEY_MAX_TRANSFERS = int(os.environ.get('JOURNEY_MAX_TRANSFERS', 3))
+    JOURNEY_MIN_LAYOVER_MINUTES = int(os.environ.get('JOURNEY_MIN_LAYOVER_MINUTES', 30))
+    JOURNEY_WINDOW_HOURS = int(os.environ.get('JOURNEY_WINDOW_HOURS', 48))
+    # /api/trips/seats/stream: open streams per process, how often other processes' changes are
+    # read, the window bursts are merged over, idle heartbeat, and when clients must reconnect
+    SEAT_STREAM_MAX_SUBSCRIBERS = int(os.environ.get('SEAT_STREAM_MAX_SUBSCRIBERS', 1000))
+    SEAT_STREAM_POLL_SECONDS = float(os.environ.get('SEAT_STREAM_POLL_SECONDS', 2.0))
+    SEAT_STREAM_COALESCE_MS = int(os.environ.get('SEAT_STREAM_COALESCE_MS', 250))
+    SEAT_STREAM_HEARTBEAT_SECONDS = int(os.environ.get('SEAT_STREAM_HEARTBEAT_SECONDS', 15))
+    SEAT_STREAM_MAX_SECONDS = int(os.environ.get('SEAT_STREAM_MAX_SECONDS', 300))
+    # Authenticated-user cache used by login_required
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 10000))
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', 60))
+    # /api/trips result cache; seat counts may lag by up to SEARCH_CACHE_SEAT_STALENESS seconds
+    SEARCH_CACHE_MAX_BYTES = int(os.environ.get('SEARCH_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 60))
+    SEARCH_CACHE_SEAT_STALENESS = int(os.environ.get('SEARCH_CACHE_SEAT_STALENESS', 0))
+    # Request/SQL metrics at /api/metrics (Prometheus text); set METRICS_TOKEN to require a bearer token
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Serve /api/metrics to anyone when METRICS_TOKEN is unset; it shows route timings, worker pids and SQL text
+    ALLOW_PUBLIC_METRICS = True
+    # Requests slower than this log their SQL to SLOW_REQUEST_LOG (or stderr); 0 disables
+    SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 1000))
+    SLOW_REQUEST_LOG = os.environ.get('SLOW_REQUEST_LOG')
+    # Payments: 'fake' (in-process Paystack stand-in) or 'paystack'
+    PAYSTACK_SECRET_KEY = os.environ.get('PAYSTACK_SECRET_KEY')
+    PAYMENT_PROVIDER = os.environ.get('PAYMENT_PROVIDER') or ('paystack' if PAYSTACK_SECRET_KEY else 'fake')
+    # The fake provider approves every checkout and signs webhooks with a public default key
+    ALLOW_FAKE_PAYMENTS = True
+    PAYSTACK_PUBLIC_KEY = os.environ.get('PAYSTACK_PUBLIC_KEY')
+    PAYSTACK_BASE_URL = os.environ.get('PAYSTACK_BASE_URL', 'https://api.paystack.co')
+    FAKE_PAYMENT_LATENCY = float(os.environ.get('FAKE_PAYMENT_LATENCY', 0.2))
+    FAKE_PAYMENT_OUTCOME = os.environ.get('FAKE_PAYMENT_OUTCOME', 'success')
+    # Booking reference numbers each process claims per trip to the sequences table
+    BOOKING_NUMBER_BLOCK_SIZE = int(os.environ.get('BOOKING_NUMBER_BLOCK_SIZE', 100))
+    # Background jobs (`flask run-jobs`, or in-process under `python app.py`)
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 2))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1.0))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 8))
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 60))
+    # Booking emails: 'smtp' when MAIL_SERVER is set, otherwise .eml files in MAIL_FILE_DIR
+    MAIL_SERVER = os.environ.get('MAIL_SERVER')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', '1') == '1'
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@ridenaija.ng')
+    MAIL_TRANSPORT = os.environ.get('MAIL_TRANSPORT') or ('smtp' if MAIL_SERVER else 'file')
+    MAIL_FILE_DIR = os.environ.get('MAIL_FILE_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'instance', 'outbox')
+    # Emails sent per claim (and per SMTP connection round)
+    NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 50))
+    # gzip/deflate for JSON and HTML responses of at least COMPRESS_MIN_BYTES; COMPRESS_LEVEL=0 turns it off
+    COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    # `flask build-assets` output served for the frontend (fingerprinted, precompressed, resized images)
+    STATIC_BUILD_DIR = os.environ.get('STATIC_BUILD_DIR') or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'dist')
+    # Add X-SQL-Queries to every response (used by benchmarks/loadtest.py)
+    QUERY_COUNT_HEADER = os.environ.get('QUERY_COUNT_HEADER', '0') == '1'
 
 class DevelopmentConfig(Config):
     DEBUG = True
+    QUERY_COUNT_HEADER = True
 
 class ProductionConfig(Config):
-    DEBUG = False
\ No newline at end of file
+    DEBUG = False
+    # No built-in key anyone could sign cookies with: without SECRET_KEY create_app refuses to start
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    # Never fall back to the fake provider: without PAYSTACK_SECRET_KEY create_app refuses to start
+    PAYMENT_PROVIDER = os.environ.get('PAYMENT_PROVIDER') or 'paystack'
+    ALLOW_FAKE_PAYMENTS = False
+    # Metrics need METRICS_TOKEN (or METRICS_ENABLED=0), or create_app refuses to start
+    ALLOW_PUBLIC_METRICS = False
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+}
+
+def get_config(config=None):
+    """Config class from a class, a name in config_by_name, or FLASK_CONFIG (default development)."""
+    if config is None:
+        config = os.environ.get('FLASK_CONFIG', 'development')
+    if isinstance(config, str):
+        return config_by_name[config]
+    return config
@@ -0,0 +1,77 @@
+# backend/database.py - engine profiles: tuned SQLite or a pooled server database
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def normalize_database_url(url):
+    """Accept the postgres:// scheme Heroku and friends hand out."""
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+
+# Backends the upserts in fares.py, timetable.py and jobs.py are written for
+SUPPORTED_BACKENDS = ('sqlite', 'postgresql')
+
+
+def check_backend(url):
+    """Raise RuntimeError at startup for a database the app can't write bookings to."""
+    backend = make_url(url).get_backend_name()
+    if backend not in SUPPORTED_BACKENDS:
+        raise RuntimeError(f"DATABASE_URL points at {backend}; RideNaija supports {' and '.join(SUPPORTED_BACKENDS)}")
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured SQLALCHEMY_DATABASE_URI."""
+    if is_sqlite(config['SQLALCHEMY_DATABASE_URI']):
+        # pysqlite's own lock wait, kept in step with PRAGMA busy_timeout
+        return {'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}}
+    return {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+    }
+
+
+def sqlite_pragmas(config):
+    """PRAGMA statements run on every new SQLite connection; None settings are skipped."""
+    pragmas = [
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT_MS']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        ('cache_size', config['SQLITE_CACHE_SIZE']),
+    ]
+    return [f"PRAGMA {name}={value}" for name, value in pragmas if value is not None]
+
+
+def install_sqlite_pragmas(engine, config):
+    """Apply sqlite_pragmas(config) as each pooled connection is opened."""
+    if engine.dialect.name != 'sqlite':
+        return
+    statements = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+
+def pragma_values(connection):
+    """Current settings of a live SQLite connection, for /api/health and benchmarks."""
+    if connection.dialect.name != 'sqlite':
+        return {}
+    return {
+        name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+        for name in ('journal_mode', 'busy_timeout', 'synchronous', 'mmap_size', 'cache_size')
+    }
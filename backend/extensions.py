@@ -0,0 +1,6 @@
+# backend/extensions.py - Flask extensions, bound to the app in create_app()
+from flask_cors import CORS
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+cors = CORS()
@@ -0,0 +1,178 @@
+# backend/fares.py - per-route, per-day fare aggregate behind /api/fares/calendar
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import bindparam, case, delete, func, literal, select
+
+from trip_index import normalize_city
+
+
+def _day_bounds(day):
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1)
+
+
+class FareCalendar:
+    """Keeps `fare_calendar` (one row per route and departure day) in step with `trips`.
+
+    Writers call it inside their own transaction, so the aggregate commits
+    with the change it reflects. New departures are folded in as deltas;
+    seat changes recompute just the affected (route, day) rows from the
+    handful of trips in them. Nothing ever rebuilds the whole table.
+    """
+
+    def __init__(self, db, trip_model, fare_model):
+        self.db = db
+        self.Trip = trip_model
+        self.Fare = fare_model
+
+    def _insert(self):
+        dialect = self.db.session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+            return insert, func.min
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            return insert, func.least
+        raise RuntimeError(f"FareCalendar has no upsert for {dialect}")
+
+    # ---------- writers ----------
+
+    def add_trips(self, rows):
+        """Fold newly inserted trip rows (dicts as passed to insert(Trip)) into their days."""
+        buckets = {}
+        for row in rows:
+            if row.get('status', 'scheduled') != 'scheduled':
+                continue
+            key = (row['from_location'], row['to_location'], row['departure_time'].date())
+            bucket = buckets.setdefault(key, {'min_fare': None, 'bookable_trips': 0, 'available_seats': 0})
+            if row['available_seats'] > 0:
+                bucket['bookable_trips'] += 1
+                bucket['available_seats'] += row['available_seats']
+                if bucket['min_fare'] is None or row['price_per_seat'] < bucket['min_fare']:
+                    bucket['min_fare'] = row['price_per_seat']
+        if not buckets:
+            return
+        insert, smallest = self._insert()
+        now = datetime.utcnow()
+        stmt = insert(self.Fare)
+        existing = self.Fare.__table__.c
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['from_location', 'to_location', 'day'],
+            set_={
+                # NULL means sold out on one side; the other side's fare wins
+                'min_fare': smallest(func.coalesce(existing.min_fare, stmt.excluded.min_fare),
+                                     func.coalesce(stmt.excluded.min_fare, existing.min_fare)),
+                'bookable_trips': existing.bookable_trips + stmt.excluded.bookable_trips,
+                'available_seats': existing.available_seats + stmt.excluded.available_seats,
+                'updated_at': stmt.excluded.updated_at,
+            }
+        )
+        self.db.session.execute(stmt, [
+            dict(values, from_location=from_loc, to_location=to_loc, day=day,
+                 from_key=normalize_city(from_loc), to_key=normalize_city(to_loc), updated_at=now)
+            for (from_loc, to_loc, day), values in buckets.items()
+        ])
+
+    def _refresh_statement(self, from_loc, to_loc, day, from_key, to_key, start, end, now):
+        """Upsert recomputing one (route, day) row; every argument is a SQL expression."""
+        Trip, Fare = self.Trip, self.Fare
+        open_seats = case((Trip.available_seats > 0, Trip.available_seats), else_=0)
+        aggregate = select(
+            from_loc, to_loc, day, from_key, to_key,
+            func.min(case((Trip.available_seats > 0, Trip.price_per_seat))),
+            func.count(case((Trip.available_seats > 0, 1))),
+            func.coalesce(func.sum(open_seats), 0),
+            now,
+        ).where(
+            Trip.status == 'scheduled', Trip.departure_time >= start, Trip.departure_time < end,
+            Trip.from_location == from_loc, Trip.to_location == to_loc
+        )
+        insert, _ = self._insert()
+        columns = ['from_location', 'to_location', 'day', 'from_key', 'to_key',
+                   'min_fare', 'bookable_trips', 'available_seats', 'updated_at']
+        stmt = insert(Fare.__table__).from_select(columns, aggregate)
+        return stmt.on_conflict_do_update(
+            index_elements=['from_location', 'to_location', 'day'],
+            set_={name: getattr(stmt.excluded, name) for name in columns[5:]}
+        )
+
+    def refresh_statement(self, from_loc, to_loc, day, now=None):
+        """Upsert recomputing one (route, day) row from its trips."""
+        start, end = _day_bounds(day)
+        return self._refresh_statement(
+            literal(from_loc), literal(to_loc), literal(day),
+            literal(normalize_city(from_loc)), literal(normalize_city(to_loc)),
+            literal(start), literal(end), literal(now or datetime.utcnow())
+        )
+
+    def refresh(self, from_loc, to_loc, day, now=None):
+        self.db.session.execute(self.refresh_statement(from_loc, to_loc, day, now))
+
+    def refresh_days(self, buckets, now=None):
+        """Recompute many (from, to, day) rows with one statement executed once per row."""
+        buckets = sorted(set(buckets))
+        if not buckets:
+            return
+        columns = self.Fare.__table__.c
+        names = ('from_loc', 'to_loc', 'day', 'from_key', 'to_key', 'start', 'end', 'now')
+        types = (columns.from_location.type, columns.to_location.type, columns.day.type, columns.from_key.type,
+                 columns.to_key.type, self.Trip.departure_time.type, self.Trip.departure_time.type,
+                 columns.updated_at.type)
+        stmt = self._refresh_statement(*(bindparam(f'fare_{name}', type_=type_) for name, type_ in zip(names, types)))
+        now = now or datetime.utcnow()
+        params = []
+        for from_loc, to_loc, day in buckets:
+            start, end = _day_bounds(day)
+            params.append(dict(zip(
+                (f'fare_{name}' for name in names),
+                (from_loc, to_loc, day, normalize_city(from_loc), normalize_city(to_loc), start, end, now)
+            )))
+        self.db.session.execute(stmt, params)
+
+    def refresh_trips(self, trip_ids):
+        """Recompute the days of trips whose seat counts just changed."""
+        Trip = self.Trip
+        buckets = {
+            (from_loc, to_loc, departure_time.date())
+            for from_loc, to_loc, departure_time in self.db.session.execute(
+                select(Trip.from_location, Trip.to_location, Trip.departure_time).where(Trip.id.in_(list(trip_ids)))
+            )
+        }
+        self.refresh_days(buckets)
+
+    def prune(self, before):
+        """Drop the rows of days before `before`; the calendar never shows them. Returns rows deleted."""
+        Fare = self.Fare
+        return self.db.session.execute(delete(Fare).where(Fare.day < before)).rowcount
+
+    # ---------- reader ----------
+
+    def month_statement(self, from_key, to_key, first_day, last_day):
+        Fare = self.Fare
+        return select(Fare.day, Fare.min_fare, Fare.bookable_trips, Fare.available_seats).where(
+            Fare.from_key == from_key, Fare.to_key == to_key, Fare.day >= first_day, Fare.day <= last_day
+        )
+
+    def month(self, from_loc, to_loc, year, month, today=None):
+        """[{date, min_fare, trips, available_seats}] for every day of the month; one indexed read."""
+        first_day = date(year, month, 1)
+        last_day = (date(year + month // 12, month % 12 + 1, 1)) - timedelta(days=1)
+        today = today or datetime.utcnow().date()
+        days = {}
+        # Spellings of one city ('Port Harcourt', 'Port-Harcourt') share a key; merge their rows
+        for day, min_fare, trips, seats in self.db.session.execute(
+            self.month_statement(normalize_city(from_loc), normalize_city(to_loc), first_day, last_day)
+        ):
+            merged = days.setdefault(day, [None, 0, 0])
+            if min_fare is not None and (merged[0] is None or min_fare < merged[0]):
+                merged[0] = min_fare
+            merged[1] += trips
+            merged[2] += seats
+        calendar = []
+        day = first_day
+        while day <= last_day:
+            min_fare, trips, seats = days.get(day, (None, 0, 0)) if day >= today else (None, 0, 0)
+            calendar.append({"date": day.isoformat(), "min_fare": min_fare, "trips": trips,
+                             "available_seats": seats})
+            day += timedelta(days=1)
+        return calendar
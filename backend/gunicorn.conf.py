@@ -0,0 +1,20 @@
+# backend/gunicorn.conf.py - gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+# Each open /api/trips/seats/stream holds a thread under gthread, so with the default
+# 2 threads a worker serves one stream. The stream deployment in the README runs this
+# file with GUNICORN_WORKER_CLASS=gevent instead: connections per worker then come
+# from GUNICORN_WORKER_CONNECTIONS (keep SEAT_STREAM_MAX_SUBSCRIBERS below it)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 2000))
+if worker_class == 'gthread':
+    # Leave a thread per worker for ordinary requests
+    os.environ.setdefault('SEAT_STREAM_MAX_SUBSCRIBERS', str(max(threads - 1, 0)))
+timeout = 30
+# Each worker builds its own app and engine after fork; nothing is shared
+preload_app = False
+accesslog = '-'
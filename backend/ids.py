@@ -0,0 +1,141 @@
+# backend/ids.py - compact time-ordered keys and sequence-backed references
+import calendar
+import os
+import threading
+import time
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+# Crockford base32: no I, L, O or U, so references survive being read out over the phone
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+
+
+def encode(value, width):
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+# ==================== PRIMARY KEYS ====================
+
+class IdGenerator:
+    """26-character ULIDs: 48-bit millisecond timestamp then 80 random bits.
+
+    Keys sort by creation time, so inserts land at the right-hand edge of
+    the primary key index instead of on a random page, and they are 10
+    bytes narrower than a UUID string in every index and foreign key.
+    Within one millisecond the random part is incremented, so keys from
+    one process are strictly increasing.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def new_id(self):
+        ms = time.time_ns() // 1_000_000
+        with self._lock:
+            if ms <= self._last_ms:
+                ms = self._last_ms
+                self._last_random = (self._last_random + 1) & ((1 << 80) - 1)
+            else:
+                self._last_ms = ms
+                self._last_random = int.from_bytes(os.urandom(10), 'big') >> 1
+            return encode(ms, 10) + encode(self._last_random, 16)
+
+
+def id_at(moment):
+    """A key for a row created at `moment` (naive UTC); used to rekey existing rows."""
+    ms = calendar.timegm(moment.utctimetuple()) * 1000 + moment.microsecond // 1000
+    return encode(ms, 10) + encode(int.from_bytes(os.urandom(10), 'big'), 16)
+
+
+_generator = IdGenerator()
+new_id = _generator.new_id
+
+
+# ==================== REFERENCES ====================
+
+def _scramble(n, bits, multipliers):
+    """Bijection on [0, 2**bits): consecutive numbers come out looking unrelated."""
+    mask = (1 << bits) - 1
+    for multiplier in multipliers:
+        n = (n * multiplier) & mask  # odd multiplier: invertible mod 2**bits
+        n ^= n >> (bits // 2)
+    return n
+
+
+def booking_reference(n):
+    """'RNJ' + 7 characters. Legacy references have 6, so the two can never collide."""
+    return 'RNJ' + encode(_scramble(n, 35, (0x5DEECE66D, 0x2545F491)), 7)
+
+
+def receipt_number(n):
+    """'RCT' + 9 characters (legacy receipts have 8)."""
+    return 'RCT' + encode(_scramble(n, 45, (0x9E3779B97F4A7C15, 0xBF58476D1CE4E5B9)), 9)
+
+
+class SequenceBlocks:
+    """Unique numbers from a `sequences` row, reserved `block_size` at a time.
+
+    A block is claimed with one UPDATE on its own connection and committed
+    at once, so it is never handed out twice, even across gunicorn workers,
+    and the hot row is locked only for that short transaction.
+    Numbers left in a block when the process exits are skipped.
+    Call next() or take() before the caller's transaction starts writing: on SQLite
+    the block UPDATE needs the write lock too.
+    """
+
+    def __init__(self, db, sequence_model, name, block_size=100):
+        self.db = db
+        self.Sequence = sequence_model
+        self.name = name
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def configure(self, block_size):
+        self.block_size = block_size
+
+    def _reserve_block(self, size):
+        Sequence = self.Sequence
+        for attempt in range(2):
+            try:
+                with self.db.engine.begin() as conn:
+                    # The UPDATE takes the row (or SQLite's write) lock first, so the read sees our own bump
+                    bumped = conn.execute(
+                        update(Sequence).where(Sequence.name == self.name)
+                        .values(next_value=Sequence.next_value + size)
+                    ).rowcount
+                    if not bumped:
+                        # First use on a database made with create_all() rather than migrate
+                        conn.execute(Sequence.__table__.insert().values(name=self.name,
+                                                                        next_value=1 + size))
+                    end = conn.execute(select(Sequence.next_value).where(Sequence.name == self.name)).scalar()
+                return end - size, end
+            except IntegrityError:
+                # Another process created the row first; its UPDATE path works now
+                if attempt:
+                    raise
+
+    def next(self):
+        with self._lock:
+            if self._next >= self._end:
+                self._next, self._end = self._reserve_block(self.block_size)
+            n = self._next
+            self._next += 1
+            return n
+
+    def take(self, count):
+        """`count` numbers claiming at most one block; what is left of a block too small is skipped."""
+        with self._lock:
+            if self._end - self._next < count:
+                self._next, self._end = self._reserve_block(max(self.block_size, count))
+            first = self._next
+            self._next += count
+            return list(range(first, first + count))
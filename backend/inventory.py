@@ -0,0 +1,193 @@
+# backend/inventory.py - contention-safe seat inventory with timed holds
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import OperationalError
+
+HOLD_TTL = timedelta(minutes=15)
+
+
+class SeatsUnavailable(Exception):
+    pass
+
+
+class HoldExpired(Exception):
+    pass
+
+
+class ReleaseConflict(Exception):
+    """Another transaction released some of the lapsed holds first; the unit of work must start over."""
+
+
+class SeatInventory:
+    """Seat counts on `trips` changed only through conditional UPDATEs.
+
+    `reserve` decrements available_seats in a single statement guarded by
+    `available_seats >= seats`, so two requests racing for the last seat can
+    never both win. Every reservation is recorded as a SeatHold that either
+    gets confirmed by payment or is released in bulk once it expires.
+    """
+
+    def __init__(self, db, trip_model, booking_model, hold_model, hold_ttl=HOLD_TTL, on_change=None,
+                 on_release=None):
+        self.db = db
+        self.Trip = trip_model
+        self.Booking = booking_model
+        self.SeatHold = hold_model
+        self.hold_ttl = hold_ttl
+        # Called with {trip_id: available_seats} after a commit changes seats
+        self.on_change = on_change
+        # Called with the trip ids a release gave seats back to, inside its transaction
+        self.on_release = on_release
+
+    def reserve_statement(self, trip_id, seats, now):
+        Trip = self.Trip
+        return update(Trip).where(
+            Trip.id == trip_id,
+            Trip.status == 'scheduled',
+            Trip.departure_time > now,
+            Trip.available_seats >= seats
+        ).values(available_seats=Trip.available_seats - seats)
+
+    def expired_holds_statement(self, now, trip_id=None):
+        SeatHold = self.SeatHold
+        query = select(SeatHold.id, SeatHold.trip_id, SeatHold.booking_id, SeatHold.seats).where(
+            SeatHold.status == 'held', SeatHold.expires_at <= now
+        )
+        if trip_id is not None:
+            query = query.where(SeatHold.trip_id == trip_id)
+        return query
+
+    def reserve(self, trip_id, seats, now=None):
+        """Take `seats` off the trip inside the current transaction; returns seats left."""
+        now = now or datetime.utcnow()
+        Trip = self.Trip
+        stmt = self.reserve_statement(trip_id, seats, now)
+
+        session = self.db.session
+        if session.get_bind().dialect.update_returning:
+            remaining = session.execute(
+                stmt.returning(Trip.available_seats), execution_options={'synchronize_session': False}
+            ).scalar()
+        else:
+            result = session.execute(stmt, execution_options={'synchronize_session': False})
+            remaining = None
+            if result.rowcount == 1:
+                remaining = session.execute(select(Trip.available_seats).where(Trip.id == trip_id)).scalar()
+
+        if remaining is None:
+            raise SeatsUnavailable("Not enough seats available")
+        return remaining
+
+    def hold(self, booking, now=None):
+        """SeatHold row for a booking whose seats were just reserved."""
+        now = now or datetime.utcnow()
+        hold = self.SeatHold(
+            trip_id=booking.trip_id,
+            booking=booking,
+            seats=booking.seats,
+            expires_at=now + self.hold_ttl
+        )
+        self.db.session.add(hold)
+        return hold
+
+    def confirm(self, booking_id, now=None):
+        """Mark the booking's hold as paid. Raises HoldExpired if it already lapsed.
+
+        Bookings made before holds existed have no SeatHold row and pass through.
+        """
+        now = now or datetime.utcnow()
+        SeatHold = self.SeatHold
+        result = self.db.session.execute(
+            update(SeatHold).where(
+                SeatHold.booking_id == booking_id,
+                SeatHold.status == 'held',
+                SeatHold.expires_at > now
+            ).values(status='confirmed'),
+            execution_options={'synchronize_session': False}
+        )
+        if result.rowcount == 0:
+            status = self.db.session.execute(
+                select(SeatHold.status).where(SeatHold.booking_id == booking_id)
+            ).scalar()
+            if status not in (None, 'confirmed'):
+                raise HoldExpired("Seat hold has expired")
+
+    def release_expired(self, now=None, trip_id=None, batch_size=500, commit=True):
+        """Return seats from lapsed holds (optionally on one trip); returns holds released.
+
+        With commit=False a single batch is released inside the caller's
+        transaction and on_change and on_release are left to the caller. If
+        another transaction got to some of the holds first it raises
+        ReleaseConflict rather than roll back the caller's earlier work.
+        """
+        now = now or datetime.utcnow()
+        session = self.db.session
+        SeatHold, Trip = self.SeatHold, self.Trip
+        released = 0
+        while True:
+            query = self.expired_holds_statement(now, trip_id)
+            rows = session.execute(query.limit(batch_size)).all()
+            if not rows:
+                return released
+
+            per_trip = {}
+            for _, held_trip_id, _, seats in rows:
+                per_trip[held_trip_id] = per_trip.get(held_trip_id, 0) + seats
+
+            # Flip the holds first; only rows this call actually flipped give seats back
+            hold_ids = [row[0] for row in rows]
+            flipped = session.execute(
+                update(SeatHold).where(SeatHold.id.in_(hold_ids), SeatHold.status == 'held')
+                .values(status='released'),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+            if flipped != len(rows):
+                if not commit:
+                    raise ReleaseConflict("Lapsed holds were released by another transaction")
+                session.rollback()
+                continue
+
+            for held_trip_id in sorted(per_trip):
+                session.execute(
+                    update(Trip).where(Trip.id == held_trip_id)
+                    .values(available_seats=Trip.available_seats + per_trip[held_trip_id]),
+                    execution_options={'synchronize_session': False}
+                )
+            self._expire_bookings([row[2] for row in rows])
+            released += len(rows)
+            if not commit:
+                return released
+            if self.on_release:
+                self.on_release(sorted(per_trip))
+
+            seats_now = dict(session.execute(
+                select(Trip.id, Trip.available_seats).where(Trip.id.in_(list(per_trip)))
+            ).all())
+            session.commit()
+            if self.on_change:
+                self.on_change(seats_now)
+
+    def _expire_bookings(self, booking_ids):
+        Booking = self.Booking
+        self.db.session.execute(
+            update(Booking).where(Booking.id.in_(booking_ids), Booking.payment_status != 'paid')
+            .values(status='expired'),
+            execution_options={'synchronize_session': False}
+        )
+
+
+def with_retry(fn, attempts=4, base_delay=0.02, session=None):
+    """Run fn(), retrying on 'database is locked' and ReleaseConflict with jittered exponential backoff."""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except (OperationalError, ReleaseConflict) as e:
+            if session is not None:
+                session.rollback()
+            retryable = isinstance(e, ReleaseConflict) or 'locked' in str(e).lower()
+            if not retryable or attempt == attempts - 1:
+                raise
+            time.sleep(base_delay * (2 ** attempt) * (0.5 + random.random()))
@@ -0,0 +1,199 @@
+# backend/jobs.py - durable job queue on the `jobs` table
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select, update
+
+
+class RetryLater(Exception):
+    """Raised by a handler that is not finished yet; the job runs again after `delay` seconds."""
+
+    def __init__(self, delay, reason=''):
+        super().__init__(reason or f"retry in {delay}s")
+        self.delay = delay
+
+
+class JobQueue:
+    """At-least-once jobs stored in the database.
+
+    Workers claim a job with a conditional UPDATE (the same guard-in-the-
+    WHERE approach as SeatInventory.reserve), so two workers never run it
+    at once. A claim holds a lease; if the worker dies, the job becomes
+    claimable again once the lease lapses. A handler's writes commit in
+    the same transaction that marks the job done, so handlers only have to
+    be idempotent across crashes, not across normal completions.
+    """
+
+    def __init__(self, db, job_model, max_attempts=8, lease=timedelta(seconds=60), base_delay=2.0):
+        self.db = db
+        self.Job = job_model
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.base_delay = base_delay
+
+    def configure(self, max_attempts, lease_seconds):
+        self.max_attempts = max_attempts
+        self.lease = timedelta(seconds=lease_seconds)
+
+    def enqueue(self, queue, kind, payload, dedupe_key=None, run_after=None):
+        """Add a job in the caller's transaction; False if dedupe_key was already queued."""
+        row = {
+            'queue': queue,
+            'kind': kind,
+            'payload': json.dumps(payload),
+            'dedupe_key': dedupe_key,
+            'run_after': run_after or datetime.utcnow(),
+        }
+        session = self.db.session
+        dialect = session.get_bind().dialect.name
+        if dedupe_key is not None and dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            stmt = insert(self.Job).values(**row).on_conflict_do_nothing(index_elements=['dedupe_key'])
+            return session.execute(stmt).rowcount == 1
+        if dedupe_key is not None and session.execute(
+            select(self.Job.id).where(self.Job.dedupe_key == dedupe_key)
+        ).first():
+            return False
+        session.add(self.Job(**row))
+        return True
+
+    def _claimable(self, now):
+        Job = self.Job
+        return or_(
+            and_(Job.status == 'queued', Job.run_after <= now),
+            and_(Job.status == 'running', Job.locked_until < now)
+        )
+
+    def due_statement(self, queue, now, limit):
+        Job = self.Job
+        return select(Job.id).where(
+            Job.queue == queue, Job.status == 'queued', Job.run_after <= now
+        ).order_by(Job.run_after).limit(limit)
+
+    def stale_statement(self, queue, now, limit):
+        Job = self.Job
+        return select(Job.id).where(
+            Job.queue == queue, Job.status == 'running', Job.locked_until < now
+        ).limit(limit)
+
+    def claim(self, queue, limit=10, now=None):
+        """Lease up to `limit` due jobs; returns [(id, kind, payload, attempts)] and commits."""
+        now = now or datetime.utcnow()
+        Job, session = self.Job, self.db.session
+        # Two index seeks rather than one OR, which SQLite can't serve from the index
+        candidates = session.execute(self.due_statement(queue, now, limit)).scalars().all()
+        if len(candidates) < limit:
+            candidates += session.execute(self.stale_statement(queue, now, limit - len(candidates))).scalars().all()
+        claimed = []
+        for job_id in candidates:
+            result = session.execute(
+                update(Job).where(Job.id == job_id, self._claimable(now))
+                .values(status='running', locked_until=now + self.lease, attempts=Job.attempts + 1),
+                execution_options={'synchronize_session': False}
+            )
+            if result.rowcount == 1:
+                claimed.append(job_id)
+        session.commit()
+        if not claimed:
+            return []
+        rows = session.execute(
+            select(Job.id, Job.kind, Job.payload, Job.attempts).where(Job.id.in_(claimed))
+        ).all()
+        return [(job_id, kind, json.loads(payload), attempts) for job_id, kind, payload, attempts in rows]
+
+    def _finish(self, job_id, **values):
+        self.db.session.execute(
+            update(self.Job).where(self.Job.id == job_id).values(**values),
+            execution_options={'synchronize_session': False}
+        )
+
+    def _record(self, job_id, attempts, error, now):
+        """Mark a claimed job done, or schedule its retry for `error`."""
+        if error is None:
+            self._finish(job_id, status='done', finished_at=now, locked_until=None, last_error=None)
+        elif isinstance(error, RetryLater):
+            # Waiting on the outside world is not a failure, so it doesn't use up attempts
+            self._finish(job_id, status='queued', attempts=attempts - 1, locked_until=None,
+                         run_after=now + timedelta(seconds=error.delay), last_error=str(error))
+        elif attempts >= self.max_attempts:
+            self._finish(job_id, status='dead', finished_at=now, locked_until=None,
+                         last_error=f"{type(error).__name__}: {error}")
+        else:
+            delay = self.base_delay * (2 ** (attempts - 1))
+            self._finish(job_id, status='queued', locked_until=None,
+                         run_after=now + timedelta(seconds=delay), last_error=f"{type(error).__name__}: {error}")
+
+    def run_pending(self, queue, handlers, limit=10):
+        """Claim due jobs on `queue` and run them; returns jobs run.
+
+        `handlers` is either {kind: fn(payload)}, run one job per transaction,
+        or a batch handler fn(jobs) -> {job_id: exception or None} for work
+        that is cheaper in bulk and writes nothing to the database (email).
+        """
+        session = self.db.session
+        jobs = self.claim(queue, limit)
+        if not jobs:
+            return 0
+        if callable(handlers):
+            try:
+                results = handlers(jobs)
+            except Exception as e:
+                results = {job_id: e for job_id, _, _, _ in jobs}
+            now = datetime.utcnow()
+            for job_id, _, _, attempts in jobs:
+                self._record(job_id, attempts, results.get(job_id, LookupError("no result")), now)
+            session.commit()
+            return len(jobs)
+        for job_id, kind, payload, attempts in jobs:
+            now = datetime.utcnow()
+            error = None
+            try:
+                handler = handlers.get(kind)
+                if handler is None:
+                    raise LookupError(f"no handler for {queue}/{kind}")
+                handler(payload)
+            except Exception as e:
+                session.rollback()
+                error = e
+            self._record(job_id, attempts, error, now)
+            session.commit()
+        return len(jobs)
+
+    def stats(self, queue=None):
+        """{queue: {status: count}}."""
+        Job = self.Job
+        query = select(Job.queue, Job.status, func.count()).group_by(Job.queue, Job.status)
+        if queue is not None:
+            query = query.where(Job.queue == queue)
+        counts = {}
+        for name, status, count in self.db.session.execute(query):
+            counts.setdefault(name, {})[status] = count
+        return counts
+
+
+def start_job_worker(app, job_queue, handlers_by_queue, interval_seconds=1.0, threads=1, batch_sizes=None):
+    """Run due jobs for every queue in `handlers_by_queue` on daemon threads; returns a stop Event."""
+    stop = threading.Event()
+    batch_sizes = batch_sizes or {}
+
+    def loop():
+        while not stop.is_set():
+            ran = 0
+            try:
+                with app.app_context():
+                    for queue, handlers in handlers_by_queue.items():
+                        ran += job_queue.run_pending(queue, handlers, batch_sizes.get(queue, 10))
+            except Exception as e:
+                print(f"❌ Job worker error: {e}")
+                time.sleep(interval_seconds)
+            if not ran and stop.wait(interval_seconds):
+                return
+
+    for n in range(threads):
+        threading.Thread(target=loop, name=f'job-worker-{n}', daemon=True).start()
+    return stop
@@ -0,0 +1,211 @@
+# backend/journeys.py - multi-leg journey planning over the trip timetable
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import timedelta
+import heapq
+import threading
+import time
+
+from trip_index import normalize_city
+
+# One scheduled trip as an edge of the timetable graph
+Connection = namedtuple('Connection', ['departure_time', 'trip_id', 'arrival_time', 'from_key', 'to_key',
+                                       'from_location', 'to_location', 'price_per_seat'])
+
+# A way of reaching a city: the connection taken and the label it was boarded from
+_Label = namedtuple('_Label', ['connection', 'parent'])
+
+
+class ConnectionIndex:
+    """Every bookable trip as a connection, sorted by departure time.
+
+    Planning is a connection scan (Dibbelt et al.): one pass over the
+    connections departing after the requested time, so a query touches a
+    slice of the timetable instead of running SQL per leg. Seat counts
+    live in a side table updated in place as bookings commit; trips are
+    added as the scheduler creates them, and the whole index is reloaded
+    every TRIP_INDEX_MAX_AGE seconds like TripIndex.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._connections = []
+        self._departures = []
+        self._by_trip = {}
+        self._seats = {}
+        self._cities = set()
+        self.loaded = False
+        self.loaded_at = 0.0
+
+    # ---------- building ----------
+
+    def load(self, rows):
+        """Rebuild from (id, from, to, departure_time, arrival_time, price_per_seat, available_seats) rows."""
+        connections, seats = [], {}
+        for trip_id, from_loc, to_loc, departure_time, arrival_time, price, available in rows:
+            connections.append(Connection(departure_time, trip_id, arrival_time, normalize_city(from_loc),
+                                          normalize_city(to_loc), from_loc, to_loc, price))
+            seats[trip_id] = available
+        connections.sort()
+        with self._lock:
+            self._connections = connections
+            self._departures = [c.departure_time for c in connections]
+            self._by_trip = {c.trip_id: c for c in connections}
+            self._seats = seats
+            self._cities = {key for c in connections for key in (c.from_key, c.to_key)}
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+
+    def is_stale(self, max_age):
+        return not self.loaded or time.monotonic() - self.loaded_at > max_age
+
+    def add(self, trip_id, from_loc, to_loc, departure_time, arrival_time, price, seats):
+        connection = Connection(departure_time, trip_id, arrival_time, normalize_city(from_loc),
+                                normalize_city(to_loc), from_loc, to_loc, price)
+        with self._lock:
+            self.remove(trip_id)
+            pos = bisect_left(self._connections, connection)
+            self._connections.insert(pos, connection)
+            self._departures.insert(pos, departure_time)
+            self._by_trip[trip_id] = connection
+            self._seats[trip_id] = seats
+            self._cities.update((connection.from_key, connection.to_key))
+
+    def remove(self, trip_id):
+        with self._lock:
+            connection = self._by_trip.pop(trip_id, None)
+            if connection is None:
+                return
+            pos = bisect_left(self._connections, connection)
+            del self._connections[pos]
+            del self._departures[pos]
+            self._seats.pop(trip_id, None)
+
+    def update_seats(self, trip_id, seats):
+        with self._lock:
+            if trip_id in self._seats:
+                self._seats[trip_id] = seats
+
+    def resolve_city(self, name):
+        """Canonical key for a user-typed city: exact match, else the only one containing it."""
+        key = normalize_city(name)
+        if key in self._cities:
+            return key
+        matches = [city for city in self._cities if key and key in city]
+        return matches[0] if len(matches) == 1 else None
+
+    def __len__(self):
+        return len(self._connections)
+
+    # ---------- planning ----------
+
+    def _scan(self, start):
+        return self._connections, bisect_left(self._departures, start)
+
+    def earliest_arrival(self, origin, destination, start, end, max_legs, min_layover, seats=1):
+        """Itinerary (list of Connections) arriving first, boarding only between `start` and `end`;
+        None if unreachable."""
+        with self._lock:
+            connections, first = self._scan(start)
+            # best[k][city]: earliest label reaching city in exactly k legs
+            best = [dict() for _ in range(max_legs + 1)]
+            target = None
+            for i in range(first, len(connections)):
+                c = connections[i]
+                if c.departure_time >= end or (
+                        target is not None and c.departure_time >= target.connection.arrival_time):
+                    break
+                if self._seats.get(c.trip_id, 0) < seats or c.to_key == origin:
+                    continue
+                for k in range(max_legs):
+                    if k == 0:
+                        if c.from_key != origin:
+                            continue
+                        parent = None
+                    else:
+                        parent = best[k].get(c.from_key)
+                        if parent is None or parent.connection.arrival_time + min_layover > c.departure_time:
+                            continue
+                    reached = best[k + 1].get(c.to_key)
+                    if reached is None or c.arrival_time < reached.connection.arrival_time:
+                        label = best[k + 1][c.to_key] = _Label(c, parent)
+                        if c.to_key == destination and (
+                                target is None or c.arrival_time < target.connection.arrival_time):
+                            target = label
+                    # A later-boarded copy of this connection can't arrive sooner
+                    break
+            return _itinerary(target)
+
+    def cheapest(self, origin, destination, start, end, max_legs, min_layover, seats=1):
+        """Lowest-fare itinerary departing at or after `start` and arriving by `end`; earlier arrival on a tie."""
+        with self._lock:
+            connections, first = self._scan(start)
+            # Per (city, legs): labels still in their layover, as a heap on when they become usable,
+            # and the cheapest label that is usable by now
+            waiting, usable = {}, {}
+            counter = 0
+            target, target_cost = None, None
+            for i in range(first, len(connections)):
+                c = connections[i]
+                if c.departure_time >= end:
+                    break
+                if c.arrival_time > end or self._seats.get(c.trip_id, 0) < seats or c.to_key == origin:
+                    continue
+                for k in range(max_legs):
+                    if k == 0:
+                        if c.from_key != origin:
+                            continue
+                        cost, parent = 0, None
+                    else:
+                        slot = (c.from_key, k)
+                        heap = waiting.get(slot)
+                        while heap and heap[0][0] <= c.departure_time:
+                            _, cost, _, label = heapq.heappop(heap)
+                            if slot not in usable or cost < usable[slot][0]:
+                                usable[slot] = (cost, label)
+                        if slot not in usable:
+                            continue
+                        cost, parent = usable[slot]
+                    cost += c.price_per_seat
+                    if target_cost is not None and cost > target_cost:
+                        continue
+                    label = _Label(c, parent)
+                    if c.to_key == destination:
+                        if target_cost is None or (cost, c.arrival_time) < (target_cost, target.connection.arrival_time):
+                            target, target_cost = label, cost
+                        continue
+                    counter += 1
+                    heapq.heappush(waiting.setdefault((c.to_key, k + 1), []),
+                                   (c.arrival_time + min_layover, cost, counter, label))
+            return _itinerary(target)
+
+
+def _itinerary(label):
+    legs = []
+    while label is not None:
+        legs.append(label.connection)
+        label = label.parent
+    return legs[::-1] or None
+
+
+def serialize_itinerary(legs, seats=1):
+    fare = sum(leg.price_per_seat for leg in legs)
+    departure, arrival = legs[0].departure_time, legs[-1].arrival_time
+    return {
+        "legs": [{
+            "trip_id": leg.trip_id,
+            "from_location": leg.from_location,
+            "to_location": leg.to_location,
+            "departure_time": leg.departure_time.isoformat(),
+            "arrival_time": leg.arrival_time.isoformat(),
+            "price_per_seat": leg.price_per_seat,
+        } for leg in legs],
+        "transfers": len(legs) - 1,
+        "layover_minutes": [int((b.departure_time - a.arrival_time) / timedelta(minutes=1))
+                            for a, b in zip(legs, legs[1:])],
+        "departure_time": departure.isoformat(),
+        "arrival_time": arrival.isoformat(),
+        "duration_minutes": int((arrival - departure) / timedelta(minutes=1)),
+        "price_per_seat": fare,
+        "total_price": fare * seats,
+    }
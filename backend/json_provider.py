@@ -0,0 +1,42 @@
+# backend/json_provider.py - response JSON encoding, on orjson when it is installed
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+if orjson is not None:
+    # Datetimes and dataclasses still go through `default`, so they encode exactly as Flask's do
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Compact JSON with keys in the order serializers build them, encoded straight to bytes.
+
+    DefaultJSONProvider sorts every object's keys and indents in debug
+    mode; neither is needed by the frontend. orjson is used when it is
+    installed; anything it rejects falls back to the stdlib encoder.
+    """
+
+    sort_keys = False
+
+    def dumps_bytes(self, obj):
+        if orjson is not None:
+            try:
+                return orjson.dumps(obj, default=self.default, option=_ORJSON_OPTIONS)
+            except (TypeError, orjson.JSONEncodeError):
+                pass
+        return json.dumps(obj, default=self.default, ensure_ascii=self.ensure_ascii,
+                          separators=(',', ':')).encode()
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
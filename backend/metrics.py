@@ -0,0 +1,237 @@
+# backend/metrics.py - per-route request and SQL metrics in Prometheus text format
+import json
+import logging
+import re
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+slow_request_log = logging.getLogger('ridenaija.slow_requests')
+
+
+# ---------- SQL timing ----------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None or not has_request_context():
+        return
+    statements = g.get('metrics_sql')
+    if statements is not None:
+        statements.append((statement, time.perf_counter() - context._metrics_started))
+
+
+for _name, _fn in (('before_cursor_execute', _before_cursor_execute),
+                   ('after_cursor_execute', _after_cursor_execute)):
+    if not event.contains(Engine, _name, _fn):
+        event.listen(Engine, _name, _fn)
+
+
+def normalize_statement(statement, max_length=200):
+    """One-line SQL with IN-lists collapsed, so the same query groups together."""
+    statement = re.sub(r'\s+', ' ', statement).strip()
+    statement = re.sub(r'\((?:\?, )+\?\)', '(?, ...)', statement)
+    return statement[:max_length]
+
+
+# ---------- Prometheus helpers ----------
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}'
+        yield f'{name}_bucket{_labels(labels, le="+Inf")} {self.count}'
+        yield f'{name}_sum{_labels(labels)} {_number(self.sum)}'
+        yield f'{name}_count{_labels(labels)} {self.count}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in items) + '}'
+
+
+# ---------- collector ----------
+
+class RequestMetrics:
+    """Latency, status and SQL counters for this worker process.
+
+    Each gunicorn worker keeps its own numbers; /api/metrics reports the
+    worker that served the scrape, labelled with its pid.
+    """
+
+    def __init__(self, top_statements=10):
+        self.top_statements = top_statements
+        self._lock = threading.Lock()
+        self._collectors = []
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.in_flight = 0
+            self.requests = {}        # (method, route, status) -> count
+            self.latency = {}         # (method, route) -> Histogram
+            self.sql_queries = {}     # route -> Histogram of statements per request
+            self.sql_seconds = {}     # route -> total seconds spent in SQL
+            self.slowest = {}         # normalized statement -> (seconds, route)
+            self.slow_requests = 0
+
+    def add_collector(self, collector):
+        """Register fn() -> iterable of (name, type, help, [(labels, value)]) gauges."""
+        self._collectors.append(collector)
+
+    def init_app(self, app):
+        threshold_ms = app.config['SLOW_REQUEST_MS']
+        if app.config['SLOW_REQUEST_LOG'] and not slow_request_log.handlers:
+            handler = logging.FileHandler(app.config['SLOW_REQUEST_LOG'])
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            slow_request_log.addHandler(handler)
+            slow_request_log.setLevel(logging.INFO)
+            slow_request_log.propagate = False
+
+        @app.before_request
+        def start_request_metrics():
+            g.metrics_started = time.perf_counter()
+            g.metrics_sql = []
+            g.metrics_in_flight = True
+            with self._lock:
+                self.in_flight += 1
+
+        @app.after_request
+        def record_request_metrics(response):
+            if 'metrics_started' in g:
+                self.record(request.method, _route(), response.status_code,
+                            time.perf_counter() - g.metrics_started, g.metrics_sql, threshold_ms)
+            return response
+
+        @app.teardown_request
+        def finish_request_metrics(exc):
+            if g.pop('metrics_in_flight', False):
+                with self._lock:
+                    self.in_flight -= 1
+
+    def record(self, method, route, status, elapsed, statements, threshold_ms=None):
+        sql_time = sum(seconds for _, seconds in statements)
+        with self._lock:
+            key = (method, route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.latency.setdefault((method, route), Histogram(LATENCY_BUCKETS)).observe(elapsed)
+            self.sql_queries.setdefault(route, Histogram(QUERY_COUNT_BUCKETS)).observe(len(statements))
+            self.sql_seconds[route] = self.sql_seconds.get(route, 0.0) + sql_time
+            for statement, seconds in statements:
+                self._note_statement(statement, seconds, route)
+            slow = threshold_ms is not None and threshold_ms > 0 and elapsed * 1000 >= threshold_ms
+            if slow:
+                self.slow_requests += 1
+        if slow:
+            slow_request_log.warning(json.dumps({
+                'method': method,
+                'path': request.full_path.rstrip('?') if has_request_context() else route,
+                'route': route,
+                'status': status,
+                'ms': round(elapsed * 1000, 2),
+                'sql_ms': round(sql_time * 1000, 2),
+                'queries': [{'ms': round(seconds * 1000, 3), 'sql': normalize_statement(statement, 500)}
+                            for statement, seconds in statements],
+            }))
+
+    def _note_statement(self, statement, seconds, route):
+        if len(self.slowest) >= self.top_statements:
+            fastest = min(self.slowest, key=lambda s: self.slowest[s][0])
+            if self.slowest[fastest][0] >= seconds:
+                return
+            normalized = normalize_statement(statement)
+            if normalized not in self.slowest:
+                del self.slowest[fastest]
+        else:
+            normalized = normalize_statement(statement)
+        if seconds > self.slowest.get(normalized, (0.0, None))[0]:
+            self.slowest[normalized] = (seconds, route)
+
+    # ---------- exposition ----------
+
+    def render(self, pid):
+        out = []
+
+        def header(name, kind, help_text):
+            out.append(f'# HELP {name} {help_text}')
+            out.append(f'# TYPE {name} {kind}')
+
+        worker = (('worker', pid),)
+        with self._lock:
+            header('ridenaija_http_requests_in_flight', 'gauge', 'Requests currently being served.')
+            out.append(f'ridenaija_http_requests_in_flight{_labels(worker)} {self.in_flight}')
+
+            header('ridenaija_http_requests_total', 'counter', 'Requests served by route and status.')
+            for (method, route, status), count in sorted(self.requests.items()):
+                labels = worker + (('method', method), ('route', route), ('status', status))
+                out.append(f'ridenaija_http_requests_total{_labels(labels)} {count}')
+
+            header('ridenaija_http_request_duration_seconds', 'histogram', 'Time to build the response.')
+            for (method, route), histogram in sorted(self.latency.items()):
+                out.extend(histogram.lines('ridenaija_http_request_duration_seconds',
+                                           worker + (('method', method), ('route', route))))
+
+            header('ridenaija_sql_queries_per_request', 'histogram', 'SQL statements executed per request.')
+            for route, histogram in sorted(self.sql_queries.items()):
+                out.extend(histogram.lines('ridenaija_sql_queries_per_request', worker + (('route', route),)))
+
+            header('ridenaija_sql_seconds_total', 'counter', 'Time spent executing SQL, by route.')
+            for route, seconds in sorted(self.sql_seconds.items()):
+                out.append(f'ridenaija_sql_seconds_total{_labels(worker + (("route", route),))} {_number(seconds)}')
+
+            header('ridenaija_sql_slowest_statement_seconds', 'gauge',
+                   f'Slowest single executions seen (top {self.top_statements}).')
+            for statement, (seconds, route) in sorted(self.slowest.items(), key=lambda s: -s[1][0]):
+                labels = worker + (('route', route), ('statement', statement))
+                out.append(f'ridenaija_sql_slowest_statement_seconds{_labels(labels)} {_number(seconds)}')
+
+            header('ridenaija_slow_requests_total', 'counter', 'Requests over SLOW_REQUEST_MS.')
+            out.append(f'ridenaija_slow_requests_total{_labels(worker)} {self.slow_requests}')
+
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                header(name, kind, help_text)
+                for labels, value in samples:
+                    out.append(f'{name}{_labels(worker + tuple(labels.items()))} {_number(value)}')
+        return '\n'.join(out) + '\n'
+
+
+def _route():
+    # The URL rule, not the path, so /api/bookings/<booking_id> is one series
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
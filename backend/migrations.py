@@ -0,0 +1,261 @@
+# backend/migrations.py - ordered, idempotent schema migrations
+#
+# Each migration runs once, in version order, inside its own transaction and
+# is recorded in schema_migrations. Migrations inspect the live schema before
+# changing it, so they work both on a fresh database (where the baseline
+# create_all already produced the current models) and on an older
+# instance/ridenaija.db that predates a column or index.
+import json
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from catalog import amenity_mask
+from trip_index import normalize_city
+
+import ids
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+def table_columns(conn, table):
+    return {column['name'] for column in inspect(conn).get_columns(table)}
+
+
+def table_indexes(conn, table):
+    return {index['name'] for index in inspect(conn).get_indexes(table)}
+
+
+def add_column(conn, table, name, ddl):
+    if name not in table_columns(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+        return True
+    return False
+
+
+def create_index(conn, name, table, columns, unique=False):
+    if name not in table_indexes(conn, table):
+        unique_sql = "UNIQUE " if unique else ""
+        conn.execute(text(f"CREATE {unique_sql}INDEX {name} ON {table} ({', '.join(columns)})"))
+
+
+# ==================== MIGRATIONS ====================
+
+@migration(1, "baseline tables")
+def baseline(conn, metadata):
+    metadata.create_all(conn, checkfirst=True)
+
+
+@migration(2, "booking reference and receipt columns")
+def booking_reference_columns(conn, metadata):
+    for name in ('booking_reference', 'receipt_number'):
+        if add_column(conn, 'bookings', name, 'VARCHAR(20)'):
+            # SQLite cannot add a UNIQUE column; a unique index gives the same guarantee
+            create_index(conn, f'uq_bookings_{name}', 'bookings', [name], unique=True)
+
+
+@migration(3, "indexes for trip search, booking history and seat holds")
+def query_indexes(conn, metadata):
+    create_index(conn, 'ix_trips_status_departure', 'trips', ['status', 'departure_time'])
+    create_index(conn, 'ix_trips_departure_time', 'trips', ['departure_time'])
+    create_index(conn, 'ix_bookings_passenger_created', 'bookings', ['passenger_id', 'created_at', 'id'])
+    create_index(conn, 'ix_bookings_trip_id', 'bookings', ['trip_id'])
+    create_index(conn, 'ix_seat_holds_status_expires', 'seat_holds', ['status', 'expires_at'])
+    create_index(conn, 'ix_seat_holds_trip_id', 'seat_holds', ['trip_id'])
+
+
+@migration(4, "payments and jobs tables")
+def payments_and_jobs(conn, metadata):
+    for name in ('payments', 'jobs'):
+        metadata.tables[name].create(conn, checkfirst=True)
+
+
+# Tables whose string keys are rewritten as time-ordered ids, with the columns pointing at them.
+# Users keep their keys: sessions and the principal cache hold them.
+REKEYED_TABLES = (
+    ('trips', [('bookings', 'trip_id'), ('seat_holds', 'trip_id')]),
+    ('bookings', [('seat_holds', 'booking_id'), ('payments', 'booking_id')]),
+    ('seat_holds', []),
+    ('payments', []),
+)
+# Job payload keys holding a rekeyed table's ids (notification jobs carry the booking's)
+JOB_PAYLOAD_KEYS = {'bookings': 'booking_id'}
+
+
+def rekey(conn, table, children):
+    """Replace 36-character UUID keys in `table` with ids.id_at(created_at), fixing up `children`."""
+    rows = conn.execute(text(f"SELECT id, created_at FROM {table} WHERE length(id) = 36")).all()
+    if not rows:
+        return
+    now = datetime.utcnow()
+    new_ids = {old: ids.id_at(datetime.fromisoformat(created) if isinstance(created, str) else created or now)
+               for old, created in rows}
+    conn.execute(text("CREATE TEMP TABLE rekey (old VARCHAR(36) PRIMARY KEY, new VARCHAR(26) NOT NULL)"))
+    conn.execute(text("INSERT INTO rekey (old, new) VALUES (:old, :new)"),
+                 [{"old": old, "new": new} for old, new in new_ids.items()])
+    for child, column in children:
+        conn.execute(text(
+            f"UPDATE {child} SET {column} = (SELECT new FROM rekey WHERE old = {child}.{column}) "
+            f"WHERE {column} IN (SELECT old FROM rekey)"
+        ))
+    conn.execute(text(f"UPDATE {table} SET id = (SELECT new FROM rekey WHERE old = {table}.id) "
+                      f"WHERE id IN (SELECT old FROM rekey)"))
+    conn.execute(text("DROP TABLE rekey"))
+    if table in JOB_PAYLOAD_KEYS:
+        rekey_jobs(conn, JOB_PAYLOAD_KEYS[table], new_ids)
+
+
+def rekey_jobs(conn, key, new_ids):
+    """Point job payloads' `key` (and dedupe keys ending in it) at the rows' new ids."""
+    updates = []
+    for job_id, payload, dedupe_key in conn.execute(
+        text("SELECT id, payload, dedupe_key FROM jobs WHERE payload LIKE :key"), {"key": f'%"{key}"%'}
+    ):
+        try:
+            data = json.loads(payload)
+        except (TypeError, ValueError):
+            continue
+        old = data.get(key) if isinstance(data, dict) else None
+        if not isinstance(old, str) or old not in new_ids:
+            continue
+        data[key] = new_ids[old]
+        if dedupe_key and dedupe_key.endswith(':' + old):
+            dedupe_key = dedupe_key[:-len(old)] + new_ids[old]
+        updates.append({"id": job_id, "payload": json.dumps(data), "dedupe_key": dedupe_key})
+    if updates:
+        conn.execute(text("UPDATE jobs SET payload = :payload, dedupe_key = :dedupe_key WHERE id = :id"), updates)
+
+
+@migration(5, "sequence-backed booking references and time-ordered keys")
+def sequences_and_keys(conn, metadata):
+    metadata.tables['sequences'].create(conn, checkfirst=True)
+    if conn.execute(text("SELECT 1 FROM sequences WHERE name = 'bookings'")).first() is None:
+        conn.execute(text("INSERT INTO sequences (name, next_value) VALUES ('bookings', 1)"))
+    # Bookings from before migration 2 never got a reference; existing ones are left alone
+    missing = conn.execute(text(
+        "SELECT id FROM bookings WHERE booking_reference IS NULL OR receipt_number IS NULL"
+    )).scalars().all()
+    if missing:
+        start = conn.execute(text("SELECT next_value FROM sequences WHERE name = 'bookings'")).scalar()
+        conn.execute(text(
+            "UPDATE bookings SET booking_reference = COALESCE(booking_reference, :ref), "
+            "receipt_number = COALESCE(receipt_number, :receipt) WHERE id = :id"
+        ), [{"id": booking_id, "ref": ids.booking_reference(start + n), "receipt": ids.receipt_number(start + n)}
+            for n, booking_id in enumerate(missing)])
+        conn.execute(text("UPDATE sequences SET next_value = :next WHERE name = 'bookings'"),
+                     {"next": start + len(missing)})
+    # Rewriting keys in place relies on SQLite not enforcing foreign keys (database.py leaves
+    # them off); server databases keep their existing keys and only new rows get the new ones
+    if conn.dialect.name == 'sqlite':
+        for table, children in REKEYED_TABLES:
+            rekey(conn, table, children)
+
+
+@migration(6, "trip amenities as a bitmask")
+def amenity_masks(conn, metadata):
+    if not add_column(conn, 'trips', 'amenity_mask', 'BIGINT NOT NULL DEFAULT 0'):
+        return
+    if 'amenities' not in table_columns(conn, 'trips'):
+        return
+    # The JSON column stays behind, unread; names outside catalog.AMENITIES are dropped from the mask
+    masks = {}
+    for trip_id, raw in conn.execute(text("SELECT id, amenities FROM trips WHERE amenities NOT IN ('', '[]')")):
+        try:
+            names = json.loads(raw)
+        except (TypeError, ValueError):
+            continue
+        mask = 0
+        for name in names if isinstance(names, list) else []:
+            try:
+                mask |= amenity_mask([str(name)])
+            except ValueError:
+                pass
+        if mask:
+            masks.setdefault(mask, []).append(trip_id)
+    for mask, trip_ids in masks.items():
+        conn.execute(text("UPDATE trips SET amenity_mask = :mask WHERE id = :id"),
+                     [{"mask": mask, "id": trip_id} for trip_id in trip_ids])
+
+
+@migration(7, "per-route, per-day fare calendar")
+def fare_calendar(conn, metadata):
+    metadata.tables['fare_calendar'].create(conn, checkfirst=True)
+    if conn.execute(text("SELECT 1 FROM fare_calendar")).first() is not None:
+        return
+    # Upcoming days only: the calendar never shows days that have gone
+    now = datetime.utcnow()
+    today = datetime(now.year, now.month, now.day)
+    days = {}
+    for from_loc, to_loc, departure, price, seats in conn.execute(text(
+        "SELECT from_location, to_location, departure_time, price_per_seat, available_seats FROM trips "
+        "WHERE status = 'scheduled' AND departure_time >= :today"
+    ), {"today": today}):
+        departure = datetime.fromisoformat(departure) if isinstance(departure, str) else departure
+        day = days.setdefault((from_loc, to_loc, departure.date()), [None, 0, 0])
+        if seats > 0:
+            day[0] = price if day[0] is None else min(day[0], price)
+            day[1] += 1
+            day[2] += seats
+    if days:
+        conn.execute(text(
+            "INSERT INTO fare_calendar (from_location, to_location, day, from_key, to_key, min_fare, "
+            "bookable_trips, available_seats, updated_at) "
+            "VALUES (:from_location, :to_location, :day, :from_key, :to_key, :min_fare, :trips, :seats, :now)"
+        ), [{"from_location": from_loc, "to_location": to_loc, "day": day, "from_key": normalize_city(from_loc),
+             "to_key": normalize_city(to_loc), "min_fare": min_fare, "trips": trips, "seats": seats, "now": now}
+            for (from_loc, to_loc, day), (min_fare, trips, seats) in days.items()])
+
+
+@migration(8, "archive tables for departed trips, old bookings and their payments")
+def archive_tables(conn, metadata):
+    for table in ('trips_archive', 'bookings_archive', 'payments_archive'):
+        metadata.tables[table].create(conn, checkfirst=True)
+
+
+@migration(9, "operator keys for imported timetables")
+def trip_operator_columns(conn, metadata):
+    for table in ('trips', 'trips_archive'):
+        add_column(conn, table, 'operator', 'VARCHAR(40)')
+        add_column(conn, table, 'operator_ref', 'VARCHAR(100)')
+    create_index(conn, 'ix_trips_operator_ref', 'trips', ['operator', 'operator_ref'], unique=True)
+
+
+# ==================== RUNNER ====================
+
+def _ensure_version_table(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at DATETIME)"
+        ))
+
+
+def applied_versions(engine):
+    _ensure_version_table(engine)
+    with engine.connect() as conn:
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def upgrade(engine, metadata):
+    """Apply pending migrations in order; returns [(version, description)] applied."""
+    done = applied_versions(engine)
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            fn(conn, metadata)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": version, "d": description, "t": datetime.utcnow()}
+            )
+        applied.append((version, description))
+    return applied
@@ -0,0 +1,190 @@
+# backend/models.py - database models
+from datetime import datetime
+import os
+import hashlib
+import hmac
+
+from catalog import amenity_names
+from extensions import db
+from ids import new_id
+
+# ==================== DATABASE MODELS ====================
+
+class User(db.Model):
+    __tablename__ = 'users'
+    
+    id = db.Column(db.String(36), primary_key=True, default=new_id)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), unique=True, nullable=False)
+    phone = db.Column(db.String(20), nullable=False)
+    password_hash = db.Column(db.String(200), nullable=False)
+    role = db.Column(db.String(20), default='passenger')
+    rating = db.Column(db.Float, default=0.0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    trips = db.relationship('Trip', backref='driver', lazy=True, foreign_keys='Trip.driver_id')
+    bookings = db.relationship('Booking', backref='passenger', lazy=True)
+    
+    def set_password(self, password):
+        salt = os.urandom(16).hex()
+        hash_obj = hashlib.sha256((password + salt).encode())
+        self.password_hash = salt + ':' + hash_obj.hexdigest()
+    
+    def check_password(self, password):
+        if ':' not in self.password_hash:
+            return False
+        salt, stored_hash = self.password_hash.split(':')
+        hash_obj = hashlib.sha256((password + salt).encode())
+        return hmac.compare_digest(hash_obj.hexdigest(), stored_hash)
+
+class Trip(db.Model):
+    __tablename__ = 'trips'
+    __table_args__ = (
+        db.Index('ix_trips_status_departure', 'status', 'departure_time'),
+        db.Index('ix_trips_departure_time', 'departure_time'),
+        db.Index('ix_trips_operator_ref', 'operator', 'operator_ref', unique=True),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=new_id)
+    driver_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    from_location = db.Column(db.String(100), nullable=False)
+    to_location = db.Column(db.String(100), nullable=False)
+    departure_time = db.Column(db.DateTime, nullable=False)
+    arrival_time = db.Column(db.DateTime, nullable=False)
+    available_seats = db.Column(db.Integer, nullable=False)
+    price_per_seat = db.Column(db.Float, nullable=False)
+    car_model = db.Column(db.String(100))
+    car_plate = db.Column(db.String(20))
+    car_type = db.Column(db.String(50), default='Sedan')
+    # Bits of catalog.AMENITIES, so `amenities=` searches are a bitwise test in SQL
+    amenity_mask = db.Column(db.BigInteger, nullable=False, default=0)
+    status = db.Column(db.String(20), default='scheduled')
+    # Set on trips loaded by `flask import-timetable`: the operator's code and its own id for the departure
+    operator = db.Column(db.String(40))
+    operator_ref = db.Column(db.String(100))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    bookings = db.relationship('Booking', backref='trip', lazy=True)
+    
+    def get_amenities(self):
+        return amenity_names(self.amenity_mask or 0)
+
+class Booking(db.Model):
+    __tablename__ = 'bookings'
+    __table_args__ = (
+        db.Index('ix_bookings_passenger_created', 'passenger_id', 'created_at', 'id'),
+        db.Index('ix_bookings_trip_id', 'trip_id'),
+    )
+    
+    id = db.Column(db.String(36), primary_key=True, default=new_id)
+    trip_id = db.Column(db.String(36), db.ForeignKey('trips.id'), nullable=False)
+    passenger_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    seats = db.Column(db.Integer, nullable=False)
+    total_price = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), default='confirmed')
+    payment_status = db.Column(db.String(20), default='pending')
+    notes = db.Column(db.Text)
+    booking_reference = db.Column(db.String(20), unique=True)
+    receipt_number = db.Column(db.String(20), unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SeatHold(db.Model):
+    __tablename__ = 'seat_holds'
+    __table_args__ = (db.Index('ix_seat_holds_status_expires', 'status', 'expires_at'),)
+    
+    id = db.Column(db.String(36), primary_key=True, default=new_id)
+    trip_id = db.Column(db.String(36), db.ForeignKey('trips.id'), nullable=False, index=True)
+    booking_id = db.Column(db.String(36), db.ForeignKey('bookings.id'), nullable=False, unique=True)
+    seats = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), default='held')
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    booking = db.relationship('Booking', backref=db.backref('hold', uselist=False))
+
+class Payment(db.Model):
+    __tablename__ = 'payments'
+    __table_args__ = (db.Index('ix_payments_booking_id', 'booking_id'),)
+    
+    id = db.Column(db.String(36), primary_key=True, default=new_id)
+    booking_id = db.Column(db.String(36), db.ForeignKey('bookings.id'), nullable=False)
+    passenger_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    provider = db.Column(db.String(20), nullable=False)
+    # Our reference, shared with the provider; webhooks and verification look payments up by it
+    reference = db.Column(db.String(40), unique=True, nullable=False)
+    # Client-supplied key so a retried "pay" request never starts a second payment
+    idempotency_key = db.Column(db.String(120), unique=True)
+    amount = db.Column(db.Integer, nullable=False)  # kobo
+    currency = db.Column(db.String(3), default='NGN')
+    status = db.Column(db.String(20), default='pending')  # pending, success, failed, needs_refund
+    failure_reason = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    verified_at = db.Column(db.DateTime)
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    __table_args__ = (db.Index('ix_jobs_queue_status_run_after', 'queue', 'status', 'run_after'),)
+    
+    id = db.Column(db.String(36), primary_key=True, default=new_id)
+    queue = db.Column(db.String(40), nullable=False)
+    kind = db.Column(db.String(40), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    # Enqueueing the same dedupe_key twice keeps the first job (webhook redeliveries etc.)
+    dedupe_key = db.Column(db.String(200), unique=True)
+    status = db.Column(db.String(20), default='queued')  # queued, running, done, dead
+    attempts = db.Column(db.Integer, default=0)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+class Sequence(db.Model):
+    """Named counters handed out in blocks by ids.SequenceBlocks."""
+    __tablename__ = 'sequences'
+    
+    name = db.Column(db.String(40), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=1)
+
+class DailyFare(db.Model):
+    """Cheapest open fare and seats left per route and departure day, kept by fares.FareCalendar."""
+    __tablename__ = 'fare_calendar'
+    __table_args__ = (db.Index('ix_fare_calendar_keys_day', 'from_key', 'to_key', 'day'),)
+    
+    from_location = db.Column(db.String(100), primary_key=True)
+    to_location = db.Column(db.String(100), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    # normalize_city() of the locations, which is what searches match on
+    from_key = db.Column(db.String(100), nullable=False)
+    to_key = db.Column(db.String(100), nullable=False)
+    min_fare = db.Column(db.Float)  # NULL when every trip that day is sold out
+    bookable_trips = db.Column(db.Integer, nullable=False, default=0)
+    available_seats = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# ==================== ARCHIVE ====================
+# Rows moved out of the hot tables by archive.Archiver. Same columns plus
+# archived_at, and no foreign keys: a booking's trip and payment move with
+# it, but the users they point at stay behind.
+
+def archive_table(model, name, *indexes):
+    columns = [db.Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+               for column in model.__table__.columns]
+    return db.Table(name, db.metadata, *columns, db.Column('archived_at', db.DateTime, nullable=False), *indexes)
+
+class ArchivedTrip(db.Model):
+    __table__ = archive_table(Trip, 'trips_archive')
+    
+    driver = db.relationship(User, primaryjoin='foreign(ArchivedTrip.driver_id) == User.id', viewonly=True)
+    
+    get_amenities = Trip.get_amenities
+
+class ArchivedBooking(db.Model):
+    __table__ = archive_table(Booking, 'bookings_archive',
+                              db.Index('ix_bookings_archive_passenger_created', 'passenger_id', 'created_at', 'id'))
+    
+    trip = db.relationship(ArchivedTrip, primaryjoin='foreign(ArchivedBooking.trip_id) == ArchivedTrip.id',
+                           viewonly=True)
+
+class ArchivedPayment(db.Model):
+    __table__ = archive_table(Payment, 'payments_archive')
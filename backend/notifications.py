@@ -0,0 +1,201 @@
+# backend/notifications.py - booking emails through a transactional outbox
+import os
+import smtplib
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+
+NOTIFICATIONS_QUEUE = 'notifications'
+
+TEMPLATES = {
+    'booking_created': (
+        "Booking {booking_reference} received - {from_location} to {to_location}",
+        "Hello {name},\n\n"
+        "We're holding {seats} seat(s) for you on {from_location} -> {to_location}, "
+        "departing {departure}.\n"
+        "Total: NGN {total_price:,.2f}\n\n"
+        "Complete payment before {hold_expires_at} to keep your seats.\n\n"
+        "Booking reference: {booking_reference}\n\n"
+        "- RideNaija\n"
+    ),
+    'booking_confirmed': (
+        "Confirmed: {from_location} to {to_location} on {departure}",
+        "Hello {name},\n\n"
+        "Your payment was received and your trip is confirmed.\n\n"
+        "Route: {from_location} -> {to_location}\n"
+        "Departure: {departure}\n"
+        "Driver: {driver_name}\n"
+        "Seats: {seats}\n"
+        "Paid: NGN {total_price:,.2f}\n"
+        "Booking reference: {booking_reference}\n"
+        "Receipt number: {receipt_number}\n\n"
+        "Safe travels!\n- RideNaija\n"
+    ),
+}
+
+
+def booking_context(booking, passenger, hold_expires_at=None):
+    """Everything the templates need, captured when the notification is queued."""
+    trip = booking.trip
+    return {
+        "to": passenger.email,
+        "name": passenger.name,
+        "booking_id": booking.id,
+        "booking_reference": booking.booking_reference,
+        "receipt_number": booking.receipt_number,
+        "seats": booking.seats,
+        "total_price": booking.total_price,
+        "from_location": trip.from_location,
+        "to_location": trip.to_location,
+        "departure": trip.departure_time.strftime('%a %d %b %Y, %H:%M'),
+        "driver_name": trip.driver.name if trip.driver else "Unknown Driver",
+        "hold_expires_at": hold_expires_at.strftime('%H:%M UTC') if hold_expires_at else "",
+    }
+
+
+def render(kind, context, sender):
+    subject, body = TEMPLATES[kind]
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = context['to']
+    message['Subject'] = subject.format(**context)
+    message['Date'] = formatdate(usegmt=True)
+    message['Message-ID'] = make_msgid(domain=sender.rpartition('@')[2] or None)
+    message.set_content(body.format(**context))
+    return message
+
+
+# ==================== TRANSPORTS ====================
+
+class FileTransport:
+    """Writes each message to <directory>/<timestamp>-<id>.eml; the local stand-in for SMTP."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def send(self, message):
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:12]}.eml"
+        with open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(message.as_bytes())
+
+    def close(self):
+        pass
+
+
+class SMTPTransport:
+    """One SMTP connection, opened lazily and kept for as many batches as the server allows."""
+
+    def __init__(self, host, port=587, username=None, password=None, use_tls=True, timeout=10):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._smtp = None
+
+    def open(self):
+        if self._smtp is not None:
+            return
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password)
+        self._smtp = smtp
+
+    def send(self, message):
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped an idle connection; reconnect once
+            self._smtp = None
+            self.open()
+            self._smtp.send_message(message)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            self._smtp = None
+
+
+def make_transport_factory(config):
+    """Zero-argument callable building a transport from MAIL_* settings."""
+    if config['MAIL_TRANSPORT'] == 'smtp':
+        return lambda: SMTPTransport(config['MAIL_SERVER'], config['MAIL_PORT'], config['MAIL_USERNAME'],
+                                     config['MAIL_PASSWORD'], config['MAIL_USE_TLS'])
+    if config['MAIL_TRANSPORT'] == 'file':
+        return lambda: FileTransport(config['MAIL_FILE_DIR'])
+    raise RuntimeError(f"Unknown MAIL_TRANSPORT {config['MAIL_TRANSPORT']!r}")
+
+
+# ==================== SERVICE ====================
+
+class NotificationService:
+    """Queues emails in the caller's transaction and sends them in batches from the job workers.
+
+    queue() only inserts a row into the jobs table, so a booking commits
+    with its email or not at all, and never waits on SMTP. Each worker
+    thread keeps its own transport (and so its own SMTP connection)
+    across batches.
+    """
+
+    def __init__(self, job_queue, sender='noreply@ridenaija.ng', transport_factory=None):
+        self.jobs = job_queue
+        self.sender = sender
+        self.transport_factory = transport_factory
+        self._local = threading.local()
+
+    def configure(self, sender, transport_factory):
+        self.sender = sender
+        self.transport_factory = transport_factory
+        self._local = threading.local()
+
+    def queue(self, kind, context):
+        """Outbox one email; a given kind is sent at most once per booking."""
+        return self.jobs.enqueue(NOTIFICATIONS_QUEUE, kind, context,
+                                 dedupe_key=f"{kind}:{context['booking_id']}")
+
+    def _transport(self):
+        transport = getattr(self._local, 'transport', None)
+        if transport is None:
+            transport = self._local.transport = self.transport_factory()
+        return transport
+
+    def send_batch(self, jobs):
+        """Batch handler for JobQueue: {job_id: exception or None}."""
+        results = {}
+        transport = self._transport()
+        try:
+            transport.open()
+        except Exception as e:
+            self._local.transport = None
+            return {job_id: e for job_id, _, _, _ in jobs}
+        for job_id, kind, context, _ in jobs:
+            try:
+                transport.send(render(kind, context, self.sender))
+                results[job_id] = None
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                # Connection is gone: fail the rest of the batch and start fresh next time
+                transport.close()
+                self._local.transport = None
+                for pending_id, _, _, _ in jobs:
+                    results.setdefault(pending_id, e)
+                return results
+            except Exception as e:
+                results[job_id] = e
+        return results
+
+    def close(self):
+        transport = getattr(self._local, 'transport', None)
+        if transport is not None:
+            transport.close()
+            self._local.transport = None
@@ -0,0 +1,47 @@
+# backend/pagination.py - keyset cursors, page limits and NDJSON streaming
+import base64
+import json
+from datetime import datetime
+
+from flask import current_app, request
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+STREAM_BATCH_SIZE = 200
+
+
+def parse_limit(value, default=DEFAULT_LIMIT):
+    """Page size from a query-string value, clamped to 1..MAX_LIMIT. Raises ValueError."""
+    if value in (None, ''):
+        return default
+    return max(1, min(int(value), MAX_LIMIT))
+
+
+def encode_cursor(timestamp, row_id):
+    """Opaque cursor for the keyset position (timestamp, id)."""
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) from a cursor made by encode_cursor. Raises ValueError."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), str(row_id)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def wants_stream():
+    """True when the client asked for NDJSON via ?stream=1 or the Accept header."""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'ndjson'):
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+
+def ndjson_lines(items):
+    """One line per item, encoded by the app's JSON provider like buffered responses."""
+    encode = current_app.json.dumps
+    for item in items:
+        yield encode(item) + '\n'
@@ -0,0 +1,309 @@
+# backend/payments.py - payment providers and background verification
+import hashlib
+import hmac
+import json
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from ids import new_id
+from inventory import HoldExpired
+from jobs import RetryLater
+from models import Booking, Payment
+
+PAYMENTS_QUEUE = 'payments'
+SIGNATURE_HEADER = 'X-Paystack-Signature'
+
+# status is one of 'success', 'failed', 'pending'; amount is in kobo
+VerifyResult = namedtuple('VerifyResult', ['status', 'amount', 'currency'])
+
+# What a webhook told us, once its signature checked out
+WebhookEvent = namedtuple('WebhookEvent', ['event_id', 'event', 'reference', 'status', 'amount', 'currency'])
+
+
+class PaymentProviderError(Exception):
+    pass
+
+
+def to_kobo(naira):
+    return int(round(naira * 100))
+
+
+# ==================== PROVIDERS ====================
+
+class PaystackProvider:
+    """Paystack over its REST API. The browser pays with Paystack Inline using our reference."""
+
+    name = 'paystack'
+    # Paystack transaction statuses that can still turn into a success
+    PENDING_STATUSES = ('ongoing', 'pending', 'processing', 'queued', 'abandoned')
+
+    def __init__(self, secret_key, public_key=None, base_url='https://api.paystack.co', timeout=10):
+        self.secret_key = secret_key
+        self.public_key = public_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def checkout(self, payment, email):
+        """Parameters the client needs to open the provider's checkout for `payment`."""
+        return {
+            "provider": self.name,
+            "public_key": self.public_key,
+            "reference": payment.reference,
+            "amount": payment.amount,
+            "currency": payment.currency,
+            "email": email,
+        }
+
+    def verify(self, reference):
+        request = urllib.request.Request(
+            f"{self.base_url}/transaction/verify/{reference}",
+            headers={"Authorization": f"Bearer {self.secret_key}"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = json.load(response)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return VerifyResult('pending', None, None)
+            raise PaymentProviderError(f"Paystack verify failed with HTTP {e.code}")
+        except (urllib.error.URLError, TimeoutError, ValueError) as e:
+            raise PaymentProviderError(f"Paystack verify failed: {e}")
+        data = body.get('data') or {}
+        return VerifyResult(self._status(data.get('status')), data.get('amount'), data.get('currency'))
+
+    def _status(self, status):
+        if status == 'success':
+            return 'success'
+        if status in self.PENDING_STATUSES:
+            return 'pending'
+        return 'failed'
+
+    def sign(self, body):
+        return hmac.new(self.secret_key.encode(), body, hashlib.sha512).hexdigest()
+
+    def verify_signature(self, body, signature):
+        return bool(signature) and hmac.compare_digest(self.sign(body), signature)
+
+    def parse_webhook(self, body):
+        """WebhookEvent from a Paystack charge.* payload; ValueError if it isn't one."""
+        payload = json.loads(body)
+        data = payload.get('data') or {}
+        event = payload.get('event', '')
+        if not event.startswith('charge.') or not data.get('reference'):
+            raise ValueError(f"unsupported webhook event {event!r}")
+        return WebhookEvent(str(data.get('id') or data['reference']), event, data['reference'],
+                            self._status(data.get('status')), data.get('amount'), data.get('currency'))
+
+
+class FakePaystackProvider(PaystackProvider):
+    """In-process stand-in for Paystack, for development, tests and benchmarks.
+
+    Opening checkout counts as the customer paying: the charge ends in
+    `outcome` and verify() reports it after `latency` seconds. Checkout may
+    have happened in another process (a gunicorn worker, with verification
+    in `flask run-jobs`), so an unknown reference is answered from our own
+    payments row as if the customer paid exactly what was asked. Webhooks
+    are signed with the same HMAC scheme as the real thing (see
+    signed_webhook).
+    """
+
+    name = 'fake'
+
+    def __init__(self, secret_key='sk_test_fake', latency=0.2, outcome='success'):
+        super().__init__(secret_key, public_key='pk_test_fake', base_url='http://fake-paystack.invalid')
+        self.latency = latency
+        self.outcome = outcome
+        self.charges = {}
+
+    def checkout(self, payment, email):
+        self.charges[payment.reference] = VerifyResult(self.outcome, payment.amount, payment.currency)
+        return super().checkout(payment, email)
+
+    def verify(self, reference):
+        time.sleep(self.latency)
+        if reference in self.charges:
+            return self.charges[reference]
+        row = db.session.execute(
+            select(Payment.amount, Payment.currency).where(Payment.reference == reference)
+        ).first()
+        if row is None:
+            return VerifyResult('pending', None, None)
+        return VerifyResult(self.outcome, row.amount, row.currency)
+
+    def signed_webhook(self, reference, status='success', amount=None, currency='NGN'):
+        """(body, signature) for a charge webhook as Paystack would send it."""
+        body = json.dumps({
+            "event": "charge.success" if status == 'success' else "charge.failed",
+            "data": {"id": uuid.uuid4().int % 10 ** 9, "reference": reference, "status": status,
+                     "amount": amount, "currency": currency}
+        }).encode()
+        return body, self.sign(body)
+
+
+def make_provider(config):
+    name = config['PAYMENT_PROVIDER']
+    if name == 'paystack':
+        if not config['PAYSTACK_SECRET_KEY']:
+            raise RuntimeError("PAYMENT_PROVIDER=paystack needs PAYSTACK_SECRET_KEY")
+        return PaystackProvider(config['PAYSTACK_SECRET_KEY'], config['PAYSTACK_PUBLIC_KEY'],
+                                config['PAYSTACK_BASE_URL'])
+    if name == 'fake':
+        if not config.get('ALLOW_FAKE_PAYMENTS', True):
+            raise RuntimeError("PAYMENT_PROVIDER=fake approves every checkout and is refused by this config; "
+                               "set PAYSTACK_SECRET_KEY")
+        return FakePaystackProvider(config['PAYSTACK_SECRET_KEY'] or 'sk_test_fake',
+                                    config['FAKE_PAYMENT_LATENCY'], config['FAKE_PAYMENT_OUTCOME'])
+    raise RuntimeError(f"Unknown PAYMENT_PROVIDER {name!r}")
+
+
+# ==================== SERVICE ====================
+
+class PaymentService:
+    """Starts payments in the request and settles them from the job queue.
+
+    The request only records a pending Payment and queues a `verify` job,
+    so it never waits on the provider. Verification and signed webhooks
+    both settle through _settle, whose conditional UPDATE lets exactly one
+    of them confirm the booking however often either is delivered.
+    """
+
+    def __init__(self, db, inventory, job_queue, provider=None):
+        self.db = db
+        self.inventory = inventory
+        self.jobs = job_queue
+        self.provider = provider
+        # Called with the booking id inside the transaction that confirms it
+        self.on_paid = None
+
+    def configure(self, provider):
+        self.provider = provider
+
+    def handlers(self):
+        return {'verify': self.handle_verify, 'webhook': self.handle_webhook}
+
+    def start(self, booking, idempotency_key=None):
+        """Pending Payment for the booking, reusing one from the same key; returns (payment, created).
+
+        If a concurrent request inserts a payment under the same key first, the
+        session is rolled back and that payment is returned instead.
+        """
+        session = self.db.session
+        if idempotency_key:
+            # Keys only have to be unique per customer
+            idempotency_key = f"{booking.passenger_id}:{idempotency_key}"
+            existing = self._reuse(booking, idempotency_key)
+        else:
+            existing = session.execute(
+                select(Payment).where(Payment.booking_id == booking.id, Payment.status == 'pending')
+                .order_by(Payment.created_at.desc()).limit(1)
+            ).scalar()
+        if existing is not None:
+            return existing, False
+        payment = Payment(
+            booking_id=booking.id,
+            passenger_id=booking.passenger_id,
+            provider=self.provider.name,
+            reference='PAY' + new_id(),
+            idempotency_key=idempotency_key,
+            amount=to_kobo(booking.total_price),
+            currency='NGN',
+            status='pending'
+        )
+        session.add(payment)
+        try:
+            session.flush()
+        except IntegrityError:
+            session.rollback()
+            existing = self._reuse(booking, idempotency_key) if idempotency_key else None
+            if existing is None:
+                raise
+            return existing, False
+        self.jobs.enqueue(PAYMENTS_QUEUE, 'verify', {'reference': payment.reference},
+                          dedupe_key=f'verify:{payment.reference}')
+        return payment, True
+
+    def _reuse(self, booking, idempotency_key):
+        """The payment already made under the key, if any; ValueError if it was for another booking."""
+        existing = self.db.session.execute(
+            select(Payment).where(Payment.idempotency_key == idempotency_key)
+        ).scalar()
+        if existing is not None and existing.booking_id != booking.id:
+            raise ValueError("Idempotency key was used for a different booking")
+        return existing
+
+    def accept_webhook(self, body, signature):
+        """Verify and queue a webhook. Raises PermissionError / ValueError; True if newly queued."""
+        if not self.provider.verify_signature(body, signature):
+            raise PermissionError("Invalid webhook signature")
+        event = self.provider.parse_webhook(body)
+        return self.jobs.enqueue(PAYMENTS_QUEUE, 'webhook', event._asdict(),
+                                 dedupe_key=f'webhook:{self.provider.name}:{event.event}:{event.event_id}')
+
+    # ---------- job handlers ----------
+
+    def handle_verify(self, payload):
+        payment = self._payment(payload['reference'])
+        if payment is None or payment.status != 'pending':
+            return
+        result = self.provider.verify(payment.reference)
+        if result.status == 'pending':
+            age = (datetime.utcnow() - payment.created_at).total_seconds()
+            if age > self.inventory.hold_ttl.total_seconds():
+                self._settle(payment, 'failed', reason='Payment not completed before the seat hold expired')
+                return
+            # Poll quickly at first, then back off as the customer takes longer
+            raise RetryLater(min(60, max(2, age / 4)), "payment still pending at provider")
+        self._settle(payment, result.status, result.amount, result.currency)
+
+    def handle_webhook(self, payload):
+        payment = self._payment(payload['reference'])
+        if payment is None or payment.status != 'pending' or payload['status'] == 'pending':
+            return
+        self._settle(payment, payload['status'], payload['amount'], payload['currency'])
+
+    # ---------- settlement ----------
+
+    def _payment(self, reference):
+        return self.db.session.execute(select(Payment).where(Payment.reference == reference)).scalar()
+
+    def _settle(self, payment, status, amount=None, currency=None, reason=None):
+        """Record the outcome in the caller's transaction (the job queue commits it)."""
+        session = self.db.session
+        now = datetime.utcnow()
+        if status == 'success' and (amount != payment.amount or (currency or 'NGN') != payment.currency):
+            status, reason = 'failed', f"Provider reported {amount} {currency}, expected {payment.amount} {payment.currency}"
+        elif status == 'failed' and reason is None:
+            reason = 'Declined by payment provider'
+
+        if status == 'success':
+            try:
+                self.inventory.confirm(payment.booking_id, now)
+            except HoldExpired:
+                # Money arrived after the seats went back on sale
+                status, reason = 'needs_refund', 'Seat hold expired before payment completed'
+
+        settled = session.execute(
+            update(Payment).where(Payment.id == payment.id, Payment.status == 'pending')
+            .values(status=status, failure_reason=reason, verified_at=now),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+        if not settled:
+            # Someone else (webhook vs. verify job) settled it first
+            session.rollback()
+            return
+        if status == 'success':
+            session.execute(
+                update(Booking).where(Booking.id == payment.booking_id)
+                .values(payment_status='paid', status='confirmed'),
+                execution_options={'synchronize_session': False}
+            )
+            if self.on_paid:
+                self.on_paid(payment.booking_id)
@@ -0,0 +1,38 @@
+# backend/precomputed.py - reference payloads serialized and compressed once
+import gzip
+import hashlib
+import json
+
+from flask import Response, request
+
+
+class PrecomputedResponse:
+    """A JSON payload encoded, gzipped and ETagged up front.
+
+    Each encoding is its own representation, so each gets its own strong
+    ETag. A matching If-None-Match gets a 304 with no body.
+    """
+
+    def __init__(self, payload, max_age=86400):
+        self.body = json.dumps(payload, separators=(',', ':'), sort_keys=True).encode()
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = digest
+        self.gzip_etag = digest + '-gzip'
+        self.max_age = max_age
+
+    def response(self):
+        use_gzip = 'gzip' in request.accept_encodings
+        etag = self.gzip_etag if use_gzip else self.etag
+
+        if request.if_none_match.contains(self.etag) or request.if_none_match.contains(self.gzip_etag):
+            rv = Response(status=304)
+        else:
+            rv = Response(self.gzip_body if use_gzip else self.body, mimetype='application/json')
+            if use_gzip:
+                rv.headers['Content-Encoding'] = 'gzip'
+
+        rv.set_etag(etag)
+        rv.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        rv.vary.add('Accept-Encoding')
+        return rv
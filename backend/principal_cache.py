@@ -0,0 +1,74 @@
+# backend/principal_cache.py - bounded TTL cache of authenticated users
+from collections import OrderedDict, namedtuple
+import threading
+import time
+
+# What protected endpoints need to know about the caller
+Principal = namedtuple('Principal', ['id', 'name', 'email', 'role', 'rating'])
+
+
+def principal_from_user(user):
+    return Principal(user.id, user.name, user.email, user.role, user.rating)
+
+
+class PrincipalCache:
+    """LRU cache of Principal by user id with a per-entry TTL.
+
+    Entries are dropped explicitly when the user row changes (see
+    invalidate); the TTL bounds how long another worker process can serve a
+    stale copy.
+    """
+
+    def __init__(self, maxsize=10000, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, maxsize, ttl):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._entries.clear()
+
+    def get(self, user_id, loader):
+        """Cached principal for user_id, calling loader(user_id) on a miss. None if no such user."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        principal = loader(user_id)
+        if principal is not None:
+            with self._lock:
+                self._entries[user_id] = (principal, now + self.ttl)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return principal
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
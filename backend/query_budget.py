@@ -0,0 +1,119 @@
+# backend/query_budget.py - per-request SQL query counting and budgets
+from functools import wraps
+import logging
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+# Response header carrying the request's statement count (QUERY_COUNT_HEADER config)
+QUERY_COUNT_HEADER = 'X-SQL-Queries'
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_app_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+
+
+if not event.contains(Engine, 'before_cursor_execute', _count_query):
+    event.listen(Engine, 'before_cursor_execute', _count_query)
+
+
+def query_count():
+    """Statements executed so far in the current app context."""
+    return g.get('sql_query_count', 0)
+
+
+class count_queries:
+    """Context manager for scripts and tests: `with count_queries() as c: ...; c.count`."""
+
+    def __enter__(self):
+        self._start = query_count()
+        self.count = 0
+        return self
+
+    def __exit__(self, *exc):
+        self.count = query_count() - self._start
+        return False
+
+
+def init_query_count_header(app):
+    """Report each request's SQL statement count in the X-SQL-Queries header."""
+    @app.before_request
+    def mark_query_count():
+        g.sql_query_count_at_start = query_count()
+
+    @app.after_request
+    def add_query_count_header(response):
+        response.headers[QUERY_COUNT_HEADER] = str(query_count() - g.get('sql_query_count_at_start', 0))
+        return response
+
+
+class _Budget:
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.start = query_count()
+        self.committed = False
+
+    def used(self):
+        return query_count() - self.start
+
+    def message(self):
+        return f"{self.name} ran {self.used()} SQL queries (budget {self.limit})"
+
+
+def _strict():
+    return current_app.config.get('QUERY_BUDGET_STRICT', current_app.testing)
+
+
+def _check_before_commit(session):
+    # Raised here the view's write is rolled back, so an overrun never fails a request that already saved
+    budget = g.get('query_budget') if has_app_context() else None
+    if budget is None or not _strict():
+        return
+    # before_commit runs ahead of the commit's own flush; count those statements too
+    session.flush()
+    if budget.used() > budget.limit:
+        raise QueryBudgetExceeded(budget.message())
+
+
+def _mark_committed(session):
+    budget = g.get('query_budget') if has_app_context() else None
+    if budget is not None:
+        budget.committed = True
+
+
+if not event.contains(Session, 'before_commit', _check_before_commit):
+    event.listen(Session, 'before_commit', _check_before_commit)
+    event.listen(Session, 'after_commit', _mark_committed)
+
+
+def query_budget(limit):
+    """Fail (under TESTING or QUERY_BUDGET_STRICT) or log when a view runs more than `limit` queries.
+
+    The strict check runs before each commit inside the view as well as
+    after it returns; statements run after a commit are only logged, as the
+    request has already saved its work.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            budget = g.query_budget = _Budget(f.__name__, limit)
+            try:
+                rv = f(*args, **kwargs)
+            finally:
+                g.pop('query_budget', None)
+            if budget.used() > limit:
+                if _strict() and not budget.committed:
+                    raise QueryBudgetExceeded(budget.message())
+                current_app.logger.log(logging.ERROR if _strict() else logging.WARNING, budget.message())
+            return rv
+        return decorated_function
+    return decorator
@@ -0,0 +1,26 @@
+# backend/query_plans.py - EXPLAIN QUERY PLAN checks for endpoint queries (SQLite)
+import re
+
+# "SCAN trips" is a full table scan; "SCAN trips USING INDEX ..." walks a whole
+# index, which is no better for a selective query. SEARCH lines are seeks.
+_FULL_SCAN = re.compile(r'^SCAN (\w+)')
+
+
+def explain(session, statement):
+    """EXPLAIN QUERY PLAN detail lines for a SQLAlchemy statement."""
+    bind = session.get_bind()
+    compiled = statement.compile(dialect=bind.dialect, compile_kwargs={'render_postcompile': True})
+    # The plan does not depend on bound values, only on their positions
+    params = tuple(None for _ in (compiled.positiontup or ()))
+    rows = session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params).all()
+    return [row[-1] for row in rows]
+
+
+def full_scans(plan_lines, allowed=()):
+    """Tables the plan scans in full, ignoring tables listed in `allowed`."""
+    scans = []
+    for line in plan_lines:
+        match = _FULL_SCAN.match(line.strip())
+        if match and match.group(1) not in allowed:
+            scans.append(line.strip())
+    return scans
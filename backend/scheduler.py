@@ -0,0 +1,52 @@
+# backend/scheduler.py - rolling-horizon timetable planning
+import threading
+from datetime import timedelta
+
+from catalog import ROUTES
+
+# Every route runs these departures each day (UTC hours)
+TIME_SLOTS = [8, 12, 16]
+DEFAULT_HORIZON_DAYS = 90
+
+
+def horizon_window(now, days):
+    """[now, end) covering today plus `days` further days."""
+    start_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return now, start_day + timedelta(days=days + 1)
+
+
+def plan_departures(now, days, existing=frozenset(), routes=ROUTES, slots=TIME_SLOTS):
+    """Yield (route, departure_time, arrival_time) for every future slot not in `existing`.
+
+    `existing` holds (from_location, to_location, departure_time) keys that are
+    already scheduled, so calling this repeatedly only tops the horizon up.
+    """
+    start_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    for day in range(days + 1):
+        current_date = start_day + timedelta(days=day)
+        for route in routes:
+            for time_slot in slots:
+                departure_time = current_date.replace(hour=time_slot)
+                if departure_time < now:
+                    continue
+                if (route['from'], route['to'], departure_time) in existing:
+                    continue
+                yield route, departure_time, departure_time + timedelta(hours=route['duration_hours'])
+
+
+def start_schedule_worker(run, interval_seconds=3600):
+    """Call `run()` now and then every `interval_seconds` on a daemon thread."""
+    stop = threading.Event()
+
+    def loop():
+        while True:
+            try:
+                run()
+            except Exception as e:
+                print(f"❌ Schedule top-up failed: {e}")
+            if stop.wait(interval_seconds):
+                return
+
+    thread = threading.Thread(target=loop, name='schedule-worker', daemon=True)
+    thread.start()
+    return stop
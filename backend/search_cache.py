@@ -0,0 +1,125 @@
+# backend/search_cache.py - versioned cache of encoded /api/trips pages
+from collections import OrderedDict
+import threading
+import time
+
+
+class SearchCache:
+    """Encoded search responses keyed on the normalized query, LRU within a byte cap.
+
+    Entries record the version of every (route, day) bucket they were built
+    from. TripIndex reports each change (see on_index_change), which bumps
+    that bucket, so an entry is dropped exactly when a trip it could contain
+    changes. Seat-count-only changes may be served stale for up to
+    `seat_staleness` seconds; a trip selling out or coming back, a new
+    departure, a new route or an index reload always invalidates.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=60.0, seat_staleness=0.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.seat_staleness = seat_staleness
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        # (route_key, day or None) -> [membership_version, seat_version]
+        self._versions = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.invalidations = 0
+
+    def configure(self, max_bytes, ttl, seat_staleness):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self.ttl = ttl
+            self.seat_staleness = seat_staleness
+            self._entries.clear()
+            self._bytes = 0
+
+    # ---------- invalidation ----------
+
+    def on_index_change(self, route_key, departure_time, membership_changed):
+        """TripIndex listener."""
+        with self._lock:
+            if route_key is None:
+                # Index reloaded or the set of routes changed
+                self._generation += 1
+                self._versions.clear()
+                self.invalidations += 1
+                return
+            slot = 0 if membership_changed else 1
+            for bucket in ((route_key, departure_time.date()), (route_key, None)):
+                self._versions.setdefault(bucket, [0, 0])[slot] += 1
+            self.invalidations += 1
+
+    def clear(self):
+        self.on_index_change(None, None, True)
+
+    # ---------- lookup ----------
+
+    def _snapshot(self, route_keys, day):
+        return tuple(tuple(self._versions.setdefault((key, day), [0, 0])) for key in route_keys)
+
+    def versions(self, route_keys, day):
+        """Version token to take before reading the data an entry is built from."""
+        with self._lock:
+            return self._generation, self._snapshot(route_keys, day)
+
+    def get(self, key, route_keys, day):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            body, size, generation, versions, stored_at = entry
+            current = self._snapshot(route_keys, day)
+            fresh = generation == self._generation and now - stored_at <= self.ttl
+            if fresh and versions != current:
+                same_membership = all(old[0] == new[0] for old, new in zip(versions, current))
+                fresh = same_membership and len(versions) == len(current) and now - stored_at <= self.seat_staleness
+                if fresh:
+                    self.stale_hits += 1
+            if not fresh:
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, token, body):
+        """Store body under the version token taken before it was computed."""
+        size = len(body) + len(repr(key))
+        if size > self.max_bytes:
+            return
+        generation, versions = token
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._drop(key)
+            self._entries[key] = (body, size, generation, versions, time.monotonic())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
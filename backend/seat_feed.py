@@ -0,0 +1,160 @@
+# backend/seat_feed.py - in-process fan-out of seat counts to Server-Sent Event streams
+import json
+import threading
+import time
+
+
+class Subscription:
+    """One open stream: the trips it watches and the counts it has not sent yet."""
+    __slots__ = ('trip_ids', 'pending', 'wake')
+
+    def __init__(self, trip_ids):
+        self.trip_ids = frozenset(trip_ids)
+        self.pending = {}
+        self.wake = threading.Event()
+
+
+class SeatFeed:
+    """Publishes {trip_id: available_seats} to the streams watching those trips.
+
+    An idle stream costs a Subscription and a thread (or greenlet) blocked
+    on its Event; nothing runs per stream until a watched trip changes.
+    publish() only overwrites the watcher's pending count and sets the
+    Event, so a burst of bookings on one trip reaches a client as a single
+    event per coalescing window. Changes committed in this process are
+    published as they commit; one poller thread per process reads the
+    watched trips every `poll_interval` seconds to pick up what other
+    workers and cron jobs committed.
+    """
+
+    def __init__(self, max_subscribers=1000, poll_interval=2.0):
+        self._lock = threading.Lock()
+        self._by_trip = {}
+        # Last count published for every watched trip; publish() skips repeats
+        self._seats = {}
+        self._subscribers = 0
+        self._poller = None
+        self.max_subscribers = max_subscribers
+        self.poll_interval = poll_interval
+        self.notified = 0
+        self.rejected = 0
+
+    def configure(self, max_subscribers, poll_interval):
+        self.max_subscribers = max_subscribers
+        self.poll_interval = poll_interval
+
+    # ---------- subscribers ----------
+
+    def subscribe(self, seats_by_trip):
+        """Watch the trips in {trip_id: available_seats}.
+
+        Returns (subscription, snapshot), or None once this process holds
+        max_subscribers streams. The snapshot prefers counts already
+        published over the caller's, which may come from an older index.
+        """
+        with self._lock:
+            if self._subscribers >= self.max_subscribers:
+                self.rejected += 1
+                return None
+            subscription = Subscription(seats_by_trip)
+            for trip_id, seats in seats_by_trip.items():
+                self._by_trip.setdefault(trip_id, set()).add(subscription)
+                self._seats.setdefault(trip_id, seats)
+            self._subscribers += 1
+            return subscription, {trip_id: self._seats[trip_id] for trip_id in subscription.trip_ids}
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for trip_id in subscription.trip_ids:
+                watchers = self._by_trip.get(trip_id)
+                if watchers is None:
+                    continue
+                watchers.discard(subscription)
+                if not watchers:
+                    del self._by_trip[trip_id]
+                    self._seats.pop(trip_id, None)
+            self._subscribers -= 1
+
+    def take(self, subscription):
+        """Counts that changed since the subscription last took them."""
+        with self._lock:
+            changes, subscription.pending = subscription.pending, {}
+            subscription.wake.clear()
+        return changes
+
+    # ---------- publishing ----------
+
+    def publish(self, seats_by_trip):
+        woken = set()
+        with self._lock:
+            for trip_id, seats in seats_by_trip.items():
+                watchers = self._by_trip.get(trip_id)
+                if not watchers or self._seats.get(trip_id) == seats:
+                    continue
+                self._seats[trip_id] = seats
+                for subscription in watchers:
+                    subscription.pending[trip_id] = seats
+                    woken.add(subscription)
+            self.notified += len(woken)
+        for subscription in woken:
+            subscription.wake.set()
+
+    def watched(self):
+        with self._lock:
+            return list(self._by_trip)
+
+    def start_poller(self, app, read_seats):
+        """Publish read_seats(trip_ids) -> {trip_id: seats} for the watched trips every poll_interval."""
+        with self._lock:
+            if self._poller is not None:
+                return
+            self._poller = threading.Thread(target=self._poll, args=(app, read_seats),
+                                            name='seat-feed-poller', daemon=True)
+        self._poller.start()
+
+    def _poll(self, app, read_seats):
+        while True:
+            time.sleep(self.poll_interval)
+            trip_ids = self.watched()
+            if not trip_ids:
+                continue
+            try:
+                with app.app_context():
+                    seats = read_seats(trip_ids)
+            except Exception as e:
+                print(f"❌ Seat feed poll error: {e}")
+                continue
+            self.publish(seats)
+
+    def stats(self):
+        with self._lock:
+            return {"subscribers": self._subscribers, "trips": len(self._by_trip),
+                    "notified": self.notified, "rejected": self.rejected}
+
+
+def sse_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def sse_stream(feed, subscription, snapshot, coalesce=0.25, heartbeat=15.0, lifetime=300.0):
+    """Event-stream text for one subscription: the snapshot, then coalesced changes.
+
+    A comment line goes out every `heartbeat` idle seconds, which is also
+    how a closed connection is noticed. After `lifetime` seconds the stream
+    ends and EventSource reconnects, picking up trips added since. The
+    caller unsubscribes when the response closes.
+    """
+    yield f"retry: 2000\n\n{sse_event('seats', snapshot)}"
+    deadline = time.monotonic() + lifetime
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not subscription.wake.wait(min(heartbeat, remaining)):
+            yield ": keepalive\n\n"
+            continue
+        # Let the rest of a burst land in pending before sending
+        time.sleep(coalesce)
+        changes = feed.take(subscription)
+        if changes:
+            yield sse_event('seats', changes)
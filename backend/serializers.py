@@ -0,0 +1,150 @@
+# backend/serializers.py - shared JSON shapes for trips, bookings and drivers
+#
+# These functions only read attributes and relationships that the caller has
+# already loaded. Handlers are expected to fetch rows with the matching
+# eager-loading options (see TRIP_LOAD_OPTIONS / BOOKING_LOAD_OPTIONS in app.py)
+# so serializing a page of results never issues extra queries.
+#
+# With ?fields=a,b a handler serializes only those keys (serialize_trip(trip,
+# fields)), and load options built from field_attributes() select only the
+# columns and relationships they read.
+
+
+def serialize_driver(driver):
+    return {
+        "driver_name": driver.name if driver else "Unknown Driver",
+        "driver_rating": driver.rating if driver else 0.0,
+    }
+
+
+def serialize_trip(trip, fields=None):
+    if fields is not None:
+        return {name: TRIP_FIELDS[name][1](trip) for name in fields}
+    data = {"id": trip.id}
+    data.update(serialize_driver(trip.driver))
+    data.update({
+        "from_location": trip.from_location,
+        "to_location": trip.to_location,
+        "departure_time": trip.departure_time.isoformat(),
+        "arrival_time": trip.arrival_time.isoformat(),
+        "available_seats": trip.available_seats,
+        "price_per_seat": trip.price_per_seat,
+        "car_model": trip.car_model,
+        "car_plate": trip.car_plate,
+        "car_type": trip.car_type,
+        "amenities": trip.get_amenities(),
+        "status": trip.status
+    })
+    return data
+
+
+def serialize_trip_details(trip):
+    """Trip summary embedded in a booking."""
+    if not trip:
+        return {
+            "from_location": "Unknown",
+            "to_location": "Unknown",
+            "departure_time": None,
+            "arrival_time": None,
+            "price_per_seat": 0,
+            "driver_name": "Unknown Driver",
+            "car_model": "",
+            "car_plate": ""
+        }
+    return {
+        "from_location": trip.from_location,
+        "to_location": trip.to_location,
+        "departure_time": trip.departure_time.isoformat(),
+        "arrival_time": trip.arrival_time.isoformat(),
+        "price_per_seat": trip.price_per_seat,
+        "driver_name": serialize_driver(trip.driver)["driver_name"],
+        "car_model": trip.car_model,
+        "car_plate": trip.car_plate
+    }
+
+
+def serialize_booking(booking, fields=None):
+    if fields is not None:
+        return {name: BOOKING_FIELDS[name][1](booking) for name in fields}
+    return {
+        "id": booking.id,
+        "trip_id": booking.trip_id,
+        "seats": booking.seats,
+        "total_price": booking.total_price,
+        "status": booking.status,
+        "payment_status": booking.payment_status,
+        "notes": booking.notes,
+        "booking_reference": booking.booking_reference,
+        "receipt_number": booking.receipt_number,
+        "created_at": booking.created_at.isoformat() if booking.created_at else None,
+        "trip_details": serialize_trip_details(booking.trip)
+    }
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+# ==================== SPARSE FIELDSETS ====================
+
+# Field name -> (model attributes it reads, value); keys in serialize_trip order
+TRIP_FIELDS = {
+    "id": (("id",), lambda trip: trip.id),
+    "driver_name": (("driver",), lambda trip: serialize_driver(trip.driver)["driver_name"]),
+    "driver_rating": (("driver",), lambda trip: serialize_driver(trip.driver)["driver_rating"]),
+    "from_location": (("from_location",), lambda trip: trip.from_location),
+    "to_location": (("to_location",), lambda trip: trip.to_location),
+    "departure_time": (("departure_time",), lambda trip: trip.departure_time.isoformat()),
+    "arrival_time": (("arrival_time",), lambda trip: trip.arrival_time.isoformat()),
+    "available_seats": (("available_seats",), lambda trip: trip.available_seats),
+    "price_per_seat": (("price_per_seat",), lambda trip: trip.price_per_seat),
+    "car_model": (("car_model",), lambda trip: trip.car_model),
+    "car_plate": (("car_plate",), lambda trip: trip.car_plate),
+    "car_type": (("car_type",), lambda trip: trip.car_type),
+    "amenities": (("amenity_mask",), lambda trip: trip.get_amenities()),
+    "status": (("status",), lambda trip: trip.status),
+}
+
+BOOKING_FIELDS = {
+    "id": (("id",), lambda booking: booking.id),
+    "trip_id": (("trip_id",), lambda booking: booking.trip_id),
+    "seats": (("seats",), lambda booking: booking.seats),
+    "total_price": (("total_price",), lambda booking: booking.total_price),
+    "status": (("status",), lambda booking: booking.status),
+    "payment_status": (("payment_status",), lambda booking: booking.payment_status),
+    "notes": (("notes",), lambda booking: booking.notes),
+    "booking_reference": (("booking_reference",), lambda booking: booking.booking_reference),
+    "receipt_number": (("receipt_number",), lambda booking: booking.receipt_number),
+    "created_at": (("created_at",), lambda booking: _isoformat(booking.created_at)),
+    "trip_details": (("trip",), lambda booking: serialize_trip_details(booking.trip)),
+}
+
+
+def parse_fields(value, available):
+    """Names from a ?fields= value, in `available` order; None when absent (all fields). Raises ValueError."""
+    if not value:
+        return None
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names - available.keys()
+    if unknown or not names:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}" if unknown else "fields is empty")
+    return tuple(name for name in available if name in names)
+
+
+def field_attributes(fields, available):
+    """Model attributes the given fields read."""
+    return {attribute for name in fields for attribute in available[name][0]}
+
+
+def serialize_payment(payment):
+    return {
+        "reference": payment.reference,
+        "booking_id": payment.booking_id,
+        "provider": payment.provider,
+        "amount": payment.amount,
+        "currency": payment.currency,
+        "status": payment.status,
+        "failure_reason": payment.failure_reason,
+        "created_at": payment.created_at.isoformat() if payment.created_at else None,
+        "verified_at": payment.verified_at.isoformat() if payment.verified_at else None,
+    }
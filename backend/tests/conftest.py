@@ -0,0 +1,165 @@
+# backend/tests/conftest.py - one throwaway app and SQLite database for the test suite
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import app as ridenaija  # noqa: E402
+from config import Config  # noqa: E402
+
+PASSWORD = 'password123'
+_emails = itertools.count()
+# Trips made by make_trip depart this many hours after a fixed hour tomorrow
+TOMORROW = datetime.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('ridenaija')
+
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp / 'test.db')
+        MAIL_TRANSPORT = 'file'
+        MAIL_FILE_DIR = str(tmp / 'outbox')
+        PAYMENT_PROVIDER = 'fake'
+        SLOW_REQUEST_MS = 0
+        FAKE_PAYMENT_LATENCY = 0
+        QUERY_COUNT_HEADER = True
+        # Every request takes the cold path: principal lookup, uncached
+        # search, and a new block of booking numbers per booking (the route
+        # indexes are dropped by `cold` below)
+        PRINCIPAL_CACHE_TTL = 0
+        SEARCH_CACHE_TTL = 0
+        BOOKING_NUMBER_BLOCK_SIZE = 1
+
+    app = ridenaija.create_app(TestConfig)
+    with app.app_context():
+        ridenaija.migrations.upgrade(ridenaija.db.engine, ridenaija.db.metadata)
+        ridenaija.create_sample_data()
+        ridenaija.generate_trips(3)
+    return app
+
+
+@pytest.fixture
+def app_context(app):
+    """Runs a block in its own app context, so requests never share its session or query count."""
+    return app.app_context
+
+
+@pytest.fixture
+def cold():
+    """Drops the in-process route indexes, so the next request loads them again."""
+    def drop():
+        ridenaija.trip_index.clear()
+        ridenaija.connection_index.loaded = False
+    return drop
+
+
+@pytest.fixture(autouse=True)
+def no_budget_overruns(caplog):
+    """Overruns after a commit are logged rather than raised; fail the test on those too."""
+    yield
+    overruns = [r.getMessage() for r in caplog.records
+                if r.levelno >= logging.WARNING and 'SQL queries (budget' in r.getMessage()]
+    assert not overruns, overruns
+
+
+def at_once(count, fn):
+    """Run fn(n) on `count` threads released together; returns the results in order."""
+    start = threading.Barrier(count)
+
+    def run(n):
+        start.wait()
+        return fn(n)
+
+    with ThreadPoolExecutor(count) as pool:
+        return list(pool.map(run, range(count)))
+
+
+def book(client, trip_id, seats=1):
+    response = client.post('/api/bookings', json={'trip_id': trip_id, 'seats': seats})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['booking']
+
+
+def book_all(client, trip_ids):
+    response = client.post('/api/bookings/batch', json={'bookings': [{'trip_id': t} for t in trip_ids]})
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['bookings']
+
+
+def walk(client, path, key, **query):
+    """Ids of every item of a paged endpoint, following next_cursor."""
+    ids, cursor = [], None
+    while True:
+        response = client.get(path, query_string=dict(query, cursor=cursor) if cursor else query)
+        assert response.status_code == 200, response.get_json()
+        page = response.get_json()
+        ids.extend(item['id'] for item in page[key])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids
+
+
+def log_in(client, email):
+    response = client.post('/api/auth/login', json={'email': email, 'password': PASSWORD})
+    assert response.status_code == 200, response.get_json()
+    return client
+
+
+@pytest.fixture
+def passenger(app):
+    """Logs in a new passenger; returns a test client with their session."""
+    def login():
+        client = app.test_client()
+        email = f'passenger{next(_emails)}@tests.ridenaija'
+        response = client.post('/api/auth/register', json={'name': 'Test Passenger', 'email': email,
+                                                             'phone': '08000000000', 'password': PASSWORD})
+        assert response.status_code == 201, response.get_json()
+        return log_in(client, email)
+    return login
+
+
+@pytest.fixture
+def admin(app):
+    """A test client logged in as the sample admin."""
+    return log_in(app.test_client(), 'admin@ridenaija.com')
+
+
+@pytest.fixture
+def make_trip(app_context):
+    """Adds a bookable trip `hours` after TOMORROW taking `duration` hours; returns its id."""
+    def make(seats=14, from_loc='Lagos', to_loc='Abuja', hours=12, duration=8):
+        db = ridenaija.db
+        departure = TOMORROW + timedelta(hours=hours)
+        with app_context():
+            trip = ridenaija.Trip(driver_id=ridenaija.default_driver().id, from_location=from_loc,
+                                  to_location=to_loc, departure_time=departure,
+                                  arrival_time=departure + timedelta(hours=duration),
+                                  available_seats=seats, price_per_seat=10000)
+            db.session.add(trip)
+            db.session.flush()
+            ridenaija.fare_calendar.refresh(from_loc, to_loc, departure.date())
+            db.session.commit()
+            return trip.id
+    return make
+
+
+@pytest.fixture
+def lapse_holds(app_context):
+    """Moves the unpaid seat holds on the given trips into the past."""
+    def lapse(*trip_ids):
+        db, SeatHold = ridenaija.db, ridenaija.SeatHold
+        with app_context():
+            db.session.execute(db.update(SeatHold).where(SeatHold.trip_id.in_(trip_ids), SeatHold.status == 'held')
+                               .values(expires_at=datetime.utcnow() - timedelta(minutes=1)))
+            db.session.commit()
+    return lapse
@@ -0,0 +1,21 @@
+# backend/tests/test_archive.py - archived bookings stay in the passenger's history
+from datetime import datetime
+
+import app as ridenaija
+from conftest import book, walk
+
+
+def test_history_merges_archived_bookings_in_order(passenger, make_trip, app_context):
+    client = passenger()
+    old_trip, new_trip = make_trip(hours=1), make_trip(hours=2)
+    booked = [book(client, trip_id)['id'] for trip_id in (old_trip, new_trip, old_trip, new_trip)]
+    with app_context():
+        moved = ridenaija.archiver.archive_trips([old_trip], datetime.utcnow())
+    assert moved['bookings'] == 2
+
+    newest_first = booked[::-1]
+    bookings = client.get('/api/bookings/user').get_json()['bookings']
+    assert [b['id'] for b in bookings] == newest_first
+    assert walk(client, '/api/bookings/user', 'bookings', limit=1) == newest_first
+    archived = client.get(f'/api/bookings/{booked[0]}').get_json()['booking']
+    assert archived['trip_id'] == old_trip and archived['trip_details']['from_location'] == 'Lagos'
@@ -0,0 +1,45 @@
+# backend/tests/test_config.py - the production config refuses unsafe settings at startup
+#
+# create_app configures the module-level services, so only configs it refuses
+# are built here; the suite's own app stays in charge of them.
+import pytest
+
+import app as ridenaija
+from config import Config, ProductionConfig
+
+
+def production(tmp_path, **settings):
+    """ProductionConfig with a throwaway database, a Paystack key, and `settings` on top."""
+    return type('ProductionTestConfig', (ProductionConfig,), dict({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'production.db'),
+        'SECRET_KEY': 'a-real-secret',
+        'PAYSTACK_SECRET_KEY': 'sk_test_key',
+        'METRICS_TOKEN': 'metrics-token',
+    }, **settings))
+
+
+def test_production_needs_a_secret_key(tmp_path):
+    with pytest.raises(RuntimeError, match='SECRET_KEY'):
+        ridenaija.create_app(production(tmp_path, SECRET_KEY=None))
+
+
+def test_production_metrics_need_a_token(tmp_path):
+    with pytest.raises(RuntimeError, match='METRICS_TOKEN'):
+        ridenaija.create_app(production(tmp_path, METRICS_TOKEN=None))
+
+
+def test_metrics_token_is_checked(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'metrics-token')
+    client = app.test_client()
+    assert client.get('/api/metrics').status_code == 401
+    response = client.get('/api/metrics', headers={'Authorization': 'Bearer metrics-token'})
+    assert response.status_code == 200 and b'# TYPE' in response.data
+
+    monkeypatch.setitem(app.config, 'METRICS_ENABLED', False)
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer metrics-token'}).status_code == 404
+
+
+def test_unsupported_database_is_refused():
+    config = type('MySQLConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': 'mysql+pymysql://ridenaija@db/ridenaija'})
+    with pytest.raises(RuntimeError, match='mysql'):
+        ridenaija.create_app(config)
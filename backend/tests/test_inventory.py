@@ -0,0 +1,129 @@
+# backend/tests/test_inventory.py - concurrent bookings never sell more seats than a trip has
+import pytest
+from sqlalchemy import func, select
+
+import app as ridenaija
+from conftest import at_once, book
+from inventory import ReleaseConflict, SeatsUnavailable, with_retry
+
+
+def trip_state(app_context, trip_id):
+    """(available_seats, seats held or confirmed, seats on unexpired bookings) for the trip."""
+    db, Trip, Booking, SeatHold = ridenaija.db, ridenaija.Trip, ridenaija.Booking, ridenaija.SeatHold
+    with app_context():
+        available = db.session.get(Trip, trip_id).available_seats
+        held = db.session.scalar(select(func.coalesce(func.sum(SeatHold.seats), 0)).where(
+            SeatHold.trip_id == trip_id, SeatHold.status.in_(['held', 'confirmed'])))
+        booked = db.session.scalar(select(func.coalesce(func.sum(Booking.seats), 0)).where(
+            Booking.trip_id == trip_id, Booking.status != 'expired'))
+    return available, held, booked
+
+
+def test_concurrent_reserves_never_oversell(app, make_trip, app_context):
+    trip_id = make_trip(seats=7)
+
+    def reserve(n):
+        with app.app_context():
+            def attempt():
+                remaining = ridenaija.inventory.reserve(trip_id, 2)
+                ridenaija.db.session.commit()
+                return remaining
+            try:
+                return with_retry(attempt, session=ridenaija.db.session)
+            except SeatsUnavailable:
+                ridenaija.db.session.rollback()
+                return None
+
+    results = at_once(8, reserve)
+    assert sorted(r for r in results if r is not None) == [1, 3, 5]
+    assert trip_state(app_context, trip_id)[0] == 1
+
+
+def test_concurrent_bookings_sell_exactly_the_seats(passenger, make_trip, app_context):
+    trip_id = make_trip(seats=5)
+    clients = [passenger() for _ in range(12)]
+    responses = at_once(12, lambda n: clients[n].post('/api/bookings', json={'trip_id': trip_id, 'seats': 1}))
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [201] * 5 + [400] * 7
+    assert trip_state(app_context, trip_id) == (0, 5, 5)
+
+
+def test_concurrent_bookings_on_lapsed_holds_release_them_once(passenger, make_trip, lapse_holds, app_context):
+    trip_id = make_trip(seats=3)
+    first = passenger()
+    lapsed = [book(first, trip_id)['id'] for _ in range(3)]
+    lapse_holds(trip_id)
+
+    clients = [passenger() for _ in range(8)]
+    responses = at_once(8, lambda n: clients[n].post('/api/bookings', json={'trip_id': trip_id, 'seats': 1}))
+    assert sorted(response.status_code for response in responses) == [201] * 3 + [400] * 5
+    assert trip_state(app_context, trip_id) == (0, 3, 3)
+    for booking_id in lapsed:
+        assert first.get(f'/api/bookings/{booking_id}').get_json()['booking']['status'] == 'expired'
+
+
+def test_holds_released_elsewhere_restart_the_batch(app, passenger, make_trip, lapse_holds, app_context,
+                                                    monkeypatch, caplog):
+    # The batch reserves `first` (lower id) before finding `second` full. Between its read of the
+    # lapsed holds on `second` and flipping them, another transaction releases one of the two.
+    first, second = make_trip(seats=1), make_trip(seats=2)
+    earlier = passenger()
+    book(earlier, second)
+    book(earlier, second)
+    lapse_holds(second)
+    db, Trip, Booking, SeatHold = ridenaija.db, ridenaija.Trip, ridenaija.Booking, ridenaija.SeatHold
+    with app_context():
+        hold = db.session.scalars(select(SeatHold).where(SeatHold.trip_id == second)).first()
+        hold.status = 'released'
+        db.session.get(Trip, second).available_seats += hold.seats
+        db.session.get(Booking, hold.booking_id).status = 'expired'
+        db.session.commit()
+
+    inventory = ridenaija.inventory
+    current = inventory.expired_holds_statement
+    reads = []
+
+    def stale_read(now, trip_id=None):
+        reads.append(trip_id)
+        if len(reads) == 1:
+            # Still sees the hold the other transaction released
+            return select(SeatHold.id, SeatHold.trip_id, SeatHold.booking_id, SeatHold.seats).where(
+                SeatHold.trip_id == trip_id)
+        return current(now, trip_id)
+
+    monkeypatch.setattr(inventory, 'expired_holds_statement', stale_read)
+    # The retry runs the whole batch twice, which its budget doesn't allow for
+    monkeypatch.setitem(app.config, 'QUERY_BUDGET_STRICT', False)
+    response = passenger().post('/api/bookings/batch', json={'bookings': [
+        {'trip_id': first}, {'trip_id': second, 'seats': 2}]})
+    caplog.clear()
+
+    assert response.status_code == 201, response.get_json()
+    assert reads == [second, second]
+    assert trip_state(app_context, first) == (0, 1, 1)
+    assert trip_state(app_context, second) == (0, 2, 2)
+
+
+def test_release_conflict_restarts_the_unit_of_work():
+    class Session:
+        rollbacks = 0
+
+        def rollback(self):
+            self.rollbacks += 1
+
+    session, calls = Session(), []
+
+    def unit_of_work():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise ReleaseConflict("released elsewhere")
+        return 'booked'
+
+    assert with_retry(unit_of_work, base_delay=0, session=session) == 'booked'
+    assert calls == [0, 1] and session.rollbacks == 1
+
+    def always_conflicts():
+        raise ReleaseConflict("released elsewhere")
+
+    with pytest.raises(ReleaseConflict):
+        with_retry(always_conflicts, attempts=2, base_delay=0, session=session)
@@ -0,0 +1,64 @@
+# backend/tests/test_journeys.py - /api/journeys itineraries and layovers
+import itertools
+
+import pytest
+
+_networks = itertools.count()
+
+
+@pytest.fixture
+def connections(make_trip, cold):
+    """Ikot -> Uyo arriving 2h after TOMORROW, then Uyo -> Eket 15 or 60 minutes after it arrives.
+
+    Each test gets its own copy of the three towns, so earlier tests' trips never compete.
+    """
+    ikot, uyo, eket = (f'{town} {next(_networks)}' for town in ('Ikot', 'Uyo', 'Eket'))
+    trips = {
+        'from': ikot,
+        'to': eket,
+        'first': make_trip(from_loc=ikot, to_loc=uyo, hours=0, duration=2),
+        'tight': make_trip(from_loc=uyo, to_loc=eket, hours=2.25, duration=1),
+        'relaxed': make_trip(from_loc=uyo, to_loc=eket, hours=3, duration=1),
+    }
+    cold()
+    return trips
+
+
+def plan(app, connections, **query):
+    query = dict({'from': connections['from'], 'to': connections['to']}, **query)
+    response = app.test_client().get('/api/journeys', query_string=query)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['journeys']
+
+
+def test_connects_through_a_transfer(app, connections):
+    journeys = plan(app, connections, min_layover=10)
+    assert len(journeys) == 1
+    journey = journeys[0]
+    assert [leg['trip_id'] for leg in journey['legs']] == [connections['first'], connections['tight']]
+    assert journey['transfers'] == 1
+    assert journey['layover_minutes'] == [15]
+    assert set(journey['criteria']) == {'earliest_arrival', 'cheapest'}
+    assert journey['total_price'] == 20000
+
+
+def test_min_layover_skips_tight_connections(app, connections):
+    journey, = plan(app, connections, min_layover=30, optimize='earliest')
+    assert [leg['trip_id'] for leg in journey['legs']] == [connections['first'], connections['relaxed']]
+    assert journey['layover_minutes'] == [60]
+    assert plan(app, connections, min_layover=90) == []
+
+
+def test_no_transfers_means_direct_only(app, connections):
+    assert plan(app, connections, max_transfers=0) == []
+
+
+def test_bad_parameters_say_what_is_wrong(app, connections):
+    client = app.test_client()
+    for query, error in (({'max_transfers': -1}, 'max_transfers cannot be negative'),
+                         ({'optimize': 'fastest'}, 'optimize must be earliest and/or cheapest'),
+                         ({'min_layover': 'soon'}, 'Invalid max_transfers, min_layover, seats or date')):
+        response = client.get('/api/journeys', query_string=dict({'from': connections['from'],
+                                                                  'to': connections['to']}, **query))
+        assert response.status_code == 400
+        assert response.get_json()['error'] == error
@@ -0,0 +1,35 @@
+# backend/tests/test_migrations.py - rewriting UUID keys keeps queued jobs pointing at their rows
+import json
+import uuid
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+import app as ridenaija
+import migrations
+
+
+def test_rekey_rewrites_booking_ids_in_queued_jobs(tmp_path):
+    engine = create_engine('sqlite:///' + str(tmp_path / 'legacy.db'))
+    migrations.upgrade(engine, ridenaija.db.metadata)
+    old = str(uuid.uuid4())
+    context = {"to": "ada@example.com", "booking_id": old, "booking_reference": "RNJ0000001"}
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO bookings (id, trip_id, passenger_id, seats, total_price, created_at) "
+                          "VALUES (:id, 'trip', 'user', 1, 10000, :now)"), {"id": old, "now": datetime.utcnow()})
+        conn.execute(text("INSERT INTO jobs (id, queue, kind, payload, dedupe_key, status) "
+                          "VALUES ('job', 'notifications', 'booking_created', :payload, :dedupe, 'queued')"),
+                     {"payload": json.dumps(context), "dedupe": f"booking_created:{old}"})
+        conn.execute(text("INSERT INTO jobs (id, queue, kind, payload, status) "
+                          "VALUES ('other', 'payments', 'verify', :payload, 'queued')"),
+                     {"payload": json.dumps({"reference": "PAY1"})})
+        migrations.rekey(conn, 'bookings', dict(migrations.REKEYED_TABLES)['bookings'])
+
+    with engine.connect() as conn:
+        new = conn.execute(text("SELECT id FROM bookings")).scalar()
+        jobs = dict(conn.execute(text("SELECT id, payload FROM jobs")).all())
+        dedupe = conn.execute(text("SELECT dedupe_key FROM jobs WHERE id = 'job'")).scalar()
+    assert new != old and len(new) == 26
+    assert json.loads(jobs['job']) == dict(context, booking_id=new)
+    assert dedupe == f"booking_created:{new}"
+    assert json.loads(jobs['other']) == {"reference": "PAY1"}
@@ -0,0 +1,87 @@
+# backend/tests/test_payments.py - idempotent checkout and signed webhooks
+import app as ridenaija
+from conftest import at_once, book
+
+
+def pay(client, booking_id, key):
+    return client.post('/api/payment/process', json={'booking_id': booking_id}, headers={'Idempotency-Key': key})
+
+
+def webhook(app, body, signature):
+    return app.test_client().post('/api/payment/webhook', data=body, headers={
+        ridenaija.SIGNATURE_HEADER: signature, 'Content-Type': 'application/json'})
+
+
+def test_same_idempotency_key_reuses_the_payment(passenger, make_trip):
+    client = passenger()
+    booking = book(client, make_trip())
+    first = pay(client, booking['id'], 'checkout-1')
+    assert first.status_code == 202 and first.get_json()['message'] == 'Payment started'
+    again = pay(client, booking['id'], 'checkout-1')
+    assert again.status_code == 202 and again.get_json()['message'] == 'Payment already in progress'
+    assert again.get_json()['payment']['reference'] == first.get_json()['payment']['reference']
+
+    other = book(client, make_trip())
+    response = pay(client, other['id'], 'checkout-1')
+    assert response.status_code == 422
+    assert 'different booking' in response.get_json()['error']
+
+
+def test_webhook_with_bad_signature_is_refused(app, passenger, make_trip, app_context):
+    client = passenger()
+    booking = book(client, make_trip())
+    reference = pay(client, booking['id'], 'bad-signature').get_json()['payment']['reference']
+    body, signature = ridenaija.payment_service.provider.signed_webhook(reference,
+                                                                       amount=booking['total_price'] * 100)
+    response = webhook(app, body, 'f' * len(signature))
+    assert response.status_code == 401
+    assert webhook(app, body, None).status_code == 401
+    with app_context():
+        queued = ridenaija.db.session.scalar(ridenaija.db.select(ridenaija.db.func.count()).select_from(
+            ridenaija.Job).where(ridenaija.Job.kind == 'webhook', ridenaija.Job.payload.contains(reference)))
+    assert queued == 0
+
+
+def test_signed_webhook_confirms_the_booking(app, passenger, make_trip, app_context):
+    client = passenger()
+    booking = book(client, make_trip())
+    reference = pay(client, booking['id'], 'webhook').get_json()['payment']['reference']
+    body, signature = ridenaija.payment_service.provider.signed_webhook(reference,
+                                                                       amount=booking['total_price'] * 100)
+    assert webhook(app, body, signature).status_code == 200
+    with app_context():
+        ridenaija.job_queue.run_pending(ridenaija.PAYMENTS_QUEUE, ridenaija.payment_service.handlers(), limit=1000)
+
+    payment = client.get(f'/api/payment/{reference}').get_json()
+    assert payment['payment']['status'] == 'success'
+    assert payment['receipt']
+    assert client.get(f"/api/bookings/{booking['id']}").get_json()['booking']['payment_status'] == 'paid'
+
+
+def test_key_taken_by_a_concurrent_request_reuses_its_payment(passenger, make_trip, monkeypatch):
+    client = passenger()
+    booking = book(client, make_trip())
+    first = pay(client, booking['id'], 'race').get_json()['payment']
+    # The other request's INSERT commits between this one's lookup and its own INSERT
+    service, lookups = ridenaija.payment_service, []
+    reuse = service._reuse
+
+    def missed_first(booking, key):
+        lookups.append(key)
+        return reuse(booking, key) if len(lookups) > 1 else None
+
+    monkeypatch.setattr(service, '_reuse', missed_first)
+
+    response = pay(client, booking['id'], 'race')
+    assert response.status_code == 202, response.get_json()
+    assert response.get_json()['message'] == 'Payment already in progress'
+    assert response.get_json()['payment']['reference'] == first['reference']
+    assert len(lookups) == 2
+
+
+def test_concurrent_checkouts_with_one_key_make_one_payment(passenger, make_trip):
+    client = passenger()
+    booking = book(client, make_trip())
+    responses = at_once(6, lambda n: pay(client, booking['id'], 'double-click'))
+    assert [response.status_code for response in responses] == [202] * 6
+    assert len({response.get_json()['payment']['reference'] for response in responses}) == 1
@@ -0,0 +1,154 @@
+# backend/tests/test_query_budgets.py - every budgeted endpoint stays within its @query_budget
+#
+# TESTING makes query_budget strict, so a view over its budget raises
+# QueryBudgetExceeded out of the test client (or is logged, and failed by
+# conftest, when the overrun comes after its commit). The app config makes
+# every request cold; the lapsed-hold cases add the release path.
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+import app as ridenaija
+from conftest import book, book_all
+from query_budget import QueryBudgetExceeded, query_budget
+
+
+# ---------- the guard itself ----------
+
+def test_overrun_before_commit_rolls_back(app):
+    @query_budget(1)
+    def view():
+        ridenaija.db.session.execute(select(1))
+        ridenaija.db.session.add(ridenaija.Sequence(name='budget-test', next_value=1))
+        ridenaija.db.session.commit()
+
+    with app.test_request_context():
+        with pytest.raises(QueryBudgetExceeded):
+            view()
+        ridenaija.db.session.rollback()
+        assert ridenaija.db.session.get(ridenaija.Sequence, 'budget-test') is None
+
+
+def test_overrun_after_commit_is_logged_not_raised(app, caplog):
+    @query_budget(0)
+    def view():
+        ridenaija.db.session.commit()
+        ridenaija.db.session.execute(select(1))
+        return 'saved'
+
+    with app.test_request_context():
+        assert view() == 'saved'
+    assert any('view ran 1 SQL queries (budget 0)' in r.getMessage() for r in caplog.records)
+    caplog.clear()
+
+
+# ---------- reads ----------
+
+def test_trip_search(app, make_trip, cold):
+    client = app.test_client()
+    make_trip()
+    for query in ({}, {'from': 'Lagos', 'to': 'Abuja'}, {'amenities': 'WiFi'}, {'amenities': 'AC', 'limit': 2},
+                  {'fields': 'id,price_per_seat'}):
+        cold()
+        response = client.get('/api/trips', query_string=query)
+        assert response.status_code == 200, response.get_json()
+    cursor = client.get('/api/trips', query_string={'limit': 1}).get_json()['next_cursor']
+    cold()
+    assert client.get('/api/trips', query_string={'limit': 1, 'cursor': cursor}).status_code == 200
+
+
+def test_journeys(app, cold):
+    cold()
+    response = app.test_client().get('/api/journeys', query_string={'from': 'Lagos', 'to': 'Kano'})
+    assert response.status_code in (200, 404), response.get_json()
+
+
+def test_fare_calendar(app, make_trip):
+    make_trip()
+    month = (datetime.utcnow() + timedelta(days=1)).strftime('%Y-%m')
+    response = app.test_client().get('/api/fares/calendar', query_string={'from': 'Lagos', 'to': 'Abuja',
+                                                                          'month': month})
+    assert response.status_code == 200, response.get_json()
+
+
+def test_seat_stream(app, make_trip, cold):
+    trip_id = make_trip()
+    cold()
+    response = app.test_client().get('/api/trips/seats/stream', query_string={'trip_ids': trip_id},
+                                     buffered=False)
+    assert response.status_code == 200
+    response.close()
+
+
+# ---------- bookings ----------
+
+def test_create_booking(passenger, make_trip):
+    book(passenger(), make_trip(), seats=2)
+
+
+def test_create_booking_on_lapsed_holds(passenger, make_trip, lapse_holds):
+    trip_id = make_trip(seats=1)
+    book(passenger(), trip_id)
+    lapse_holds(trip_id)
+    book(passenger(), trip_id)
+
+
+def test_batch_booking(passenger, make_trip):
+    # Trips on separate routes, so every item pays for its own fare calendar refresh
+    items = ridenaija.BOOKING_BATCH_MAX_ITEMS
+    trip_ids = [make_trip(from_loc=f'Batch {n}') for n in range(items)]
+    response = passenger().post('/api/bookings/batch', json={'bookings': [{'trip_id': t} for t in trip_ids]})
+    assert response.status_code == 201, response.get_json()
+    # The expected path: the trips, booking and hold inserts, the principal, one block of
+    # numbers, and per booking its reserve, fare calendar refresh and email job
+    expected = 3 + ridenaija.PRINCIPAL_LOOKUP_QUERIES + ridenaija.NUMBER_BLOCK_QUERIES + items * 3
+    assert int(response.headers['X-SQL-Queries']) == expected == 18
+
+
+def test_batch_booking_on_lapsed_holds(passenger, make_trip, lapse_holds):
+    full = make_trip(seats=1)
+    book(passenger(), full)
+    lapse_holds(full)
+    book_all(passenger(), [full] + [make_trip(hours=n) for n in range(1, ridenaija.BOOKING_BATCH_MAX_ITEMS)])
+
+
+def test_booking_history(app, passenger, make_trip, app_context):
+    client = passenger()
+    first = book(client, make_trip())
+    second = book(client, make_trip())
+    page = client.get('/api/bookings/user', query_string={'limit': 1}).get_json()
+    assert page['success'] and page['next_cursor']
+    response = client.get('/api/bookings/user', query_string={'limit': 1, 'cursor': page['next_cursor']})
+    assert response.status_code == 200, response.get_json()
+    assert client.get(f"/api/bookings/{second['id']}").status_code == 200
+
+    # Moved to the archive, the booking is still in the history and found by id
+    with app_context():
+        ridenaija.archiver.archive_trips([first['trip_id']], datetime.utcnow())
+    response = client.get('/api/bookings/user')
+    assert response.status_code == 200
+    assert {b['id'] for b in response.get_json()['bookings']} == {first['id'], second['id']}
+    assert client.get(f"/api/bookings/{first['id']}").status_code == 200
+
+
+# ---------- payments ----------
+
+def test_payment(app, passenger, make_trip):
+    client = passenger()
+    booking = book(client, make_trip())
+    response = client.post('/api/payment/process', json={'booking_id': booking['id']},
+                           headers={'Idempotency-Key': booking['id']})
+    assert response.status_code == 202, response.get_json()
+    reference = response.get_json()['payment']['reference']
+    assert client.get(f'/api/payment/{reference}').status_code == 200
+    # The retried request reuses the payment
+    response = client.post('/api/payment/process', json={'booking_id': booking['id']},
+                           headers={'Idempotency-Key': booking['id']})
+    assert response.status_code == 202, response.get_json()
+
+    body, signature = ridenaija.payment_service.provider.signed_webhook(reference, amount=booking['total_price'] * 100)
+    response = app.test_client().post('/api/payment/webhook', data=body,
+                                      headers={ridenaija.SIGNATURE_HEADER: signature,
+                                               'Content-Type': 'application/json'})
+    assert response.status_code == 200, response.get_json()
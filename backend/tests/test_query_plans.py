@@ -0,0 +1,24 @@
+# backend/tests/test_query_plans.py - endpoint queries are served by indexes (flask check-query-plans)
+from datetime import datetime
+
+from sqlalchemy import select
+
+import app as ridenaija
+import query_plans
+
+
+def test_endpoint_queries_use_indexes(app_context):
+    with app_context():
+        scans = {}
+        for name, statement in ridenaija.endpoint_query_statements(datetime.utcnow()).items():
+            plan = query_plans.explain(ridenaija.db.session, statement)
+            if query_plans.full_scans(plan):
+                scans[name] = plan
+    assert scans == {}
+
+
+def test_unindexed_query_is_reported(app_context):
+    Trip = ridenaija.Trip
+    with app_context():
+        plan = query_plans.explain(ridenaija.db.session, select(Trip.id).where(Trip.car_plate == 'RNJ001'))
+    assert query_plans.full_scans(plan) == ['SCAN trips']
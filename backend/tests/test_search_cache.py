@@ -0,0 +1,33 @@
+# backend/tests/test_search_cache.py - cached /api/trips pages follow seat changes
+import pytest
+
+import app as ridenaija
+from conftest import book
+
+
+@pytest.fixture
+def search_cache(app):
+    """The /api/trips cache switched on (the suite runs with it off)."""
+    cache = ridenaija.search_cache
+    config = app.config
+    cache.configure(config['SEARCH_CACHE_MAX_BYTES'], 60, 0)
+    yield cache
+    cache.configure(config['SEARCH_CACHE_MAX_BYTES'], config['SEARCH_CACHE_TTL'], config['SEARCH_CACHE_SEAT_STALENESS'])
+
+
+def seats_left(client, trip_id):
+    trips = client.get('/api/trips', query_string={'from': 'Kaduna', 'to': 'Zaria'}).get_json()['trips']
+    return next(trip['available_seats'] for trip in trips if trip['id'] == trip_id)
+
+
+def test_booking_invalidates_cached_search(app, search_cache, passenger, make_trip, cold):
+    trip_id = make_trip(seats=10, from_loc='Kaduna', to_loc='Zaria')
+    cold()
+    client = app.test_client()
+    assert seats_left(client, trip_id) == 10
+    hits = search_cache.hits
+    assert seats_left(client, trip_id) == 10
+    assert search_cache.hits == hits + 1
+
+    book(passenger(), trip_id, seats=3)
+    assert seats_left(client, trip_id) == 7
@@ -0,0 +1,57 @@
+# backend/tests/test_timetable.py - POST /api/admin/timetable reports rejects and upserts
+import csv
+import io
+from datetime import timedelta
+
+import app as ridenaija
+from conftest import TOMORROW
+
+COLUMNS = ['departure_id', 'from', 'to', 'departure_time', 'arrival_time', 'seats', 'price']
+
+
+def timetable(*rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(COLUMNS)
+    writer.writerows(rows)
+    return io.BytesIO(out.getvalue().encode())
+
+
+def departure(ref, hours, price=9000, from_loc='Calabar', to_loc='Ogoja'):
+    departs = TOMORROW + timedelta(hours=hours)
+    return [ref, from_loc, to_loc, departs.isoformat(), (departs + timedelta(hours=5)).isoformat(), 18, price]
+
+
+def upload(client, rows):
+    response = client.post('/api/admin/timetable', data={'operator': 'TESTLINES', 'file': (timetable(*rows), 'tt.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def operator_trips(app_context):
+    with app_context():
+        Trip = ridenaija.Trip
+        return {trip.operator_ref: trip.price_per_seat for trip in Trip.query.filter_by(operator='TESTLINES')}
+
+
+def test_import_reports_rejects_and_upserts(admin, app_context):
+    rows = [departure('T1', 1), departure('T2', -48), departure('T3', 2, to_loc='Calabar'),
+            departure('T4', 3, price='free'), departure('T5', 4)]
+    report = upload(admin, rows)
+    assert (report['rows'], report['inserted'], report['updated'], report['rejected']) == (5, 2, 0, 3)
+    assert [error['line'] for error in report['errors']] == [3, 4, 5]
+    assert 'in the past' in report['errors'][0]['error']
+    assert operator_trips(app_context) == {'T1': 9000, 'T5': 9000}
+
+    # The same departures again update in place instead of adding copies
+    report = upload(admin, [departure('T1', 1, price=9500), departure('T5', 4), departure('T6', 6)])
+    assert (report['inserted'], report['updated'], report['rejected']) == (1, 2, 0)
+    assert operator_trips(app_context) == {'T1': 9500, 'T5': 9000, 'T6': 9000}
+
+
+def test_import_is_admin_only(passenger):
+    response = passenger().post('/api/admin/timetable', data={'operator': 'TESTLINES',
+                                                               'file': (timetable(), 'tt.csv')},
+                                content_type='multipart/form-data')
+    assert response.status_code == 403
@@ -0,0 +1,265 @@
+# backend/timetable.py - streaming import of operator timetables into `trips`
+#
+# A CSV file has one departure per row, with these header names (optional
+# columns may be left out):
+#   departure_id                   the operator's id for the departure (optional;
+#                                  defaults to from|to|departure_time)
+#   from, to                       city names
+#   departure_time, arrival_time   ISO 8601, UTC unless an offset is given
+#   seats, price                   seats on sale and fare per seat in naira
+#   car_model, car_plate, car_type, amenities (';'-separated), status   optional
+#
+# A zip is GTFS-style: stops.txt (stop_id, stop_name), routes.txt (route_id
+# plus price and the optional columns above, used as defaults) and
+# departures.txt (departure_id, route_id, from_stop_id, to_stop_id,
+# departure_time, arrival_time, seats, and any column overriding the route's).
+#
+# Rows are read one at a time and written in batches, so memory use does not
+# grow with the file; only stops and routes of a zip are held in full.
+import csv
+import io
+import time
+import zipfile
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from catalog import amenity_mask
+from ids import new_id
+from trip_index import normalize_city
+
+MAX_SEATS = 100
+STATUSES = ('scheduled', 'cancelled')
+# Columns an import may change on a departure it already loaded; available_seats
+# is left alone because bookings have been taken off it since
+UPDATED_COLUMNS = ('from_location', 'to_location', 'departure_time', 'arrival_time', 'price_per_seat',
+                   'car_model', 'car_plate', 'car_type', 'amenity_mask', 'status')
+
+
+# ==================== READING ====================
+
+def _text(stream):
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def csv_rows(stream):
+    """(line number, {column: value}) for each row of a binary CSV stream."""
+    reader = csv.DictReader(_text(stream))
+    for row in reader:
+        yield reader.line_num, row
+
+
+def gtfs_rows(archive):
+    """Rows of departures.txt in a zipfile.ZipFile, with stop names and route defaults filled in."""
+    with archive.open('stops.txt') as f:
+        stops = {row['stop_id']: row['stop_name'] for _, row in csv_rows(f)}
+    with archive.open('routes.txt') as f:
+        routes = {row['route_id']: row for _, row in csv_rows(f)}
+    with archive.open('departures.txt') as f:
+        for line, row in csv_rows(f):
+            merged = {name: value for name, value in routes.get(row.get('route_id'), {}).items()
+                      if name != 'route_id'}
+            merged.update((name, value) for name, value in row.items() if value not in (None, ''))
+            if row.get('route_id') not in routes:
+                merged['error'] = f"unknown route_id {row.get('route_id')!r}"
+            for end in ('from', 'to'):
+                stop_id = row.get(f'{end}_stop_id')
+                if stop_id not in stops:
+                    merged.setdefault('error', f"unknown {end}_stop_id {stop_id!r}")
+                merged[end] = stops.get(stop_id)
+            yield line, merged
+
+
+def timetable_rows(file, filename=''):
+    """Rows of an uploaded or opened timetable, by content: a zip is GTFS-style, anything else CSV.
+
+    `file` is a seekable binary file object.
+    """
+    if filename.lower().endswith('.zip') or zipfile.is_zipfile(file):
+        file.seek(0)
+        return gtfs_rows(zipfile.ZipFile(file))
+    file.seek(0)
+    return csv_rows(file)
+
+
+# ==================== VALIDATION ====================
+
+def _required(row, name):
+    value = (row.get(name) or '').strip()
+    if not value:
+        raise ValueError(f"{name} is required")
+    return value
+
+
+def _optional(row, name, max_length):
+    value = (row.get(name) or '').strip()
+    if len(value) > max_length:
+        raise ValueError(f"{name} is longer than {max_length} characters")
+    return value or None
+
+
+def _timestamp(row, name):
+    value = _required(row, name)
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"{name} {value!r} is not an ISO 8601 time") from None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _number(row, name, kind):
+    value = _required(row, name)
+    try:
+        return kind(value)
+    except ValueError:
+        raise ValueError(f"{name} {value!r} is not a number") from None
+
+
+def departure(row, now):
+    """Trip column values for one timetable row. Raises ValueError saying what is wrong."""
+    if row.get('error'):
+        raise ValueError(row['error'])
+    from_loc = _required(row, 'from')
+    to_loc = _required(row, 'to')
+    if max(len(from_loc), len(to_loc)) > 100:
+        raise ValueError("city names are limited to 100 characters")
+    if normalize_city(from_loc) == normalize_city(to_loc):
+        raise ValueError("from and to are the same city")
+    departure_time = _timestamp(row, 'departure_time')
+    arrival_time = _timestamp(row, 'arrival_time')
+    if departure_time <= now:
+        raise ValueError("departure_time is in the past")
+    if arrival_time <= departure_time:
+        raise ValueError("arrival_time is not after departure_time")
+    seats = _number(row, 'seats', int)
+    if not 1 <= seats <= MAX_SEATS:
+        raise ValueError(f"seats must be between 1 and {MAX_SEATS}")
+    price = _number(row, 'price', float)
+    if not 0 < price < float('inf'):
+        raise ValueError("price must be a positive number")
+    status = _optional(row, 'status', 20) or 'scheduled'
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+    ref = _optional(row, 'departure_id', 100) or f"{from_loc}|{to_loc}|{departure_time.isoformat()}"[:100]
+    return {
+        "operator_ref": ref,
+        "from_location": from_loc,
+        "to_location": to_loc,
+        "departure_time": departure_time,
+        "arrival_time": arrival_time,
+        "available_seats": seats,
+        "price_per_seat": price,
+        "car_model": _optional(row, 'car_model', 100),
+        "car_plate": _optional(row, 'car_plate', 20),
+        "car_type": _optional(row, 'car_type', 50) or 'Bus',
+        "amenity_mask": amenity_mask(name for name in (row.get('amenities') or '').split(';') if name.strip()),
+        "status": status,
+    }
+
+
+# ==================== IMPORT ====================
+
+class TimetableImporter:
+    """Upserts timetable rows into `trips`, keyed on (operator, operator_ref).
+
+    Each batch is one transaction: a read of the departures it already
+    holds, one INSERT ... ON CONFLICT DO UPDATE executed for all its rows,
+    and one fare calendar refresh covering every (route, day) the batch touched.
+    """
+
+    def __init__(self, db, trip_model, fare_calendar, batch_size=5000, max_errors=100):
+        self.db = db
+        self.Trip = trip_model
+        self.fare_calendar = fare_calendar
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+
+    def _insert(self):
+        dialect = self.db.session.get_bind().dialect.name
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+            return insert
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            return insert
+        raise RuntimeError(f"TimetableImporter has no upsert for {dialect}")
+
+    def upsert_statement(self):
+        stmt = self._insert()(self.Trip)
+        return stmt.on_conflict_do_update(
+            index_elements=['operator', 'operator_ref'],
+            set_={name: getattr(stmt.excluded, name) for name in UPDATED_COLUMNS}
+        )
+
+    def existing_statement(self, operator, refs):
+        """Route and departure time of the operator's departures among `refs`, before the upsert moves them."""
+        Trip = self.Trip
+        return select(Trip.operator_ref, Trip.from_location, Trip.to_location, Trip.departure_time).where(
+            Trip.operator == operator, Trip.operator_ref.in_(refs)
+        )
+
+    def _write(self, batch, operator):
+        """Upsert one batch of {operator_ref: row}; returns how many were already there."""
+        session = self.db.session
+        try:
+            existing = session.execute(self.existing_statement(operator, list(batch))).all()
+            session.execute(self.upsert_statement(), list(batch.values()))
+            # Days the departures left as well as the days they are on now
+            days = {(from_loc, to_loc, departure_time.date()) for _, from_loc, to_loc, departure_time in existing}
+            days.update((row['from_location'], row['to_location'], row['departure_time'].date())
+                        for row in batch.values())
+            self.fare_calendar.refresh_days(days)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        return len(existing)
+
+    def run(self, rows, operator, driver_id, on_reject=None, on_batch=None, now=None):
+        """Import (line, row) pairs for `operator`, with `driver_id` as the trips' driver.
+
+        on_reject(line, row, reason) sees every rejected row and
+        on_batch(report) runs after each committed batch. Returns the report:
+        rows read, inserted, updated, rejected, the first max_errors
+        rejections, seconds and rows per second.
+        """
+        now = now or datetime.utcnow()
+        report = {"rows": 0, "inserted": 0, "updated": 0, "rejected": 0, "errors": [],
+                  "seconds": 0.0, "rows_per_second": 0.0}
+        began = time.perf_counter()
+        batch = {}
+
+        def flush():
+            updated = self._write(batch, operator)
+            report["updated"] += updated
+            report["inserted"] += len(batch) - updated
+            batch.clear()
+            report["seconds"] = time.perf_counter() - began
+            report["rows_per_second"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+            if on_batch:
+                on_batch(report)
+
+        for line, row in rows:
+            report["rows"] += 1
+            try:
+                values = departure(row, now)
+            except ValueError as e:
+                report["rejected"] += 1
+                if len(report["errors"]) < self.max_errors:
+                    report["errors"].append({"line": line, "error": str(e)})
+                if on_reject:
+                    on_reject(line, row, str(e))
+                continue
+            values.update(id=new_id(), operator=operator, driver_id=driver_id, created_at=now)
+            # A later row for the same departure wins; one statement can't update a row twice
+            batch.pop(values["operator_ref"], None)
+            batch[values["operator_ref"]] = values
+            if len(batch) >= self.batch_size:
+                flush()
+        if batch:
+            flush()
+        report["seconds"] = time.perf_counter() - began
+        report["rows_per_second"] = report["rows"] / report["seconds"] if report["seconds"] else 0.0
+        return report
@@ -0,0 +1,216 @@
+# backend/trip_index.py - in-process route index for trip search
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from heapq import merge
+from itertools import islice
+import re
+import threading
+import time
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_city(name):
+    """Canonical key for a city name: 'Port-Harcourt ' -> 'portharcourt'."""
+    return _NON_ALNUM.sub('', (name or '').lower())
+
+
+def _entries(times, ids, lo, hi):
+    for i in range(lo, hi):
+        yield times[i], ids[i]
+
+
+class TripIndex:
+    """Bookable trips grouped by (from, to) route key, kept in departure order.
+
+    Every route holds two parallel lists sorted by departure time so a
+    (from, to, date) search is a pair of bisects instead of a table scan.
+    Trips with no seats left are dropped from the lists and come back when
+    seats are released, so a search never has to skip over sold-out rows.
+    Each trip's amenity mask is kept too, so an `amenities=` search filters
+    in memory and the database only loads the page it returns.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._routes = {}
+        self._trips = {}
+        self._cities = set()
+        self.loaded = False
+        self.loaded_at = 0.0
+        # Called as listener(route_key, departure_time, membership_changed) after
+        # every change; (None, None, True) means the whole index was replaced
+        self.listeners = []
+
+    def _notify(self, key, departure_time, membership_changed):
+        for listener in self.listeners:
+            listener(key, departure_time, membership_changed)
+
+    # ---------- building ----------
+
+    def load(self, rows):
+        """Rebuild from (id, from_location, to_location, departure_time, available_seats, amenity_mask) rows."""
+        routes = {}
+        trips = {}
+        for trip_id, from_loc, to_loc, departure_time, seats, amenities in rows:
+            key = (normalize_city(from_loc), normalize_city(to_loc))
+            trips[trip_id] = [key, departure_time, seats, amenities or 0]
+            if seats > 0:
+                routes.setdefault(key, []).append((departure_time, trip_id))
+
+        built = {}
+        for key, entries in routes.items():
+            entries.sort()
+            built[key] = ([e[0] for e in entries], [e[1] for e in entries])
+
+        with self._lock:
+            self._routes = built
+            self._trips = trips
+            self._cities = {city for key, _, _, _ in trips.values() for city in key}
+            self.loaded = True
+            self.loaded_at = time.monotonic()
+            self._notify(None, None, True)
+
+    def is_stale(self, max_age):
+        return not self.loaded or time.monotonic() - self.loaded_at > max_age
+
+    def add(self, trip_id, from_loc, to_loc, departure_time, seats, amenities=0):
+        with self._lock:
+            if trip_id in self._trips:
+                self.remove(trip_id)
+            key = (normalize_city(from_loc), normalize_city(to_loc))
+            new_route = key not in self._routes
+            self._trips[trip_id] = [key, departure_time, seats, amenities or 0]
+            self._cities.update(key)
+            if seats > 0:
+                self._insert(key, departure_time, trip_id)
+            self._notify(None if new_route else key, departure_time, True)
+
+    def remove(self, trip_id):
+        with self._lock:
+            entry = self._trips.pop(trip_id, None)
+            if entry is None:
+                return
+            if entry[2] > 0:
+                self._delete(entry[0], entry[1], trip_id)
+            self._notify(entry[0], entry[1], True)
+
+    def update_seats(self, trip_id, seats):
+        """Record a new available_seats value after a booking commits."""
+        with self._lock:
+            entry = self._trips.get(trip_id)
+            if entry is None:
+                return
+            was_bookable = entry[2] > 0
+            entry[2] = seats
+            if was_bookable and seats <= 0:
+                self._delete(entry[0], entry[1], trip_id)
+            elif not was_bookable and seats > 0:
+                self._insert(entry[0], entry[1], trip_id)
+            self._notify(entry[0], entry[1], was_bookable != (seats > 0))
+
+    def clear(self):
+        with self._lock:
+            self._routes = {}
+            self._trips = {}
+            self._cities = set()
+            self.loaded = False
+            self._notify(None, None, True)
+
+    def _insert(self, key, departure_time, trip_id):
+        times, ids = self._routes.setdefault(key, ([], []))
+        pos = self._position(times, ids, departure_time, trip_id)
+        times.insert(pos, departure_time)
+        ids.insert(pos, trip_id)
+
+    @staticmethod
+    def _position(times, ids, departure_time, trip_id):
+        """First index whose (departure_time, id) sorts after the given pair."""
+        pos = bisect_left(times, departure_time)
+        while pos < len(times) and times[pos] == departure_time and ids[pos] <= trip_id:
+            pos += 1
+        return pos
+
+    def _delete(self, key, departure_time, trip_id):
+        times, ids = self._routes.get(key, ([], []))
+        pos = bisect_left(times, departure_time)
+        while pos < len(times) and times[pos] == departure_time:
+            if ids[pos] == trip_id:
+                del times[pos]
+                del ids[pos]
+                return
+            pos += 1
+
+    # ---------- searching ----------
+
+    def resolve_cities(self, name):
+        """Canonical keys matching a user-typed city; exact match wins over substring."""
+        key = normalize_city(name)
+        if not key:
+            return None
+        if key in self._cities:
+            return {key}
+        return {city for city in self._cities if key in city}
+
+    def seats(self, trip_ids):
+        """{trip_id: available_seats} for the indexed trips among `trip_ids`."""
+        with self._lock:
+            return {trip_id: self._trips[trip_id][2] for trip_id in trip_ids if trip_id in self._trips}
+
+    def trips_on(self, from_loc, to_loc, date):
+        """{trip_id: available_seats} for every indexed trip of a (from, to) search on `date`, sold out included."""
+        with self._lock:
+            froms = self.resolve_cities(from_loc)
+            tos = self.resolve_cities(to_loc)
+            return {
+                trip_id: seats for trip_id, (key, departure_time, seats, _) in self._trips.items()
+                if departure_time.date() == date
+                and (froms is None or key[0] in froms) and (tos is None or key[1] in tos)
+            }
+
+    def route_keys(self, from_loc='', to_loc=''):
+        """Route keys a (from, to) search covers."""
+        with self._lock:
+            froms = self.resolve_cities(from_loc)
+            tos = self.resolve_cities(to_loc)
+            if froms is not None and tos is not None:
+                return [(f, t) for f in froms for t in tos if (f, t) in self._routes]
+            return [key for key in self._routes
+                    if (froms is None or key[0] in froms) and (tos is None or key[1] in tos)]
+
+    def search(self, from_loc='', to_loc='', date=None, now=None, after=None, limit=None, amenities=0):
+        """(departure_time, trip_id) pairs departing on `date` (or any day) at or
+        after `now`, in departure order.
+
+        `after` is a (departure_time, trip_id) keyset position; only trips that
+        sort strictly after it are returned, at most `limit` of them. With an
+        `amenities` mask only trips having all of those amenities are.
+        """
+        now = now or datetime.utcnow()
+        start, end = now, None
+        if date is not None:
+            day = datetime(date.year, date.month, date.day)
+            start, end = max(day, now), day + timedelta(days=1)
+            if start >= end:
+                return []
+
+        with self._lock:
+            keys = self.route_keys(from_loc, to_loc)
+            slices = []
+            for key in keys:
+                times, ids = self._routes[key]
+                lo = bisect_left(times, start)
+                if after is not None and after[0] >= start:
+                    lo = self._position(times, ids, after[0], after[1])
+                hi = bisect_left(times, end) if end is not None else len(times)
+                if lo < hi:
+                    slices.append(_entries(times, ids, lo, hi))
+
+            entries = merge(*slices)
+            if amenities:
+                trips = self._trips
+                entries = (entry for entry in entries if trips[entry[1]][3] & amenities == amenities)
+            return list(islice(entries, limit))
+
+    def __len__(self):
+        return len(self._trips)
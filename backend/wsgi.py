@@ -0,0 +1,12 @@
+# backend/wsgi.py - production entry point for pre-fork servers
+#
+#   flask --app app init-db              # once, before starting workers
+#   flask --app app generate-trips       # cron / scheduler, not in workers
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# create_app() does no database I/O, so every worker boots independently.
+import os
+
+from app import create_app
+
+app = create_app(os.environ.get('FLASK_CONFIG', 'production'))